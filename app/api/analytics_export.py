@@ -0,0 +1,59 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.database.connection import read_only
+from app.services.analytics_export_service import (
+    EXPORT_TABLES,
+    MEDIA_TYPES,
+    AnalyticsExportService,
+    ColumnarExportUnavailable,
+)
+
+router = APIRouter(prefix="/hrms/analytics", tags=["Analytics Export"])
+
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+def _month(value: str):
+    year, month = value.split("-")
+    return int(year), int(month)
+
+
+# ============================================================
+# ✅ COLUMNAR EXPORT (PARQUET / ARROW)
+# ============================================================
+
+@router.get("/export/{table}")
+@read_only
+def export_table(
+    table: str,
+    month_from: str = Query(..., alias="from", pattern=MONTH_PATTERN),
+    month_to: Optional[str] = Query(None, alias="to", pattern=MONTH_PATTERN),
+    format: Literal["parquet", "arrow"] = Query("parquet"),
+):
+    """
+    One table over the months from..to as a typed Parquet file or Arrow
+    IPC stream, written while rows are read from a server-side cursor.
+    """
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table; one of {', '.join(EXPORT_TABLES)}")
+
+    first = _month(month_from)
+    last = _month(month_to) if month_to else first
+    if last < first:
+        raise HTTPException(status_code=400, detail="'to' is before 'from'")
+
+    try:
+        body = AnalyticsExportService.stream(table, first, last, format)
+    except ColumnarExportUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    suffix = month_from if last == first else f"{month_from}_{month_to}"
+    filename = f"{table}_{suffix}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
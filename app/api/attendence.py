@@ -1,6 +1,6 @@
 # app/routers/attendance_router.py
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from datetime import date
 from typing import Optional, Dict, List
@@ -10,8 +10,14 @@ from fastapi import Body
 
 
 from app.services.attendence_services import AttendanceService
-from app.database.connection import get_connection
+from app.services.attendence_async_services import AsyncAttendanceService
+from app.database.connection import get_connection, get_db, read_only
+from app.database.async_connection import async_db_transaction
 from app.database.attendence import AttendanceDB, AttendanceEventDB
+from app.api.streaming import STREAM_QUERY, RecordJSONResponse, StreamFormat, stream_rows
+from app.database.attendence_async import AsyncAttendanceEventDB
+from app.database.payroll import AttendanceLockDB
+from app.database.payroll_dirty import PayrollDirtyDB
 
 router = APIRouter(prefix="/hrms/attendance", tags=["Attendance"])
 
@@ -38,33 +44,32 @@ class AttendanceOverride(BaseModel):
 # ============================
 
 @router.post("/check-in")
-def check_in(payload: AttendanceAction):
-    return AttendanceService.check_in(payload.employee_id, payload.source, payload.meta)
+def check_in(payload: AttendanceAction, conn=Depends(get_db)):
+    return AttendanceService.check_in(payload.employee_id, payload.source, payload.meta, conn=conn)
 
 
 @router.post("/check-out")
-def check_out(payload: AttendanceAction):
-    return AttendanceService.check_out(payload.employee_id, payload.source, payload.meta)
+def check_out(payload: AttendanceAction, conn=Depends(get_db)):
+    return AttendanceService.check_out(payload.employee_id, payload.source, payload.meta, conn=conn)
 
 
 @router.post("/break/start")
-def break_start(payload: AttendanceAction):
-    return AttendanceService.break_start(payload.employee_id, payload.source, payload.meta)
+def break_start(payload: AttendanceAction, conn=Depends(get_db)):
+    return AttendanceService.break_start(payload.employee_id, payload.source, payload.meta, conn=conn)
 
 
 @router.post("/break/end")
-def break_end(payload: AttendanceAction):
-    return AttendanceService.break_end(payload.employee_id, payload.source, payload.meta)
+def break_end(payload: AttendanceAction, conn=Depends(get_db)):
+    return AttendanceService.break_end(payload.employee_id, payload.source, payload.meta, conn=conn)
 
 
 # ✅ Employee Today's Attendance Status (For Dashboard)
 @router.get("/today/{employee_id}")
-def today_status(employee_id: int):
+def today_status(employee_id: int, conn=Depends(get_db)):
     today = date.today()
-    data = AttendanceDB.get_by_employee_and_date(employee_id, today)
+    data = AttendanceDB.get_by_employee_and_date(employee_id, today, conn=conn)
     if not data:
-        AttendanceService.recalculate_for_date(employee_id, today)
-        data = AttendanceDB.get_by_employee_and_date(employee_id, today)
+        data = AttendanceService.recalculate_for_date(employee_id, today, conn=conn)
     return data
 
 
@@ -73,8 +78,11 @@ def today_status(employee_id: int):
 # ============================
 
 @router.get("/employee/{employee_id}")
-def get_attendance(employee_id: int, start_date: date, end_date: date):
-    return AttendanceDB.get_attendance_range(employee_id, start_date, end_date)
+def get_attendance(employee_id: int, start_date: date, end_date: date,
+                   stream: StreamFormat = STREAM_QUERY):
+    if stream:
+        return stream_rows(AttendanceDB.iter_attendance_range(employee_id, start_date, end_date), stream)
+    return RecordJSONResponse(AttendanceDB.get_attendance_range(employee_id, start_date, end_date))
 
 
 # ============================
@@ -83,22 +91,12 @@ def get_attendance(employee_id: int, start_date: date, end_date: date):
 
 # ✅ Company Daily Attendance Table
 @router.get("/company")
-def company_attendance(date_: date = Query(default=date.today())):
-    conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    cur.execute("""
-        SELECT a.*, e.first_name, e.last_name, e.department
-        FROM attendance a
-        JOIN employees e ON e.employee_id = a.employee_id
-        WHERE a.date = %s
-        ORDER BY e.first_name;
-    """, (date_,))
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return rows
+@read_only
+def company_attendance(date_: date = Query(default=date.today()),
+                       stream: StreamFormat = STREAM_QUERY):
+    if stream:
+        return stream_rows(AttendanceDB.iter_company_attendance(date_), stream)
+    return RecordJSONResponse(AttendanceDB.get_company_attendance(date_))
 
 
 # ✅ Team Attendance (Manager View)
@@ -122,42 +120,20 @@ def team_attendance(manager_id: int, date_: date = Query(default=date.today())):
 
 # ✅ Late Report
 @router.get("/reports/late")
-def late_report(start_date: date, end_date: date):
-    conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    cur.execute("""
-        SELECT a.*, e.first_name, e.department
-        FROM attendance a
-        JOIN employees e ON e.employee_id = a.employee_id
-        WHERE a.is_late = TRUE
-          AND a.date BETWEEN %s AND %s;
-    """, (start_date, end_date))
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return rows
+@read_only
+def late_report(start_date: date, end_date: date, stream: StreamFormat = STREAM_QUERY):
+    if stream:
+        return stream_rows(AttendanceDB.iter_late_report(start_date, end_date), stream)
+    return RecordJSONResponse(AttendanceDB.get_late_report(start_date, end_date))
 
 
 # ✅ Overtime Report
 @router.get("/reports/overtime")
-def overtime_report(start_date: date, end_date: date):
-    conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    cur.execute("""
-        SELECT a.*, e.first_name
-        FROM attendance a
-        JOIN employees e ON e.employee_id = a.employee_id
-        WHERE a.is_overtime = TRUE
-          AND a.date BETWEEN %s AND %s;
-    """, (start_date, end_date))
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return rows
+@read_only
+def overtime_report(start_date: date, end_date: date, stream: StreamFormat = STREAM_QUERY):
+    if stream:
+        return stream_rows(AttendanceDB.iter_overtime_report(start_date, end_date), stream)
+    return RecordJSONResponse(AttendanceDB.get_overtime_report(start_date, end_date))
 
 
 # ============================
@@ -166,7 +142,7 @@ def overtime_report(start_date: date, end_date: date):
 
 @router.get("/logs/{employee_id}")
 def attendance_logs(employee_id: int):
-    return AttendanceEventDB.get_all_events_for_employee(employee_id)
+    return RecordJSONResponse(AttendanceEventDB.get_all_events_for_employee(employee_id))
 
 
 # ============================
@@ -202,6 +178,9 @@ def unlock_attendance(employee_id: int, dt: date):
         WHERE employee_id = %s AND date = %s;
     """, (employee_id, dt))
 
+    # Payroll locks by period: open the employee's month (NOTIFY included)
+    AttendanceLockDB.set_employees([employee_id], dt.year, dt.month, False, conn=conn)
+
     conn.commit()
     cur.close()
     conn.close()
@@ -227,6 +206,10 @@ def override_attendance(employee_id: int, dt: date, payload: AttendanceOverride)
         if check_out and len(check_out) == 5:  # "18:00"
             check_out = f"{dt} {check_out}:00"
 
+        # Period lock (cached); the row flag below covers per-day admin locks
+        if AttendanceLockDB.is_locked(employee_id, dt, conn=conn):
+            raise HTTPException(status_code=400, detail="Attendance is locked for payroll")
+
         cur.execute("""
             UPDATE attendance
             SET check_in = COALESCE(%s, check_in),
@@ -254,6 +237,9 @@ def override_attendance(employee_id: int, dt: date, payload: AttendanceOverride)
                 detail="Attendance is locked or record not found"
             )
 
+        # Payroll for this month must be recomputed
+        PayrollDirtyDB.mark(employee_id, dt.year, dt.month, "override", conn=conn)
+
         conn.commit()
         return {
             "message": "Attendance overridden successfully",
@@ -301,38 +287,28 @@ def calendar_attendance(
     start_date: date,
     end_date: date
 ):
-    return AttendanceDB.get_attendance_range(
+    return RecordJSONResponse(AttendanceDB.get_attendance_range(
         employee_id, start_date, end_date
-    )
+    ))
 
 
 
 @router.get("/locked/{employee_id}")
-def locked_attendance(employee_id: int):
-    conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    cur.execute("""
-        SELECT *
-        FROM attendance
-        WHERE employee_id = %s
-          AND is_payroll_locked = TRUE
-        ORDER BY date DESC;
-    """, (employee_id,))
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return rows
+def locked_attendance(employee_id: int, stream: StreamFormat = STREAM_QUERY):
+    if stream:
+        return stream_rows(AttendanceDB.iter_locked_attendance(employee_id), stream)
+    return RecordJSONResponse(AttendanceDB.get_locked_attendance(employee_id))
 
 @router.post("/recalculate/{employee_id}")
-def recalc_attendance(employee_id: int, dt: date):
-    AttendanceService.recalculate_for_date(employee_id, dt)
+def recalc_attendance(employee_id: int, dt: date, conn=Depends(get_db)):
+    AttendanceService.recalculate_for_date(employee_id, dt, conn=conn)
     return {"message": "Attendance recalculated"}
 
 
 @router.get("/is-locked/{employee_id}")
 def is_locked(employee_id: int, dt: date):
+    if AttendanceLockDB.is_locked(employee_id, dt):
+        return {"is_locked": True}
     data = AttendanceDB.get_by_employee_and_date(employee_id, dt)
     return {
         "is_locked": bool(data and data.get("is_payroll_locked", False))
@@ -360,33 +336,38 @@ async def biometric_attendance(
         "biometric_ts": ts.isoformat()
     }
 
-    # 1️⃣ Fetch today's events
     today = ts.date()
-    events = AttendanceEventDB.get_events_for_window(
-        employee_id,
-        datetime(today.year, today.month, today.day),
-        ts,
-    )
 
     try:
-        if not events:
-            action = "check_in"
-            result = AttendanceService.check_in(employee_id, "biometric", meta)
+        # One async connection + transaction for the whole punch
+        async with async_db_transaction() as conn:
+
+            # 1️⃣ Fetch today's events
+            events = await AsyncAttendanceEventDB.get_events_for_window(
+                conn,
+                employee_id,
+                datetime(today.year, today.month, today.day),
+                ts,
+            )
 
-        else:
-            last = events[-1]["event_type"]
+            if not events:
+                action = "check_in"
+                result = await AsyncAttendanceService.check_in(conn, employee_id, "biometric", meta)
 
-            if last == "check_in":
-                action = "break_start"
-                result = AttendanceService.break_start(employee_id, "biometric", meta)
+            else:
+                last = events[-1]["event_type"]
 
-            elif last == "break_start":
-                action = "break_end"
-                result = AttendanceService.break_end(employee_id, "biometric", meta)
+                if last == "check_in":
+                    action = "break_start"
+                    result = await AsyncAttendanceService.break_start(conn, employee_id, "biometric", meta)
 
-            else:
-                action = "check_out"
-                result = AttendanceService.check_out(employee_id, "biometric", meta)
+                elif last == "break_start":
+                    action = "break_end"
+                    result = await AsyncAttendanceService.break_end(conn, employee_id, "biometric", meta)
+
+                else:
+                    action = "check_out"
+                    result = await AsyncAttendanceService.check_out(conn, employee_id, "biometric", meta)
 
     except Exception as e:
         raise HTTPException(400, str(e))
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from datetime import date
 from typing import Optional, Dict
 from psycopg2.extras import RealDictCursor
 
 from app.services.attendence_services import AttendanceService
-from app.database.connection import get_connection
+from app.database.connection import get_connection, get_db
+from app.database.payroll import AttendanceLockDB
+from app.database.payroll_dirty import PayrollDirtyDB
 
 router = APIRouter(prefix="/hrms/attendance", tags=["Attendance - Actions"])
 
@@ -28,23 +30,23 @@ class AttendanceOverride(BaseModel):
 # -----------------------
 
 @router.post("/check-in")
-def check_in(payload: AttendanceAction):
-    return AttendanceService.check_in(payload.employee_id, payload.source, payload.meta)
+def check_in(payload: AttendanceAction, conn=Depends(get_db)):
+    return AttendanceService.check_in(payload.employee_id, payload.source, payload.meta, conn=conn)
 
 
 @router.post("/check-out")
-def check_out(payload: AttendanceAction):
-    return AttendanceService.check_out(payload.employee_id, payload.source, payload.meta)
+def check_out(payload: AttendanceAction, conn=Depends(get_db)):
+    return AttendanceService.check_out(payload.employee_id, payload.source, payload.meta, conn=conn)
 
 
 @router.post("/break/start")
-def break_start(payload: AttendanceAction):
-    return AttendanceService.break_start(payload.employee_id, payload.source, payload.meta)
+def break_start(payload: AttendanceAction, conn=Depends(get_db)):
+    return AttendanceService.break_start(payload.employee_id, payload.source, payload.meta, conn=conn)
 
 
 @router.post("/break/end")
-def break_end(payload: AttendanceAction):
-    return AttendanceService.break_end(payload.employee_id, payload.source, payload.meta)
+def break_end(payload: AttendanceAction, conn=Depends(get_db)):
+    return AttendanceService.break_end(payload.employee_id, payload.source, payload.meta, conn=conn)
 
 
 # -----------------------
@@ -79,6 +81,9 @@ def unlock_attendance(employee_id: int, dt: date):
         WHERE employee_id = %s AND date = %s;
     """, (employee_id, dt))
 
+    # Payroll locks by period: open the employee's month (NOTIFY included)
+    AttendanceLockDB.set_employees([employee_id], dt.year, dt.month, False, conn=conn)
+
     conn.commit()
     cur.close()
     conn.close()
@@ -104,6 +109,10 @@ def override_attendance(employee_id: int, dt: date, payload: AttendanceOverride)
         if check_out and len(check_out) == 5:
             check_out = f"{dt} {check_out}:00"
 
+        # Period lock (cached); the row flag below covers per-day admin locks
+        if AttendanceLockDB.is_locked(employee_id, dt, conn=conn):
+            raise HTTPException(status_code=400, detail="Attendance is locked for payroll")
+
         cur.execute("""
             UPDATE attendance
             SET check_in = COALESCE(%s, check_in),
@@ -131,6 +140,9 @@ def override_attendance(employee_id: int, dt: date, payload: AttendanceOverride)
                 detail="Attendance is locked or record not found"
             )
 
+        # Payroll for this month must be recomputed
+        PayrollDirtyDB.mark(employee_id, dt.year, dt.month, "override", conn=conn)
+
         conn.commit()
         return {"message": "Attendance overridden successfully", "updated": row}
 
@@ -150,6 +162,6 @@ def override_attendance(employee_id: int, dt: date, payload: AttendanceOverride)
 # -----------------------
 
 @router.post("/recalculate/{employee_id}")
-def recalc_attendance(employee_id: int, dt: date):
-    AttendanceService.recalculate_for_date(employee_id, dt)
+def recalc_attendance(employee_id: int, dt: date, conn=Depends(get_db)):
+    AttendanceService.recalculate_for_date(employee_id, dt, conn=conn)
     return {"message": "Attendance recalculated"}
@@ -4,6 +4,7 @@ from app.database.attendence import AttendanceDB
 from app.database.employee_shift_db import EmployeeShiftDB
 from app.database.employee_db import EmployeeDB
 from app.database.shifts_db import ShiftDB
+from app.database.connection import read_only
 router = APIRouter(prefix="/hrms", tags=["Dashboard Stats"])
 
 
@@ -11,6 +12,7 @@ router = APIRouter(prefix="/hrms", tags=["Dashboard Stats"])
 # 🔹 1. GLOBAL ATTENDANCE STATS (Today)
 # ============================================================
 @router.get("/dashboard/today-stats")
+@read_only
 def today_stats():
     today = date.today()
     employees = EmployeeDB.get_all()
@@ -53,6 +55,7 @@ def today_stats():
 # 🔹 2. EMPLOYEE-WISE TODAY ATTENDANCE TABLE
 # ============================================================
 @router.get("/attendance/today")
+@read_only
 def today_attendance_table():
     today = date.today()
     employees = EmployeeDB.get_all()
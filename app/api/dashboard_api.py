@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from datetime import date
-from app.database.connection import get_connection
+from app.database.connection import get_connection, read_only
 
 router = APIRouter(prefix="/hrms/admin/dashboard", tags=["Admin Dashboard"])
 
@@ -32,6 +32,7 @@ def fetch_all(sql, params=None):
 # ✅ ✅ ✅ SINGLE DASHBOARD API (FRONTEND LOADS THIS ONLY)
 # ------------------------------------------------------------
 @router.get("/overview")
+@read_only
 def dashboard_overview():
     today = date.today()
 
@@ -8,7 +8,10 @@ from app.database.employee_db import EmployeeDB
 from app.database.employee_shift_db import EmployeeShiftDB
 from app.database.salary import SalaryDB
 from app.database.payroll import PayrollDB
-from app.database.connection import get_connection
+from app.database.payroll_ledger import PayrollLedgerDB, current_fiscal_year
+from app.database.connection import get_connection, read_only
+from app.database.records import RecordCursor
+from app.api.streaming import RecordJSONResponse
 from psycopg2.extras import RealDictCursor
 from app.database.leave_database import (
     LeaveTypeDB,
@@ -33,6 +36,7 @@ class ManagerUpdate(BaseModel):
 # ✅ 1️⃣ EMPLOYEE BASIC PROFILE
 # ============================================================
 @router.get("/employee/{employee_id}")
+@read_only
 def employee_profile(employee_id: int):
     emp = EmployeeDB.get_one(employee_id)
 
@@ -46,6 +50,7 @@ def employee_profile(employee_id: int):
 # ✅ 1.1 GET ALL EMPLOYEES (WITH PAGINATION ✅)
 # ============================================================
 @router.get("/employees")
+@read_only
 def get_employees(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100)
@@ -70,6 +75,7 @@ def get_employees(
 # ✅ 1.2 GET ALL MANAGERS
 # ============================================================
 @router.get("/employees/managers")
+@read_only
 def get_managers():
     return EmployeeDB.get_all_managers()
 
@@ -104,6 +110,7 @@ def assign_manager(employee_id: int, req: ManagerUpdate):
 # ✅ 2️⃣ CURRENT SHIFT DETAILS (SAFE ✅)
 # ============================================================
 @router.get("/employee/{employee_id}/shift")
+@read_only
 def employee_shift(employee_id: int):
     shift = EmployeeShiftDB.get_current_shift(employee_id)
     if not shift:
@@ -115,6 +122,7 @@ def employee_shift(employee_id: int):
 # ✅ 3️⃣ ATTENDANCE SUMMARY
 # ============================================================
 @router.get("/employee/{employee_id}/attendance-summary")
+@read_only
 def attendance_summary(employee_id: int):
     all_att = AttendanceDB.get_attendance(employee_id)
 
@@ -138,6 +146,7 @@ def attendance_summary(employee_id: int):
 # ✅ 4️⃣ LATE + OVERTIME SUMMARY (SAFE ✅)
 # ============================================================
 @router.get("/employee/{employee_id}/time-summary")
+@read_only
 def time_summary(employee_id: int):
     shift = EmployeeShiftDB.get_current_shift(employee_id)
     if not shift:
@@ -176,6 +185,7 @@ def time_summary(employee_id: int):
 # ✅ 5️⃣ RECENT ATTENDANCE EVENTS
 # ============================================================
 @router.get("/employee/{employee_id}/events")
+@read_only
 def employee_events(employee_id: int):
     events = AttendanceEventDB.get_all_events_for_employee(employee_id)
     return events[:20]
@@ -185,6 +195,7 @@ def employee_events(employee_id: int):
 # ✅ 6️⃣ SALARY STRUCTURE
 # ============================================================
 @router.get("/employee/{employee_id}/salary")
+@read_only
 def employee_salary(employee_id: int):
     salary = SalaryDB.get_salary_structure(employee_id)
     if not salary:
@@ -196,6 +207,7 @@ def employee_salary(employee_id: int):
 # ✅ 7️⃣ LATEST PAYROLL
 # ============================================================
 @router.get("/employee/{employee_id}/payroll/latest")
+@read_only
 def latest_payroll(employee_id: int):
     today = date.today()
     payroll = PayrollDB.get_payroll(employee_id, today.month, today.year)
@@ -205,32 +217,40 @@ def latest_payroll(employee_id: int):
 
 
 # ============================================================
-# ✅ 8️⃣ PAYROLL HISTORY (6 MONTHS ✅)
+# ✅ 8️⃣ PAYROLL HISTORY (LAST N MONTHS, ONE RANGE QUERY ✅)
 # ============================================================
 @router.get("/employee/{employee_id}/payroll-history")
-def payroll_history(employee_id: int):
-    today = date.today()
-    history = []
+@read_only
+def payroll_history(employee_id: int, months: int = Query(6, ge=1, le=120)):
+    return RecordJSONResponse(PayrollLedgerDB.get_history(employee_id, months))
+
 
-    for i in range(6):
-        month = today.month - i
-        year = today.year
+# ============================================================
+# ✅ 8️⃣.1 YEAR-TO-DATE PAYROLL (LEDGER)
+# ============================================================
+@router.get("/employee/{employee_id}/payroll-ytd")
+@read_only
+def payroll_ytd(employee_id: int, fiscal_year: Optional[int] = Query(None)):
+    fy = fiscal_year if fiscal_year is not None else current_fiscal_year()
 
-        if month <= 0:
-            month += 12
-            year -= 1
+    ytd = PayrollLedgerDB.get_ytd(employee_id, fy)
+    if not ytd:
+        raise HTTPException(status_code=404, detail=f"No payroll in financial year {fy}")
+    return ytd
 
-        payroll = PayrollDB.get_payroll(employee_id, month, year)
-        if payroll:
-            history.append(payroll)
 
-    return history
+@router.get("/employee/{employee_id}/annual-statement")
+@read_only
+def annual_statement(employee_id: int, fiscal_year: Optional[int] = Query(None)):
+    fy = fiscal_year if fiscal_year is not None else current_fiscal_year()
+    return PayrollLedgerDB.get_statement(employee_id, fy)
 
 
 # ============================================================
 # ✅ 9️⃣ FULL EMPLOYEE DASHBOARD (SAFE ✅)
 # ============================================================
 @router.get("/employee/{employee_id}/full-details")
+@read_only
 def full_employee_details(employee_id: int):
 
     emp = EmployeeDB.get_one(employee_id)
@@ -245,13 +265,14 @@ def full_employee_details(employee_id: int):
         "events": employee_events(employee_id),
         "salary_structure": employee_salary(employee_id),
         "latest_payroll": latest_payroll(employee_id),
-        "payroll_history": payroll_history(employee_id)
+        "payroll_history": PayrollLedgerDB.get_history(employee_id, 6)
     }
 
 
 
 
 @router.get("/employees/ui")
+@read_only
 def employees_for_ui(
     search: Optional[str] = Query(None),
     department: Optional[str] = Query(None),
@@ -304,6 +325,7 @@ def employees_for_ui(
 
 
 @router.get("/employee/{employee_id}/leaves")
+@read_only
 def employee_leaves(employee_id: int):
     conn = get_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -325,9 +347,10 @@ def employee_leaves(employee_id: int):
 
 
 @router.get("/payroll/ui-list")
+@read_only
 def payroll_ui_list(month: int, year: int):
     conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur = conn.cursor(cursor_factory=RecordCursor)
 
     cur.execute("""
         SELECT 
@@ -346,13 +369,14 @@ def payroll_ui_list(month: int, year: int):
     rows = cur.fetchall()
     cur.close()
     conn.close()
-    return rows
+    return RecordJSONResponse(rows)
 
 
 # ============================================================
 # ✅ 10️⃣ EMPLOYEE LEAVE BALANCE (UI FRIENDLY ✅)
 # ============================================================
 @router.get("/employee/{employee_id}/leave-balance")
+@read_only
 def leave_balance(employee_id: int):
     try:
         conn = get_connection()
@@ -4,8 +4,9 @@ from datetime import datetime, date
 import httpx
 
 from app.services.attendence_services import AttendanceService
-from app.database.attendence import AttendanceEventDB
-from app.database.attendence import ShiftDB
+from app.services.attendence_async_services import AsyncAttendanceService
+from app.database.async_connection import async_db_transaction
+from app.database.attendence_async import AsyncAttendanceEventDB, AsyncShiftDB
 
 
 router = APIRouter(prefix="/faces", tags=["Faces"])
@@ -121,19 +122,13 @@ async def face_attendance(
 
     employee_id = results[0]["subjects"][0]["subject"]
 
-    # 3️⃣ SESSION-AWARE EVENT FETCH (FIX)
-    today = date.today()
-
-    shift = ShiftDB.get_employee_shift(employee_id, today)
-    window_start, window_end, _, _, _ = AttendanceService._get_shift_window(
-        shift, today
-    )
-
-    events = AttendanceEventDB.get_events_for_window(
-        employee_id,
-        window_start,
-        datetime.now(),
-    )
+    try:
+        employee_id = int(employee_id)
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Recognized subject is not an employee id: {employee_id}",
+        )
 
     meta = {
         "latitude": latitude,
@@ -141,42 +136,64 @@ async def face_attendance(
         "method": "face",
     }
 
-    # 4️⃣ Decide attendance action (NOW CORRECT)
+    today = date.today()
+
     try:
-        if not events:
-            action = "check_in"
-            result = AttendanceService.check_in(
-                employee_id,
-                source="face",
-                meta=meta,
-            )
+        # One async connection + transaction for the whole punch
+        async with async_db_transaction() as conn:
 
-        else:
-            last_event = events[-1]["event_type"]
+            # 3️⃣ SESSION-AWARE EVENT FETCH (FIX)
+            shift = await AsyncShiftDB.get_employee_shift(conn, employee_id, today)
+            window_start, window_end, _, _, _ = AttendanceService._get_shift_window(
+                shift, today
+            )
 
-            if last_event == "check_in":
-                action = "break_start"
-                result = AttendanceService.break_start(
-                    employee_id,
-                    source="face",
-                    meta=meta,
-                )
+            events = await AsyncAttendanceEventDB.get_events_for_window(
+                conn,
+                employee_id,
+                window_start,
+                datetime.now(),
+            )
 
-            elif last_event == "break_start":
-                action = "break_end"
-                result = AttendanceService.break_end(
+            # 4️⃣ Decide attendance action (NOW CORRECT)
+            if not events:
+                action = "check_in"
+                result = await AsyncAttendanceService.check_in(
+                    conn,
                     employee_id,
                     source="face",
                     meta=meta,
                 )
 
             else:
-                action = "check_out"
-                result = AttendanceService.check_out(
-                    employee_id,
-                    source="face",
-                    meta=meta,
-                )
+                last_event = events[-1]["event_type"]
+
+                if last_event == "check_in":
+                    action = "break_start"
+                    result = await AsyncAttendanceService.break_start(
+                        conn,
+                        employee_id,
+                        source="face",
+                        meta=meta,
+                    )
+
+                elif last_event == "break_start":
+                    action = "break_end"
+                    result = await AsyncAttendanceService.break_end(
+                        conn,
+                        employee_id,
+                        source="face",
+                        meta=meta,
+                    )
+
+                else:
+                    action = "check_out"
+                    result = await AsyncAttendanceService.check_out(
+                        conn,
+                        employee_id,
+                        source="face",
+                        meta=meta,
+                    )
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -13,6 +13,8 @@ from app.database.leave_database import (
     EmployeeSalaryDB,
 )
 
+from app.api.streaming import STREAM_QUERY, StreamFormat, stream_rows
+
 # ✅ IMPORT WORKFLOW ENGINE
 from app.database import workflow_database as workflow_db
 
@@ -138,7 +140,9 @@ def apply_leave(req: Dict[str, Any]):
 # ============================================================
 
 @router.get("/requests")
-def get_all_requests():
+def get_all_requests(stream: StreamFormat = STREAM_QUERY):
+    if stream:
+        return stream_rows(LeaveRequestDB.iter_requests(), stream)
     return LeaveRequestDB.list_requests()
 
 
@@ -148,7 +152,9 @@ def get_pending_requests():
 
 
 @router.get("/requests/{employee_id}")
-def get_employee_requests(employee_id: int):
+def get_employee_requests(employee_id: int, stream: StreamFormat = STREAM_QUERY):
+    if stream:
+        return stream_rows(LeaveRequestDB.iter_requests(employee_id), stream)
     return LeaveRequestDB.list_requests(employee_id)
 
 
@@ -1,4 +1,7 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from app.api.dashboard_api import router as dashboard_router
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,15 +16,91 @@ from app.api.attendence_dashboard import router as attendence_dashboard_router
 from app.api.attendence_api.attendence_actions_api import router as attendence_actions_router
 from app.api.attendence_api.attendence_display import router as attendence_display_router
 from app.api.face_recognition import router as face_recognition_router
-app = FastAPI()
+from app.api.analytics_export import router as analytics_export_router
+from app.database.connection import (
+    READ_YOUR_WRITES_SECONDS,
+    close_pool,
+    get_pool,
+    primary_reads,
+    replica_configured,
+)
+from app.database.async_connection import close_async_pool
+from app.database.partitions import maintain_partitions
+from app.database.payroll import start_change_listener, stop_change_listener
+from app.database.query_stats import track_queries
+from app.services import payroll_run_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the shared DB pool before the first punch arrives
+    get_pool()
+    # Keep next months' attendance partitions in place
+    maintain_partitions()
+    # Drop the cached payroll policy when another worker changes it
+    start_change_listener()
+    # Background executor for POST /hrms/payroll/runs
+    if payroll_run_service.WORKER_ENABLED:
+        payroll_run_service.start_worker()
+    yield
+    payroll_run_service.stop_worker()
+    stop_change_listener()
+    close_pool()
+    await close_async_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],        # Allow all frontends (React, mobile, etc.)
     allow_credentials=True,
     allow_methods=["*"],        # GET, POST, PUT, DELETE
     allow_headers=["*"],        # Authorization, Content-Type, etc.
+    expose_headers=["X-DB-Queries", "X-DB-Time-ms"],
 )
 
+
+@app.middleware("http")
+async def db_query_accounting(request: Request, call_next):
+    # Count / time every SQL statement this request runs and flag N+1 loops
+    with track_queries(f"{request.method} {request.url.path}") as stats:
+        response = await call_next(request)
+
+    response.headers.update(stats.headers())
+    stats.log()
+    return response
+
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+LAST_WRITE_COOKIE = "hrms_last_write"
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    # Clients that wrote in the last few seconds (cookie) or ask for it
+    # explicitly (X-Read-Primary: 1) read from the primary, not the replica
+    if not replica_configured():
+        return await call_next(request)
+
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, 0))
+    except ValueError:
+        last_write = 0.0
+    recent = time.time() - last_write < READ_YOUR_WRITES_SECONDS
+
+    if recent or request.headers.get("X-Read-Primary") == "1":
+        with primary_reads():
+            response = await call_next(request)
+    else:
+        response = await call_next(request)
+
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            LAST_WRITE_COOKIE, f"{time.time():.3f}",
+            max_age=max(1, int(READ_YOUR_WRITES_SECONDS)), httponly=True,
+        )
+    return response
+
 app.include_router(dashboard_router)
 app.include_router(shifts_router)
 app.include_router(leave_router)
@@ -34,4 +113,5 @@ app.include_router(settings_router)
 app.include_router(attendence_actions_router)
 app.include_router(attendence_display_router)
 app.include_router(face_recognition_router)
+app.include_router(analytics_export_router)
 
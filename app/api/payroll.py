@@ -1,12 +1,25 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from psycopg2.extras import RealDictCursor
 
 from app.services.payroll_service import PayrollService
+from app.services.payroll_bulk_service import BulkPayrollService
+from app.services.payroll_parallel_service import PARTITION_STRATEGIES, ParallelPayrollService
+from app.services.payroll_simulation_service import PayrollSimulationService
+from app.services.payroll_run_service import PayrollRunService, wake_worker
+from app.services.payroll_export_service import PayrollExportService
 from app.database.payroll import PayrollDB
 from app.database.payroll import PayrollPolicyDB
-from app.database.connection import get_connection
+from app.database.payroll import PayrollLockDB
+from app.database.payroll import AttendanceLockDB
+from app.database.payroll_compare import COMPARED_COMPONENTS, PayrollCompareDB
+from app.database.payroll_dirty import PayrollDirtyDB
+from app.database.payroll_runs import PayrollRunDB
+from app.database.connection import get_connection, get_db, read_only
+from app.database.records import RecordCursor
+from app.api.streaming import RecordJSONResponse
 
 router = APIRouter(prefix="/hrms/payroll", tags=["Payroll"])
 
@@ -42,113 +55,64 @@ class PayrollBulkGenerateRequest(BaseModel):
     month: int
 
 
-class PayrollLockRequest(BaseModel):
+class PayrollRegenerateRequest(BaseModel):
     year: int
     month: int
-    lock: bool  # True = lock, False = unlock
+    employee_id: Optional[int] = None
+    incremental: bool = False              # recompute only dirty employees
 
 
-# ============================================================
-# ✅ INTERNAL HELPERS – PAYROLL LOCK
-# ============================================================
+class PayrollParallelGenerateRequest(BaseModel):
+    year: int
+    month: int
+    workers: Optional[int] = None          # default HRMS_PAYROLL_WORKERS / cpu count
+    partition_by: Optional[str] = None     # "range" (default) | "department"
 
-def _ensure_payroll_lock_table():
-    """
-    Ensure payroll_lock table exists.
-    Minimal, safe, idempotent.
-    """
-    conn = get_connection()
-    cur = conn.cursor()
 
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS payroll_lock (
-            id SERIAL PRIMARY KEY,
-            year INT NOT NULL,
-            month INT NOT NULL,
-            is_locked BOOLEAN NOT NULL DEFAULT FALSE,
-            locked_at TIMESTAMP,
-            UNIQUE (year, month)
-        );
-    """)
+class PayrollPolicyVariant(BaseModel):
+    name: Optional[str] = None
+    late_grace_minutes: Optional[int] = None
+    late_lop_threshold_minutes: Optional[int] = None
+    early_exit_grace_minutes: Optional[int] = None
+    early_exit_lop_threshold_minutes: Optional[int] = None
+    overtime_enabled: Optional[bool] = None
+    overtime_multiplier: Optional[float] = None
+    holiday_double_pay: Optional[bool] = None
+    weekend_paid_only_if_worked: Optional[bool] = None
+    night_shift_allowance: Optional[float] = None
 
-    conn.commit()
-    cur.close()
-    conn.close()
 
+class PayrollSimulationRequest(BaseModel):
+    year: int
+    month: int
+    variants: List[PayrollPolicyVariant]   # fields left out keep the active policy's value
+    include_employees: bool = True
 
-def _is_period_locked(year: int, month: int) -> bool:
-    _ensure_payroll_lock_table()
-
-    conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
 
-    cur.execute("""
-        SELECT is_locked
-        FROM payroll_lock
-        WHERE year = %s AND month = %s;
-    """, (year, month))
+class PayrollLockRequest(BaseModel):
+    year: int
+    month: int
+    lock: bool  # True = lock, False = unlock
 
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
 
-    if not row:
-        return False
+# ============================================================
+# ✅ INTERNAL HELPERS – PAYROLL LOCK
+# (table comes from migration 0011; state is served from PayrollLockDB's cache)
+# ============================================================
 
-    return bool(row["is_locked"])
+def _is_period_locked(year: int, month: int, conn=None) -> bool:
+    return PayrollLockDB.is_locked(year, month, conn=conn)
 
 
 def _set_period_lock(year: int, month: int, lock: bool):
-    _ensure_payroll_lock_table()
-
-    conn = get_connection()
-    cur = conn.cursor()
-
-    if lock:
-        cur.execute("""
-            INSERT INTO payroll_lock (year, month, is_locked, locked_at)
-            VALUES (%s, %s, TRUE, NOW())
-            ON CONFLICT (year, month)
-            DO UPDATE SET is_locked = TRUE, locked_at = NOW();
-        """, (year, month))
-    else:
-        cur.execute("""
-            INSERT INTO payroll_lock (year, month, is_locked, locked_at)
-            VALUES (%s, %s, FALSE, NULL)
-            ON CONFLICT (year, month)
-            DO UPDATE SET is_locked = FALSE, locked_at = NULL;
-        """, (year, month))
-
-    conn.commit()
-    cur.close()
-    conn.close()
+    PayrollLockDB.set_lock(year, month, lock)
+    if not lock:
+        # Reopen the attendance payroll locked for this month as well
+        AttendanceLockDB.unlock_period(year, month)
 
 
 def _get_period_lock_status(year: int, month: int):
-    _ensure_payroll_lock_table()
-
-    conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    cur.execute("""
-        SELECT year, month, is_locked, locked_at
-        FROM payroll_lock
-        WHERE year = %s AND month = %s;
-    """, (year, month))
-
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-
-    if not row:
-        return {
-            "year": year,
-            "month": month,
-            "is_locked": False,
-            "locked_at": None
-        }
-
-    return row
+    return PayrollLockDB.get_status(year, month)
 
 
 # ============================================================
@@ -173,6 +137,32 @@ def update_policy(payload: PayrollPolicyUpdate):
     return updated
 
 
+# ============================================================
+# ✅ 0️⃣ WHAT-IF POLICY SIMULATION (NO WRITES)
+# ============================================================
+
+@router.post("/policy/simulate")
+@read_only
+def simulate_policy(payload: PayrollSimulationRequest):
+    """
+    Old vs new payroll per employee, per department and company-wide for
+    one or more candidate policies. Nothing is written; update the real
+    policy with PUT /policy.
+    """
+    if not payload.variants:
+        raise HTTPException(status_code=400, detail="At least one policy variant is required")
+
+    try:
+        return PayrollSimulationService.simulate(
+            payload.year,
+            payload.month,
+            [v.dict() for v in payload.variants],
+            include_employees=payload.include_employees,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 # ============================================================
 # ✅ 🔹 NEW: ACTIVE EMPLOYEES LIST FOR PAYROLL UI
 # ============================================================
@@ -217,6 +207,7 @@ def lock_or_unlock_payroll(payload: PayrollLockRequest):
       - /generate-bulk
       - /regenerate
     will all refuse to modify that period.
+    Unlocking also reopens the month's payroll-locked attendance.
     """
     _set_period_lock(payload.year, payload.month, payload.lock)
 
@@ -264,48 +255,20 @@ def generate_payroll(payload: PayrollGenerateRequest):
 # ============================================================
 
 @router.post("/generate-bulk")
-def generate_bulk_payroll(payload: PayrollBulkGenerateRequest):
+def generate_bulk_payroll(payload: PayrollBulkGenerateRequest, conn=Depends(get_db)):
     # 🔒 Block if period is locked
-    if _is_period_locked(payload.year, payload.month):
+    if _is_period_locked(payload.year, payload.month, conn=conn):
         raise HTTPException(
             status_code=400,
             detail=f"Payroll is locked for {payload.year}-{payload.month}. Unlock to regenerate."
         )
 
-    conn = get_connection()
-    cur = conn.cursor()
+    # Set-based engine: a handful of queries for the whole company
+    results = BulkPayrollService.generate(payload.year, payload.month, conn=conn)
 
-    cur.execute("SELECT employee_id FROM employees WHERE status = 'active';")
-    employees = cur.fetchall()
-
-    cur.close()
-    conn.close()
-
-    if not employees:
+    if not results:
         raise HTTPException(status_code=404, detail="No active employees found")
 
-    results = []
-
-    for emp in employees:
-        emp_id = emp[0]
-        try:
-            payroll = PayrollService.generate_for_employee(
-                employee_id=emp_id,
-                year=payload.year,
-                month=payload.month
-            )
-            results.append({
-                "employee_id": emp_id,
-                "status": "success",
-                "payroll": payroll["payroll"]
-            })
-        except Exception as e:
-            results.append({
-                "employee_id": emp_id,
-                "status": "failed",
-                "error": str(e)
-            })
-
     return {
         "year": payload.year,
         "month": payload.month,
@@ -313,15 +276,241 @@ def generate_bulk_payroll(payload: PayrollBulkGenerateRequest):
     }
 
 
+# ============================================================
+# ✅ 2️⃣a PARALLEL BULK PAYROLL (ONE PROCESS PER PARTITION)
+# ============================================================
+
+@router.post("/generate-parallel")
+def generate_parallel_payroll(payload: PayrollParallelGenerateRequest):
+    # 🔒 Block if period is locked
+    if _is_period_locked(payload.year, payload.month):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Payroll is locked for {payload.year}-{payload.month}. Unlock to regenerate."
+        )
+
+    if payload.partition_by and payload.partition_by not in PARTITION_STRATEGIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"partition_by must be one of {', '.join(PARTITION_STRATEGIES)}"
+        )
+
+    try:
+        report = ParallelPayrollService.generate(
+            payload.year,
+            payload.month,
+            workers=payload.workers,
+            partition_by=payload.partition_by,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if not report["results"]:
+        raise HTTPException(status_code=404, detail="No active employees found")
+
+    return report
+
+
+# ============================================================
+# ✅ 2️⃣b PAYROLL RUN JOBS (ASYNC BULK PAYROLL)
+# POST returns a run_id at once; a background worker processes the
+# employees in checkpointed batches
+# ============================================================
+
+@router.post("/runs", status_code=202)
+def start_payroll_run(payload: PayrollBulkGenerateRequest):
+    # 🔒 Block if period is locked
+    if _is_period_locked(payload.year, payload.month):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Payroll is locked for {payload.year}-{payload.month}. Unlock to regenerate."
+        )
+
+    run = PayrollRunService.start(payload.year, payload.month)
+    wake_worker()
+    return run
+
+
+@router.get("/runs/{run_id}")
+def get_payroll_run(run_id: int):
+    run = PayrollRunService.status(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    return run
+
+
+@router.get("/runs/{run_id}/failures")
+def get_payroll_run_failures(
+    run_id: int,
+    limit: int = Query(500, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
+):
+    if not PayrollRunDB.get_run(run_id):
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    return PayrollRunDB.get_failures(run_id, limit=limit, offset=offset)
+
+
+@router.post("/runs/{run_id}/cancel")
+def cancel_payroll_run(run_id: int):
+    run = PayrollRunService.cancel(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    return run
+
+
+@router.post("/runs/{run_id}/resume")
+def resume_payroll_run(run_id: int, retry_failed: bool = Query(False)):
+    existing = PayrollRunDB.get_run(run_id)
+    if not existing:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+
+    if _is_period_locked(existing["year"], existing["month"]):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Payroll is locked for {existing['year']}-{existing['month']}. Unlock to regenerate."
+        )
+
+    run = PayrollRunService.resume(run_id, retry_failed=retry_failed)
+    if not run:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Payroll run {run_id} is {existing['status']}; only finished runs can be resumed"
+        )
+
+    wake_worker()
+    return run
+
+
+# ============================================================
+# ✅ 2️⃣c DIRTY EMPLOYEES (PENDING INCREMENTAL REGENERATION)
+# ⚠️ MUST COME BEFORE /{employee_id}
+# ============================================================
+
+@router.get("/dirty")
+def get_dirty_payroll(year: int = Query(...), month: int = Query(...)):
+    employee_ids = PayrollDirtyDB.get_dirty(year, month)
+    return {
+        "year": year,
+        "month": month,
+        "count": len(employee_ids),
+        "employee_ids": employee_ids,
+    }
+
+
+# ============================================================
+# ✅ 2️⃣d COMPARE TWO PAYROLL VERSIONS (RUN vs RUN, MONTH vs MONTH)
+# ⚠️ MUST COME BEFORE /{employee_id}
+# ============================================================
+
+@router.get("/compare")
+@read_only
+def compare_payroll(
+    year: Optional[int] = Query(None),
+    month: Optional[int] = Query(None, ge=1, le=12),
+    base_year: Optional[int] = Query(None),
+    base_month: Optional[int] = Query(None, ge=1, le=12),
+    run_id: Optional[int] = Query(None),
+    base_run_id: Optional[int] = Query(None),
+    components: Optional[List[str]] = Query(None),
+    min_delta: float = Query(0.01, ge=0),
+    min_pct: Optional[float] = Query(None, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Employees whose payroll changed between two versions, plus per
+    department totals. Defaults: a run is compared with the previous run
+    of its period, a month with the month before.
+    """
+    if run_id is not None:
+        if not PayrollRunDB.get_run(run_id):
+            raise HTTPException(status_code=404, detail="Payroll run not found")
+        if base_run_id is None:
+            previous = PayrollRunDB.get_previous_run(run_id)
+            if not previous:
+                raise HTTPException(status_code=404, detail=f"No earlier payroll run to compare run {run_id} with")
+            base_run_id = previous["run_id"]
+        target, base = {"run_id": run_id}, {"run_id": base_run_id}
+
+    elif year is not None and month is not None:
+        if base_year is None or base_month is None:
+            base_year, base_month = (year - 1, 12) if month == 1 else (year, month - 1)
+        target = {"year": year, "month": month}
+        base = {"year": base_year, "month": base_month}
+
+    else:
+        raise HTTPException(status_code=400, detail="Pass run_id, or year and month")
+
+    try:
+        result = PayrollCompareDB.compare(
+            base, target,
+            components=components or COMPARED_COMPONENTS,
+            min_delta=min_delta, min_pct=min_pct,
+            limit=limit, offset=offset,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "base": base,
+        "target": target,
+        "min_delta": min_delta,
+        "min_pct": min_pct,
+        **result,
+    }
+
+
+# ============================================================
+# ✅ MONTH-END EXPORTS (STREAMED)
+# ⚠️ MUST COME BEFORE /{employee_id}
+# ============================================================
+
+def _attachment(body, media_type: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/export/payslips")
+@read_only
+def export_payslips(year: int = Query(...), month: int = Query(..., ge=1, le=12)):
+    """Every payslip of the month as PDFs in one zip, built while it downloads."""
+    return _attachment(
+        PayrollExportService.payslips_zip(year, month),
+        "application/zip", f"payslips_{year}_{month:02d}.zip",
+    )
+
+
+@router.get("/export/bank-transfer")
+@read_only
+def export_bank_transfer(year: int = Query(...), month: int = Query(..., ge=1, le=12)):
+    return _attachment(
+        PayrollExportService.bank_transfer_csv(year, month),
+        "text/csv", f"bank_transfer_{year}_{month:02d}.csv",
+    )
+
+
+@router.get("/export/summary")
+@read_only
+def export_summary(year: int = Query(...), month: int = Query(..., ge=1, le=12)):
+    return _attachment(
+        PayrollExportService.summary_csv(year, month),
+        "text/csv", f"payroll_summary_{year}_{month:02d}.csv",
+    )
+
+
 # ============================================================
 # ✅ 3️⃣ MONTHLY PAYROLL LIST (ADMIN)
 # ⚠️ MUST COME BEFORE /{employee_id}
 # ============================================================
 
 @router.get("/month/list")
+@read_only
 def get_month_payroll(year: int = Query(...), month: int = Query(...)):
     conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur = conn.cursor(cursor_factory=RecordCursor)
 
     cur.execute("""
         SELECT 
@@ -339,7 +528,7 @@ def get_month_payroll(year: int = Query(...), month: int = Query(...)):
     cur.close()
     conn.close()
 
-    return rows
+    return RecordJSONResponse(rows)
 
 
 # ============================================================
@@ -363,19 +552,27 @@ def get_employee_payroll(
 # ============================================================
 
 @router.post("/regenerate")
-def regenerate_payroll(payload: PayrollGenerateRequest):
+def regenerate_payroll(payload: PayrollRegenerateRequest, conn=Depends(get_db)):
     # 🔒 Block if period is locked
-    if _is_period_locked(payload.year, payload.month):
+    if _is_period_locked(payload.year, payload.month, conn=conn):
         raise HTTPException(
             status_code=400,
             detail=f"Payroll is locked for {payload.year}-{payload.month}. Unlock to regenerate."
         )
 
+    # ⚡ Incremental: only employees whose inputs changed since the last run
+    if payload.incremental:
+        return BulkPayrollService.regenerate_dirty(payload.year, payload.month, conn=conn)
+
+    if payload.employee_id is None:
+        raise HTTPException(status_code=400, detail="employee_id is required unless incremental=true")
+
     try:
         return PayrollService.generate_for_employee(
             employee_id=payload.employee_id,
             year=payload.year,
-            month=payload.month
+            month=payload.month,
+            conn=conn,
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
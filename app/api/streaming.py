@@ -0,0 +1,50 @@
+# app/api/streaming.py
+from typing import Any, Iterable, Literal, Optional
+
+from fastapi import Query
+from fastapi.responses import Response, StreamingResponse
+
+from app.database.records import dumps
+
+# ?stream=ndjson → one JSON object per line
+# ?stream=json   → a single JSON array, sent in chunks
+StreamFormat = Optional[Literal["ndjson", "json"]]
+
+STREAM_QUERY = Query(
+    default=None,
+    description="Stream rows from a server-side cursor instead of buffering the whole list",
+)
+
+
+def _ndjson(rows: Iterable):
+    for row in rows:
+        yield dumps(row) + "\n"
+
+
+def _json_array(rows: Iterable):
+    yield "["
+    first = True
+    for row in rows:
+        yield ("" if first else ",") + dumps(row)
+        first = False
+    yield "]"
+
+
+def stream_rows(rows: Iterable, fmt: str) -> StreamingResponse:
+    """Wrap a row iterator (see app.database.streaming.iter_rows) in a response."""
+    if fmt == "ndjson":
+        return StreamingResponse(_ndjson(rows), media_type="application/x-ndjson")
+    return StreamingResponse(_json_array(rows), media_type="application/json")
+
+
+class RecordJSONResponse(Response):
+    """
+    JSON response for lists of app.database.records.Record rows.
+    Returning it skips jsonable_encoder, so rows are written straight
+    to JSON without an intermediate dict per row.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content).encode("utf-8")
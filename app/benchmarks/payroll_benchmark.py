@@ -0,0 +1,326 @@
+"""
+Payroll benchmark suite.
+
+Times every payroll engine against the synthetic organisation
+(app.data_seeder.synthetic_org) and writes a JSON report:
+
+    python -m app.benchmarks.payroll_benchmark --seed-org --size 10k --months 3 \\
+        --output bench/10k.json
+    python -m app.benchmarks.payroll_benchmark --compare bench/10k.json
+
+Scenarios (SCENARIOS):
+
+    single     PayrollService.generate_for_employee over a sample of employees
+    bulk_api   POST /hrms/payroll/generate-bulk (in-process TestClient)
+    bulk       BulkPayrollService.generate
+    parallel   ParallelPayrollService.generate
+
+Each scenario runs in a fresh spawned process, so peak RSS is the
+scenario's own and no cache (policy, pool, attendance lock) is warm from
+an earlier one. Per scenario the report holds wall time, SQL statements
+issued (app.database.query_stats), payroll rows written and peak RSS.
+Reports carry the git commit and org parameters; --compare fails
+(exit 1) when a scenario got slower than --threshold percent.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.data_seeder import synthetic_org
+from app.database.connection import configure_pool, use_connection
+from app.database.query_stats import track_queries
+
+SCENARIOS = ("single", "bulk_api", "bulk", "parallel")
+
+# generate_for_employee is ~10 queries per employee: time a sample, not the org
+SINGLE_SAMPLE = int(os.getenv("HRMS_BENCH_SINGLE_SAMPLE", "200"))
+
+# Default slowdown (percent of wall time) reported as a regression
+REGRESSION_THRESHOLD = float(os.getenv("HRMS_BENCH_THRESHOLD", "10"))
+
+REPORT_VERSION = 1
+
+
+# ============================================================
+# SCENARIOS (run inside a fresh process)
+# ============================================================
+
+def _scenario_single(year: int, month: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    from app.database.employee_db import EmployeeDB
+    from app.services.payroll_service import PayrollService
+
+    ids = EmployeeDB.get_active_ids()[:options["single_sample"]]
+    written = 0
+    with track_queries("bench single") as stats:
+        started = time.perf_counter()
+        for emp_id in ids:
+            try:
+                PayrollService.generate_for_employee(emp_id, year, month)
+                written += 1
+            except ValueError:
+                pass
+        seconds = time.perf_counter() - started
+
+    return {
+        "seconds": seconds,
+        "queries": stats.count,
+        "rows_written": written,
+        "employees": len(ids),
+        "per_employee_ms": round(seconds * 1000 / max(1, len(ids)), 3),
+    }
+
+
+def _scenario_bulk_api(year: int, month: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    from app.api.main import app
+
+    # No context manager: the lifespan (payroll worker, listeners) stays off
+    client = TestClient(app)
+    started = time.perf_counter()
+    response = client.post("/hrms/payroll/generate-bulk", json={"year": year, "month": month})
+    seconds = time.perf_counter() - started
+    response.raise_for_status()
+
+    results = response.json()["results"]
+    return {
+        "seconds": seconds,
+        "queries": int(response.headers.get("X-DB-Queries", 0)),
+        "rows_written": sum(1 for r in results if r["status"] == "success"),
+        "employees": len(results),
+    }
+
+
+def _scenario_bulk(year: int, month: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.payroll_bulk_service import BulkPayrollService
+
+    with track_queries("bench bulk") as stats, use_connection() as conn:
+        started = time.perf_counter()
+        results = BulkPayrollService.generate(year, month, conn=conn)
+    seconds = time.perf_counter() - started
+
+    return {
+        "seconds": seconds,
+        "queries": stats.count,
+        "rows_written": sum(1 for r in results if r["status"] == "success"),
+        "employees": len(results),
+    }
+
+
+def _scenario_parallel(year: int, month: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.payroll_parallel_service import ParallelPayrollService
+
+    with track_queries("bench parallel") as stats:
+        report = ParallelPayrollService.generate(year, month, workers=options["workers"])
+
+    return {
+        "seconds": report["seconds"],
+        # Planning queries here + each worker's own count
+        "queries": stats.count + report["queries"],
+        "rows_written": report["succeeded"],
+        "employees": report["total"],
+        "workers": report["workers"],
+        "partitions": len(report["partitions"]),
+    }
+
+
+_SCENARIO_FUNCS = {
+    "single": _scenario_single,
+    "bulk_api": _scenario_bulk_api,
+    "bulk": _scenario_bulk,
+    "parallel": _scenario_parallel,
+}
+
+
+def _peak_rss_mb(who) -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _init_process():
+    configure_pool(minconn=1, maxconn=4)
+
+
+def _run_scenario(name: str, year: int, month: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    result = _SCENARIO_FUNCS[name](year, month, options)
+    result["seconds"] = round(result["seconds"], 3)
+    result["peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_SELF)
+    # Worker processes of the parallel engine
+    result["peak_children_rss_mb"] = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return result
+
+
+def run_isolated(name: str, year: int, month: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_process,
+    ) as pool:
+        return pool.submit(_run_scenario, name, year, month, options).result()
+
+
+# ============================================================
+# SUITE
+# ============================================================
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median wall time over repeats; other metrics from the median run."""
+    ordered = sorted(runs, key=lambda r: r["seconds"])
+    summary = dict(ordered[(len(ordered) - 1) // 2])
+    summary["seconds_min"] = ordered[0]["seconds"]
+    summary["seconds_median"] = round(statistics.median(r["seconds"] for r in runs), 3)
+    summary["repeat"] = len(runs)
+    return summary
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _server_version() -> Optional[str]:
+    with use_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SHOW server_version;")
+        version = cur.fetchone()[0]
+        cur.close()
+    return version
+
+
+def run_suite(year: int, month: int, scenarios=SCENARIOS, repeat: int = 1,
+              options: Dict[str, Any] = None, org: Dict[str, Any] = None,
+              log=print) -> Dict[str, Any]:
+    options = dict({"single_sample": SINGLE_SAMPLE, "workers": None}, **(options or {}))
+
+    results = {}
+    for name in scenarios:
+        runs = []
+        for i in range(repeat):
+            run = run_isolated(name, year, month, options)
+            log(f"{name} #{i + 1}: {run['seconds']}s, {run['queries']} queries, "
+                f"{run['rows_written']} rows, {run['peak_rss_mb']} MB")
+            runs.append(run)
+        results[name] = summarize(runs)
+
+    return {
+        "report_version": REPORT_VERSION,
+        "commit": _git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "postgres": _server_version(),
+        "cpu_count": os.cpu_count(),
+        "period": f"{year}-{month:02d}",
+        "org": org,
+        "options": options,
+        "scenarios": results,
+    }
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Per-scenario deltas against a baseline report. A scenario regresses
+    when its median wall time grew by more than `threshold` percent or it
+    issues more queries than before.
+    """
+    rows = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+
+        old, new = before["seconds_median"], now["seconds_median"]
+        change = round((new - old) * 100 / old, 1) if old else 0.0
+        rows.append({
+            "scenario": name,
+            "seconds_before": old,
+            "seconds_after": new,
+            "change_pct": change,
+            "queries_before": before["queries"],
+            "queries_after": now["queries"],
+            "regressed": change > threshold or now["queries"] > before["queries"],
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the payroll engines")
+    parser.add_argument("--period", type=synthetic_org.parse_period,
+                        help="payroll month YYYY-MM (default: last seeded month)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--single-sample", type=int, default=SINGLE_SAMPLE)
+    parser.add_argument("--workers", type=int, help="parallel scenario workers (default: cores)")
+
+    seeding = parser.add_argument_group("synthetic organisation")
+    seeding.add_argument("--seed-org", action="store_true", help="(re)seed before running")
+    size = seeding.add_mutually_exclusive_group()
+    size.add_argument("--size", choices=sorted(synthetic_org.ORG_SIZES), default="1k")
+    size.add_argument("--employees", type=int)
+    seeding.add_argument("--months", type=int, default=1)
+    seeding.add_argument("--seed", type=int, default=42)
+
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    log = lambda msg: print(msg, file=sys.stderr)
+
+    org = None
+    if args.seed_org:
+        org = synthetic_org.seed(
+            args.employees or synthetic_org.ORG_SIZES[args.size],
+            args.months, args.period, args.seed, log=log,
+        )
+
+    if args.period:
+        year, month = args.period
+    elif org:
+        year, month = synthetic_org.parse_period(org["months"][-1])
+    else:
+        parser.error("--period is required without --seed-org")
+
+    report = run_suite(
+        year, month, args.scenarios, args.repeat,
+        options={"single_sample": args.single_sample, "workers": args.workers},
+        org=org, log=log,
+    )
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressions = 0
+        for row in compare_reports(baseline, report, args.threshold):
+            regressions += row["regressed"]
+            log(f"{row['scenario']}: {row['seconds_before']}s → {row['seconds_after']}s "
+                f"({row['change_pct']:+}%), queries {row['queries_before']} → "
+                f"{row['queries_after']}{'  REGRESSION' if row['regressed'] else ''}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
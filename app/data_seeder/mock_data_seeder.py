@@ -1,22 +1,8 @@
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime, timedelta
 import random
 
-# ============================================================
-# DB CONFIG
-# ============================================================
-DB_PARAMS = {
-    "dbname": "hrms_db",
-    "user": "varun",
-    "password": "varun@123",
-    "host": "localhost",
-    "port": 5432,
-}
-
-
-def get_connection():
-    return psycopg2.connect(**DB_PARAMS)
+from app.database.connection import get_connection
 
 
 # ============================================================
@@ -0,0 +1,288 @@
+"""
+Synthetic organisation for payroll benchmarks.
+
+Seeds employees, salary structures and 1–12 months of processed
+attendance with COPY (no per-row INSERTs), so a 50k-employee year loads
+in minutes. Generation is driven by one seeded Random: the same
+(employees, months, end, seed) always produces the same rows, which
+keeps benchmark runs comparable across commits.
+
+Synthetic employees are recognisable by their SYNTHETIC_EMAIL_DOMAIN
+email; reset() removes only them. Use a dedicated database: whole-company
+payroll runs include every active employee, not just synthetic ones.
+
+    python -m app.data_seeder.synthetic_org --size 10k --months 3
+"""
+import argparse
+import calendar
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from app.database.connection import use_connection
+from app.database.partitions import add_months, ensure_partitions, is_partitioned
+
+# Preset organisation sizes (employees)
+ORG_SIZES = {"1k": 1_000, "10k": 10_000, "50k": 50_000}
+
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.hrms.local"
+
+DEPARTMENTS = ("Engineering", "Finance", "HR", "Marketing", "Operations", "Sales", "Support")
+
+EMPLOYEE_COLUMNS = (
+    "employee_id", "first_name", "last_name", "email", "designation",
+    "department", "date_of_joining", "base_salary", "status",
+)
+
+SALARY_COLUMNS = ("employee_id", "basic", "hra", "allowances", "deductions", "effective_from")
+
+ATTENDANCE_COLUMNS = (
+    "employee_id", "date", "check_in", "check_out", "total_hours", "net_hours",
+    "break_minutes", "overtime_minutes", "late_minutes", "early_exit_minutes",
+    "is_late", "is_early_checkout", "is_overtime", "is_weekend", "is_holiday",
+    "is_night_shift", "status",
+)
+
+
+def period_months(end: Tuple[int, int], months: int) -> List[Tuple[int, int]]:
+    """The `months` calendar months ending with `end`, oldest first."""
+    return [add_months(end[0], end[1], -i) for i in range(months - 1, -1, -1)]
+
+
+# ============================================================
+# ROW GENERATORS (pure, deterministic)
+# ============================================================
+
+def employee_rows(first_id: int, count: int, rng: random.Random) -> Iterator[tuple]:
+    for employee_id in range(first_id, first_id + count):
+        yield (
+            employee_id,
+            "Synthetic",
+            f"E{employee_id}",
+            f"e{employee_id}@{SYNTHETIC_EMAIL_DOMAIN}",
+            "Engineer",
+            DEPARTMENTS[rng.randrange(len(DEPARTMENTS))],
+            date(2020, 1, 1) + timedelta(days=rng.randrange(1500)),
+            rng.randrange(25_000, 150_000, 500),
+            "active",
+        )
+
+
+def salary_rows(employees: Sequence[tuple], effective_from: date,
+                rng: random.Random) -> Iterator[tuple]:
+    """
+    One structure per employee; about 1 in 10 employees gets none and is
+    paid from employees.base_salary (the fallback path).
+    """
+    for emp in employees:
+        if rng.random() < 0.1:
+            continue
+        gross = emp[7]
+        basic = round(gross * 0.5, 2)
+        hra = round(gross * 0.2, 2)
+        yield (emp[0], basic, hra, round(gross - basic - hra, 2),
+               round(gross * 0.05, 2), effective_from)
+
+
+def attendance_rows(employee_ids: Sequence[int], year: int, month: int,
+                    rng: random.Random, holidays: Iterable[date] = ()) -> Iterator[tuple]:
+    """A month of processed attendance per employee (weekends as week_off)."""
+    holidays = set(holidays)
+    days = [date(year, month, d) for d in range(1, calendar.monthrange(year, month)[1] + 1)]
+
+    for employee_id in employee_ids:
+        night = rng.random() < 0.1
+        for day in days:
+            weekend = day.weekday() >= 5
+            holiday = day in holidays
+
+            if weekend or holiday:
+                yield (employee_id, day, None, None, 0, 0, 0, 0, 0, 0,
+                       False, False, False, weekend, holiday, False,
+                       "week_off" if weekend else "holiday")
+                continue
+
+            roll = rng.random()
+            if roll < 0.04:
+                yield (employee_id, day, None, None, 0, 0, 0, 0, 0, 0,
+                       False, False, False, False, False, False, "absent")
+                continue
+            if roll < 0.07:
+                yield (employee_id, day, None, None, 0, 0, 0, 0, 0, 0,
+                       False, False, False, False, False, False, "on_leave")
+                continue
+
+            half_day = roll < 0.10
+            late = rng.randrange(5, 60) if rng.random() < 0.15 else 0
+            early = rng.randrange(5, 45) if rng.random() < 0.05 else 0
+            overtime = rng.randrange(30, 180) if rng.random() < 0.12 else 0
+            hours = 4.0 if half_day else round(9 + (overtime - late - early) / 60, 2)
+
+            start = datetime.combine(day, datetime.min.time()) + \
+                timedelta(hours=21 if night else 9, minutes=late)
+            yield (employee_id, day, start, start + timedelta(hours=hours),
+                   hours, round(max(hours - 1, 0), 2), 60, overtime, late, early,
+                   late > 0, early > 0, overtime > 0, False, False, night,
+                   "half_day" if half_day else "present")
+
+
+# ============================================================
+# COPY
+# ============================================================
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+class CopyStream:
+    """
+    File-like adaptor for cursor.copy_expert: renders rows to COPY text
+    format on demand, so millions of attendance rows never sit in memory.
+    """
+
+    def __init__(self, rows: Iterable[tuple]):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self.rows = 0
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += "\t".join(_copy_value(v) for v in row) + "\n"
+            self.rows += 1
+
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def copy_rows(cur, table: str, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+    stream = CopyStream(rows)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", stream, size=1 << 16)
+    return stream.rows
+
+
+# ============================================================
+# SEED / RESET
+# ============================================================
+
+def reset(conn=None) -> int:
+    """Delete synthetic employees (cascades to attendance, salary, payroll)."""
+    with use_connection(conn) as conn:
+        cur = conn.cursor()
+        pattern = f"%@{SYNTHETIC_EMAIL_DOMAIN}"
+        for table in ("payroll_dirty", "attendance_lock_exception"):
+            cur.execute(f"""
+                DELETE FROM {table}
+                WHERE employee_id IN (SELECT employee_id FROM employees WHERE email LIKE %s);
+            """, (pattern,))
+        cur.execute("DELETE FROM employees WHERE email LIKE %s;", (pattern,))
+        count = cur.rowcount
+        cur.close()
+    return count
+
+
+def seed(employees: int, months: int = 1, end: Tuple[int, int] = None,
+         seed_value: int = 42, conn=None, log=print) -> Dict[str, object]:
+    """
+    Replace the synthetic organisation with `employees` employees and
+    `months` months of attendance ending at `end` (year, month; default
+    last month). Returns row counts and load time.
+    """
+    if not 1 <= months <= 12:
+        raise ValueError("months must be between 1 and 12")
+
+    today = date.today()
+    end = end or add_months(today.year, today.month, -1)
+    periods = period_months(end, months)
+    rng = random.Random(seed_value)
+    started = time.perf_counter()
+
+    with use_connection(conn) as conn:
+        removed = reset(conn=conn)
+        cur = conn.cursor()
+
+        cur.execute("SELECT COALESCE(MAX(employee_id), 0) + 1 FROM employees;")
+        first_id = cur.fetchone()[0]
+
+        staff = list(employee_rows(first_id, employees, rng))
+        counts = {"employees": copy_rows(cur, "employees", EMPLOYEE_COLUMNS, staff)}
+        cur.execute(
+            "SELECT setval(pg_get_serial_sequence('employees', 'employee_id'), %s);",
+            (first_id + employees - 1,),
+        )
+        log(f"employees: {counts['employees']}")
+
+        first_day = date(*periods[0], 1)
+        counts["salary_structure"] = copy_rows(
+            cur, "salary_structure", SALARY_COLUMNS, salary_rows(staff, first_day, rng)
+        )
+        log(f"salary_structure: {counts['salary_structure']}")
+
+        if is_partitioned(cur, "attendance"):
+            ensure_partitions(cur, "attendance", first_day, date(*periods[-1], 1))
+
+        cur.execute(
+            "SELECT holiday_date FROM holidays WHERE holiday_date BETWEEN %s AND %s;",
+            (first_day, date(*add_months(*periods[-1], 1), 1) - timedelta(days=1)),
+        )
+        holidays = [row[0] for row in cur.fetchall()]
+
+        ids = [emp[0] for emp in staff]
+        counts["attendance"] = 0
+        for year, month in periods:
+            counts["attendance"] += copy_rows(
+                cur, "attendance", ATTENDANCE_COLUMNS,
+                attendance_rows(ids, year, month, rng, holidays),
+            )
+            log(f"attendance {year}-{month:02d}: {counts['attendance']} rows so far")
+
+        cur.execute("ANALYZE employees; ANALYZE salary_structure; ANALYZE attendance;")
+        cur.close()
+
+    return {
+        "employees": employees,
+        "months": [f"{y}-{m:02d}" for y, m in periods],
+        "seed": seed_value,
+        "removed": removed,
+        "rows": counts,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def parse_period(value: str) -> Tuple[int, int]:
+    year, month = value.split("-")
+    return int(year), int(month)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a synthetic organisation for payroll benchmarks")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--size", choices=sorted(ORG_SIZES), default="1k")
+    size.add_argument("--employees", type=int)
+    parser.add_argument("--months", type=int, default=1, help="months of attendance (1-12)")
+    parser.add_argument("--end", type=parse_period, help="last month as YYYY-MM (default: last month)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="only remove synthetic employees")
+    args = parser.parse_args(argv)
+
+    if args.reset:
+        print(f"removed {reset()} synthetic employees")
+        return
+
+    result = seed(args.employees or ORG_SIZES[args.size], args.months, args.end, args.seed)
+    print(f"seeded {result['rows']} in {result['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
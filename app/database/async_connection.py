@@ -0,0 +1,74 @@
+# app/database/async_connection.py
+import json
+import os
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+from app.database.connection import DB_PARAMS
+from app.database.query_stats import asyncpg_query_logger
+
+# ============================================================
+# ASYNC POOL CONFIG
+# ============================================================
+ASYNC_POOL_MIN_SIZE = int(os.getenv("HRMS_ASYNC_DB_POOL_MIN", "2"))
+ASYNC_POOL_MAX_SIZE = int(os.getenv("HRMS_ASYNC_DB_POOL_MAX", "20"))
+ASYNC_POOL_TIMEOUT = float(os.getenv("HRMS_DB_POOL_TIMEOUT", "10"))
+
+_async_pool = None
+
+
+async def _init_connection(conn):
+    # JSONB in / out as Python objects (attendance_events.meta)
+    await conn.set_type_codec(
+        "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+    )
+    # Per-request query accounting (X-DB-Queries / X-DB-Time-ms)
+    conn.add_query_logger(asyncpg_query_logger)
+
+
+# ============================================================
+# PROVIDER
+# ============================================================
+async def get_async_pool():
+    """
+    asyncpg pool used by the `async def` routes (kiosk / biometric punches).
+    Created lazily on the running event loop.
+    """
+    global _async_pool
+    if _async_pool is None:
+        _async_pool = await asyncpg.create_pool(
+            database=DB_PARAMS["dbname"],
+            user=DB_PARAMS["user"],
+            password=DB_PARAMS["password"],
+            host=DB_PARAMS["host"],
+            port=DB_PARAMS["port"],
+            min_size=ASYNC_POOL_MIN_SIZE,
+            max_size=ASYNC_POOL_MAX_SIZE,
+            timeout=ASYNC_POOL_TIMEOUT,
+            init=_init_connection,
+        )
+    return _async_pool
+
+
+async def close_async_pool():
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+    _async_pool = None
+
+
+@asynccontextmanager
+async def async_db_transaction():
+    """
+    One asyncpg connection + one transaction:
+
+        async with async_db_transaction() as conn:
+            await AsyncAttendanceService.check_in(conn, employee_id, ...)
+
+    Commits on success, rolls back on error, releases to the pool.
+    """
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            yield conn
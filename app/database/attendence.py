@@ -1,21 +1,12 @@
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import date, datetime
 import json
 
-# ==========================================
-# DATABASE CONNECTION
-# ==========================================
-DB_PARAMS = {
-    "dbname": "hrms_db",
-    "user": "varun",
-    "password": "varun@123",
-    "host": "localhost",
-    "port": 5432,
-}
-
-def get_connection():
-    return psycopg2.connect(**DB_PARAMS)
+from app.database.connection import get_connection, use_connection
+from app.database.payroll import AttendanceLockDB
+from app.database.payroll_dirty import MARK_GENERATED_DIRTY_SQL
+from app.database.records import RecordCursor
+from app.database.streaming import iter_rows
 
 
 # ==========================================
@@ -26,46 +17,43 @@ class AttendanceEventDB:
     
     
     @staticmethod
-    def add_event(employee_id: int, event_type: str, source="manual", meta=None):
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
+    def add_event(employee_id: int, event_type: str, source="manual", meta=None, conn=None):
         meta_json = json.dumps(meta) if meta is not None else None
 
-        cur.execute("""
-            INSERT INTO attendance_events (employee_id, event_type, event_time, source, meta)
-            VALUES (%s, %s, NOW(), %s, %s)
-            RETURNING *;
-        """, (employee_id, event_type, source, meta_json))
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        row = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+            cur.execute("""
+                INSERT INTO attendance_events (employee_id, event_type, event_time, source, meta)
+                VALUES (%s, %s, NOW(), %s, %s)
+                RETURNING *;
+            """, (employee_id, event_type, source, meta_json))
+
+            row = cur.fetchone()
+            cur.close()
         return row
 
     @staticmethod
-    def get_events_for_window(employee_id: int, start_dt: datetime, end_dt: datetime):
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        cur.execute("""
-            SELECT *
-            FROM attendance_events
-            WHERE employee_id = %s
-              AND event_time BETWEEN %s AND %s
-            ORDER BY event_time ASC;
-        """, (employee_id, start_dt, end_dt))
-
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+    def get_events_for_window(employee_id: int, start_dt: datetime, end_dt: datetime, conn=None):
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute("""
+                SELECT *
+                FROM attendance_events
+                WHERE employee_id = %s
+                  AND event_time BETWEEN %s AND %s
+                ORDER BY event_time ASC;
+            """, (employee_id, start_dt, end_dt))
+
+            rows = cur.fetchall()
+            cur.close()
         return rows
     
     @staticmethod
     def get_all_events_for_employee(employee_id: int):
         conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur = conn.cursor(cursor_factory=RecordCursor)
 
         cur.execute("""
             SELECT *
@@ -88,159 +76,226 @@ class AttendanceEventDB:
 class AttendanceDB:
 
     @staticmethod
-    def get_by_employee_and_date(employee_id: int, dt: date):
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        cur.execute("""
-            SELECT *
-            FROM attendance
-            WHERE employee_id = %s AND date = %s;
-        """, (employee_id, dt))
-
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
-        return row
-    @staticmethod
-    def get_by_employee_and_date(employee_id: int, dt: date):
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        cur.execute("""
-            SELECT *
-        FROM attendance
-        WHERE employee_id = %s
-          AND date = %s
-        LIMIT 1;
-    """, (employee_id, dt))
-
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+    def get_by_employee_and_date(employee_id: int, dt: date, conn=None):
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute("""
+                SELECT *
+                FROM attendance
+                WHERE employee_id = %s
+                  AND date = %s
+                LIMIT 1;
+            """, (employee_id, dt))
+
+            row = cur.fetchone()
+            cur.close()
         return row
 
 
     @staticmethod
-    def upsert_full_attendance(data: dict):
+    def upsert_full_attendance(data: dict, conn=None):
         """
         This method stores ALL payroll-required columns.
-        It also RESPECTS the payroll lock.
+        It also RESPECTS the payroll lock (period lock via the cached
+        AttendanceLockDB lookup, plus the per-day admin row flag).
+        Returns None when the day is locked.
         """
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        cur.execute("""
-            INSERT INTO attendance (
-                employee_id,
-                shift_id,
-                date,
-                check_in,
-                check_out,
-                total_hours,
-                net_hours,
-                break_minutes,
-                overtime_minutes,
-                late_minutes,
-                early_exit_minutes,
-                is_late,
-                is_early_checkout,
-                is_overtime,
-                is_weekend,
-                is_holiday,
-                is_night_shift,
-                status,
-                is_payroll_locked,
-                locked_at
-            )
-            VALUES (
-                %(employee_id)s,
-                %(shift_id)s,
-                %(date)s,
-                %(check_in)s,
-                %(check_out)s,
-                %(total_hours)s,
-                %(net_hours)s,
-                %(break_minutes)s,
-                %(overtime_minutes)s,
-                %(late_minutes)s,
-                %(early_exit_minutes)s,
-                %(is_late)s,
-                %(is_early_checkout)s,
-                %(is_overtime)s,
-                %(is_weekend)s,
-                %(is_holiday)s,
-                %(is_night_shift)s,
-                %(status)s,
-                %(is_payroll_locked)s,
-                %(locked_at)s
-            )
-            ON CONFLICT (employee_id, date)
-            DO UPDATE SET
-                shift_id           = EXCLUDED.shift_id,
-                check_in           = EXCLUDED.check_in,
-                check_out          = EXCLUDED.check_out,
-                total_hours        = EXCLUDED.total_hours,
-                net_hours          = EXCLUDED.net_hours,
-                break_minutes      = EXCLUDED.break_minutes,
-                overtime_minutes   = EXCLUDED.overtime_minutes,
-                late_minutes       = EXCLUDED.late_minutes,
-                early_exit_minutes = EXCLUDED.early_exit_minutes,
-                is_late            = EXCLUDED.is_late,
-                is_early_checkout  = EXCLUDED.is_early_checkout,
-                is_overtime        = EXCLUDED.is_overtime,
-                is_weekend         = EXCLUDED.is_weekend,
-                is_holiday         = EXCLUDED.is_holiday,
-                is_night_shift     = EXCLUDED.is_night_shift,
-                status             = EXCLUDED.status
-            WHERE attendance.is_payroll_locked = FALSE
-            RETURNING *;
-        """, data)
-
-        row = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with use_connection(conn) as conn:
+            if AttendanceLockDB.is_locked(data["employee_id"], data["date"], conn=conn):
+                return None
+
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute("""
+                INSERT INTO attendance (
+                    employee_id,
+                    shift_id,
+                    date,
+                    check_in,
+                    check_out,
+                    total_hours,
+                    net_hours,
+                    break_minutes,
+                    overtime_minutes,
+                    late_minutes,
+                    early_exit_minutes,
+                    is_late,
+                    is_early_checkout,
+                    is_overtime,
+                    is_weekend,
+                    is_holiday,
+                    is_night_shift,
+                    status,
+                    is_payroll_locked,
+                    locked_at
+                )
+                VALUES (
+                    %(employee_id)s,
+                    %(shift_id)s,
+                    %(date)s,
+                    %(check_in)s,
+                    %(check_out)s,
+                    %(total_hours)s,
+                    %(net_hours)s,
+                    %(break_minutes)s,
+                    %(overtime_minutes)s,
+                    %(late_minutes)s,
+                    %(early_exit_minutes)s,
+                    %(is_late)s,
+                    %(is_early_checkout)s,
+                    %(is_overtime)s,
+                    %(is_weekend)s,
+                    %(is_holiday)s,
+                    %(is_night_shift)s,
+                    %(status)s,
+                    %(is_payroll_locked)s,
+                    %(locked_at)s
+                )
+                ON CONFLICT (employee_id, date)
+                DO UPDATE SET
+                    shift_id           = EXCLUDED.shift_id,
+                    check_in           = EXCLUDED.check_in,
+                    check_out          = EXCLUDED.check_out,
+                    total_hours        = EXCLUDED.total_hours,
+                    net_hours          = EXCLUDED.net_hours,
+                    break_minutes      = EXCLUDED.break_minutes,
+                    overtime_minutes   = EXCLUDED.overtime_minutes,
+                    late_minutes       = EXCLUDED.late_minutes,
+                    early_exit_minutes = EXCLUDED.early_exit_minutes,
+                    is_late            = EXCLUDED.is_late,
+                    is_early_checkout  = EXCLUDED.is_early_checkout,
+                    is_overtime        = EXCLUDED.is_overtime,
+                    is_weekend         = EXCLUDED.is_weekend,
+                    is_holiday         = EXCLUDED.is_holiday,
+                    is_night_shift     = EXCLUDED.is_night_shift,
+                    status             = EXCLUDED.status
+                WHERE attendance.is_payroll_locked = FALSE
+                RETURNING *;
+            """, data)
+
+            row = cur.fetchone()
+            if row:
+                # Payroll already generated for this month must be recomputed
+                cur.execute(MARK_GENERATED_DIRTY_SQL, {
+                    "employee_id": row["employee_id"], "year": row["date"].year,
+                    "month": row["date"].month, "reason": "attendance",
+                })
+            cur.close()
         return row
     
-    @staticmethod
-    def get_attendance_range(employee_id, start_date, end_date):
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+    # ------------------------------------------
+    # LIST / REPORT QUERIES
+    # Each has a list form (fetchall) and an iter_* form that streams
+    # through a server-side cursor for unbounded histories.
+    # ------------------------------------------
+    RANGE_SQL = """
+        SELECT *
+        FROM attendance
+        WHERE employee_id = %s
+          AND date BETWEEN %s AND %s
+        ORDER BY date;
+    """
 
-        cur.execute("""
-            SELECT *
-            FROM attendance
-            WHERE employee_id = %s
-              AND date BETWEEN %s AND %s
-            ORDER BY date;
-        """, (employee_id, start_date, end_date))
+    HISTORY_SQL = """
+        SELECT *
+        FROM attendance
+        WHERE employee_id = %s
+        ORDER BY date DESC;
+    """
+
+    LOCKED_SQL = """
+        SELECT *
+        FROM attendance
+        WHERE employee_id = %s
+          AND (is_payroll_locked = TRUE OR attendance_is_locked(employee_id, date))
+        ORDER BY date DESC;
+    """
+
+    COMPANY_DAY_SQL = """
+        SELECT a.*, e.first_name, e.last_name, e.department
+        FROM attendance a
+        JOIN employees e ON e.employee_id = a.employee_id
+        WHERE a.date = %s
+        ORDER BY e.first_name;
+    """
+
+    LATE_REPORT_SQL = """
+        SELECT a.*, e.first_name, e.department
+        FROM attendance a
+        JOIN employees e ON e.employee_id = a.employee_id
+        WHERE a.is_late = TRUE
+          AND a.date BETWEEN %s AND %s;
+    """
+
+    OVERTIME_REPORT_SQL = """
+        SELECT a.*, e.first_name
+        FROM attendance a
+        JOIN employees e ON e.employee_id = a.employee_id
+        WHERE a.is_overtime = TRUE
+          AND a.date BETWEEN %s AND %s;
+    """
 
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        return rows
-    
     @staticmethod
-    def get_attendance(employee_id: int):
+    def _fetch_all(query, params):
+        # Read-only lists: compact Record rows instead of dicts
         conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur = conn.cursor(cursor_factory=RecordCursor)
 
-        cur.execute("""
-            SELECT *
-            FROM attendance
-            WHERE employee_id = %s
-            ORDER BY date DESC
-        """, (employee_id,))
+        cur.execute(query, params)
 
         rows = cur.fetchall()
         cur.close()
         conn.close()
         return rows
-    
 
+    @classmethod
+    def get_attendance_range(cls, employee_id, start_date, end_date):
+        return cls._fetch_all(cls.RANGE_SQL, (employee_id, start_date, end_date))
+
+    @classmethod
+    def iter_attendance_range(cls, employee_id, start_date, end_date):
+        return iter_rows(cls.RANGE_SQL, (employee_id, start_date, end_date))
+
+    @classmethod
+    def get_attendance(cls, employee_id: int):
+        return cls._fetch_all(cls.HISTORY_SQL, (employee_id,))
+
+    @classmethod
+    def iter_attendance(cls, employee_id: int):
+        return iter_rows(cls.HISTORY_SQL, (employee_id,))
+
+    @classmethod
+    def get_locked_attendance(cls, employee_id: int):
+        return cls._fetch_all(cls.LOCKED_SQL, (employee_id,))
+
+    @classmethod
+    def iter_locked_attendance(cls, employee_id: int):
+        return iter_rows(cls.LOCKED_SQL, (employee_id,))
+
+    @classmethod
+    def get_company_attendance(cls, dt: date):
+        return cls._fetch_all(cls.COMPANY_DAY_SQL, (dt,))
+
+    @classmethod
+    def iter_company_attendance(cls, dt: date):
+        return iter_rows(cls.COMPANY_DAY_SQL, (dt,))
+
+    @classmethod
+    def get_late_report(cls, start_date: date, end_date: date):
+        return cls._fetch_all(cls.LATE_REPORT_SQL, (start_date, end_date))
+
+    @classmethod
+    def iter_late_report(cls, start_date: date, end_date: date):
+        return iter_rows(cls.LATE_REPORT_SQL, (start_date, end_date))
 
+    @classmethod
+    def get_overtime_report(cls, start_date: date, end_date: date):
+        return cls._fetch_all(cls.OVERTIME_REPORT_SQL, (start_date, end_date))
 
+    @classmethod
+    def iter_overtime_report(cls, start_date: date, end_date: date):
+        return iter_rows(cls.OVERTIME_REPORT_SQL, (start_date, end_date))
 
 
 # ==========================================
@@ -267,15 +322,14 @@ class HolidayDB:
         return row
 
     @staticmethod
-    def is_holiday(dt: date):
-        conn = get_connection()
-        cur = conn.cursor()
+    def is_holiday(dt: date, conn=None):
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
 
-        cur.execute("SELECT 1 FROM holidays WHERE holiday_date = %s;", (dt,))
-        result = cur.fetchone()
+            cur.execute("SELECT 1 FROM holidays WHERE holiday_date = %s;", (dt,))
+            result = cur.fetchone()
+            cur.close()
 
-        cur.close()
-        conn.close()
         return bool(result)
 
 
@@ -285,22 +339,21 @@ class HolidayDB:
 class ShiftDB:
 
     @staticmethod
-    def get_employee_shift(employee_id: int, dt: date):
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        cur.execute("""
-            SELECT s.*
-            FROM employee_shifts es
-            JOIN shifts s ON s.shift_id = es.shift_id
-            WHERE es.employee_id = %s
-              AND es.effective_from <= %s
-              AND (es.effective_to IS NULL OR es.effective_to >= %s)
-            ORDER BY es.effective_from DESC
-            LIMIT 1;
-        """, (employee_id, dt, dt))
-
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
-        return row
\ No newline at end of file
+    def get_employee_shift(employee_id: int, dt: date, conn=None):
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute("""
+                SELECT s.*
+                FROM employee_shifts es
+                JOIN shifts s ON s.shift_id = es.shift_id
+                WHERE es.employee_id = %s
+                  AND es.effective_from <= %s
+                  AND (es.effective_to IS NULL OR es.effective_to >= %s)
+                ORDER BY es.effective_from DESC
+                LIMIT 1;
+            """, (employee_id, dt, dt))
+
+            row = cur.fetchone()
+            cur.close()
+        return row
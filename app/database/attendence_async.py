@@ -0,0 +1,165 @@
+# app/database/attendence_async.py
+#
+# asyncpg twins of the attendance queries in app/database/attendence.py,
+# used by the `async def` routes so punches never block the event loop.
+# Every method takes the caller's connection (see async_db_transaction).
+
+from datetime import date, datetime
+
+from app.database.payroll import AttendanceLockDB
+from app.database.payroll_dirty import MARK_GENERATED_DIRTY_ASYNC_SQL
+
+
+def _row(record):
+    return dict(record) if record is not None else None
+
+
+# ==========================================
+# ATTENDANCE EVENTS (RAW LOGS)
+# ==========================================
+class AsyncAttendanceEventDB:
+
+    @staticmethod
+    async def add_event(conn, employee_id: int, event_type: str, source="manual", meta=None):
+        record = await conn.fetchrow("""
+            INSERT INTO attendance_events (employee_id, event_type, event_time, source, meta)
+            VALUES ($1, $2, NOW(), $3, $4)
+            RETURNING *;
+        """, employee_id, event_type, source, meta)
+        return _row(record)
+
+    @staticmethod
+    async def get_events_for_window(conn, employee_id: int, start_dt: datetime, end_dt: datetime):
+        records = await conn.fetch("""
+            SELECT *
+            FROM attendance_events
+            WHERE employee_id = $1
+              AND event_time BETWEEN $2 AND $3
+            ORDER BY event_time ASC;
+        """, employee_id, start_dt, end_dt)
+        return [dict(r) for r in records]
+
+
+# ==========================================
+# PROCESSED ATTENDANCE
+# ==========================================
+ATTENDANCE_COLUMNS = (
+    "employee_id",
+    "shift_id",
+    "date",
+    "check_in",
+    "check_out",
+    "total_hours",
+    "net_hours",
+    "break_minutes",
+    "overtime_minutes",
+    "late_minutes",
+    "early_exit_minutes",
+    "is_late",
+    "is_early_checkout",
+    "is_overtime",
+    "is_weekend",
+    "is_holiday",
+    "is_night_shift",
+    "status",
+    "is_payroll_locked",
+    "locked_at",
+)
+
+# Columns refreshed on conflict (lock columns are never overwritten)
+_ATTENDANCE_UPDATE_COLUMNS = [
+    c for c in ATTENDANCE_COLUMNS
+    if c not in ("employee_id", "date", "is_payroll_locked", "locked_at")
+]
+
+_UPSERT_ATTENDANCE_SQL = """
+    INSERT INTO attendance ({columns})
+    VALUES ({placeholders})
+    ON CONFLICT (employee_id, date)
+    DO UPDATE SET
+        {updates}
+    WHERE attendance.is_payroll_locked = FALSE
+    RETURNING *;
+""".format(
+    columns=", ".join(ATTENDANCE_COLUMNS),
+    placeholders=", ".join("$%d" % (i + 1) for i in range(len(ATTENDANCE_COLUMNS))),
+    updates=",\n        ".join("%s = EXCLUDED.%s" % (c, c) for c in _ATTENDANCE_UPDATE_COLUMNS),
+)
+
+
+class AsyncAttendanceDB:
+
+    @staticmethod
+    async def get_by_employee_and_date(conn, employee_id: int, dt: date):
+        record = await conn.fetchrow("""
+            SELECT *
+            FROM attendance
+            WHERE employee_id = $1
+              AND date = $2
+            LIMIT 1;
+        """, employee_id, dt)
+        return _row(record)
+
+    @staticmethod
+    async def upsert_full_attendance(conn, data: dict):
+        """
+        Same contract as AttendanceDB.upsert_full_attendance:
+        stores every payroll column and respects the payroll lock.
+        """
+        if await AttendanceLockDB.is_locked_async(conn, data["employee_id"], data["date"]):
+            return None
+
+        record = await conn.fetchrow(
+            _UPSERT_ATTENDANCE_SQL, *(data[c] for c in ATTENDANCE_COLUMNS)
+        )
+        if record is not None:
+            await conn.execute(
+                MARK_GENERATED_DIRTY_ASYNC_SQL,
+                record["employee_id"], record["date"].year, record["date"].month, "attendance",
+            )
+        return _row(record)
+
+
+# ==========================================
+# HOLIDAYS / SHIFTS / LEAVE
+# ==========================================
+class AsyncHolidayDB:
+
+    @staticmethod
+    async def is_holiday(conn, dt: date) -> bool:
+        found = await conn.fetchval(
+            "SELECT 1 FROM holidays WHERE holiday_date = $1;", dt
+        )
+        return bool(found)
+
+
+class AsyncShiftDB:
+
+    @staticmethod
+    async def get_employee_shift(conn, employee_id: int, dt: date):
+        record = await conn.fetchrow("""
+            SELECT s.*
+            FROM employee_shifts es
+            JOIN shifts s ON s.shift_id = es.shift_id
+            WHERE es.employee_id = $1
+              AND es.effective_from <= $2
+              AND (es.effective_to IS NULL OR es.effective_to >= $2)
+            ORDER BY es.effective_from DESC
+            LIMIT 1;
+        """, employee_id, dt)
+        return _row(record)
+
+
+class AsyncLeaveRequestDB:
+
+    @staticmethod
+    async def has_overlapping_approved_leave(conn, employee_id: int, start_date: date, end_date: date) -> bool:
+        found = await conn.fetchval("""
+            SELECT 1 FROM leave_requests
+            WHERE employee_id = $1
+              AND status = 'approved'
+              AND start_date <= $2
+              AND end_date >= $3
+            LIMIT 1;
+        """, employee_id, end_date, start_date)
+        return found is not None
@@ -1,7 +1,21 @@
 # app/database/connection.py
+import functools
+import inspect
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2 import extensions as pg_ext
 from psycopg2.extras import RealDictCursor
 
+from app.database.query_stats import InstrumentedCursor, current_stats
+
 DB_PARAMS = {
     "dbname": "hrms_db",
     "user": "varun",
@@ -10,5 +24,417 @@ DB_PARAMS = {
     "port": 5432,
 }
 
+# ============================================================
+# POOL CONFIG
+# ============================================================
+POOL_MIN_SIZE = int(os.getenv("HRMS_DB_POOL_MIN", "2"))
+POOL_MAX_SIZE = int(os.getenv("HRMS_DB_POOL_MAX", "20"))
+
+# Seconds a caller waits for a free connection before PoolError
+POOL_CHECKOUT_TIMEOUT = float(os.getenv("HRMS_DB_POOL_TIMEOUT", "10"))
+
+# Idle connections older than this are pinged with SELECT 1 on checkout
+POOL_HEALTHCHECK_IDLE_SECONDS = float(os.getenv("HRMS_DB_POOL_HEALTHCHECK_IDLE", "30"))
+
+# ============================================================
+# READ REPLICA CONFIG
+# ============================================================
+# libpq DSN of a streaming replica (or any read-only role), e.g.
+# "host=replica dbname=hrms_db user=hrms_ro password=...". Unset → every
+# query goes to the primary.
+READ_DB_DSN = os.getenv("HRMS_READ_DB_DSN") or None
+READ_POOL_MAX_SIZE = int(os.getenv("HRMS_READ_DB_POOL_MAX", str(POOL_MAX_SIZE)))
+
+# After a client writes, its reads stay on the primary this long so it
+# never sees a replica that has not caught up yet
+READ_YOUR_WRITES_SECONDS = float(os.getenv("HRMS_READ_YOUR_WRITES_SECONDS", "5"))
+
+
+# ============================================================
+# POOL
+# ============================================================
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool.
+
+    - keeps up to `maxconn` physical connections open
+    - callers block (up to `timeout` seconds) when all are checked out
+    - idle connections are health-checked before being handed out
+    - returned connections are rolled back so no transaction leaks
+    - session state a borrower changed (autocommit, isolation level,
+      read-only) is reset before the next borrower sees it
+    """
+
+    def __init__(self, minconn=POOL_MIN_SIZE, maxconn=POOL_MAX_SIZE,
+                 timeout=POOL_CHECKOUT_TIMEOUT,
+                 healthcheck_idle=POOL_HEALTHCHECK_IDLE_SECONDS,
+                 readonly=False,
+                 **conn_params):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("invalid pool size: min=%s max=%s" % (minconn, maxconn))
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+        self.readonly = readonly
+        self._conn_params = conn_params or DB_PARAMS
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._idle = deque()          # (raw_conn, released_at)
+        self._closed = False
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    # --------------------------------------------------------
+    def _connect(self):
+        raw = psycopg2.connect(**self._conn_params)
+        if self.readonly:
+            # Belt and braces: a replica route must never write
+            raw.set_session(readonly=True)
+        return raw
+
+    def _session_changed(self, raw):
+        return (
+            raw.autocommit
+            or raw.isolation_level is not None
+            or raw.deferrable is not None
+            or raw.readonly != (True if self.readonly else None)
+        )
+
+    def _reset_session(self, raw):
+        raw.autocommit = False
+        raw.set_session(
+            isolation_level="DEFAULT",
+            readonly=True if self.readonly else "DEFAULT",
+            deferrable="DEFAULT",
+        )
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, raw, released_at):
+        if raw.closed:
+            return False
+
+        if time.monotonic() - released_at < self.healthcheck_idle:
+            return True
+
+        try:
+            cur = raw.cursor()
+            cur.execute("SELECT 1;")
+            cur.close()
+            raw.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    # --------------------------------------------------------
+    def getconn(self):
+        """Check out a raw psycopg2 connection."""
+        if self._closed:
+            raise pg_pool.PoolError("connection pool is closed")
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise pg_pool.PoolError(
+                "connection pool exhausted (max=%s)" % self.maxconn
+            )
+
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+
+                if item is None:
+                    return self._connect()
+
+                raw, released_at = item
+                if self._is_healthy(raw, released_at):
+                    return raw
+
+                self._discard(raw)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, raw):
+        """Return a raw connection to the pool."""
+        try:
+            if self._closed or raw.closed:
+                self._discard(raw)
+                return
+
+            try:
+                if raw.get_transaction_status() != pg_ext.TRANSACTION_STATUS_IDLE:
+                    raw.rollback()
+                if self._session_changed(raw):
+                    self._reset_session(raw)
+            except Exception:
+                self._discard(raw)
+                return
+
+            with self._lock:
+                self._idle.append((raw, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                raw, _ = self._idle.pop()
+                self._discard(raw)
+
+
+# ============================================================
+# POOLED CONNECTION HANDLE
+# ============================================================
+class PooledConnection:
+    """
+    Drop-in stand-in for a psycopg2 connection.
+
+    Everything is delegated to the underlying connection except
+    close(), which hands it back to the pool instead of tearing
+    down the socket. A handle that is garbage-collected without
+    being closed is returned automatically.
+    """
+
+    __slots__ = ("_raw", "_pool", "_finalizer", "__weakref__")
+
+    def __init__(self, raw, pool):
+        self._raw = raw
+        self._pool = pool
+        self._finalizer = weakref.finalize(self, pool.putconn, raw)
+
+    @property
+    def raw(self):
+        return self._raw
+
+    @property
+    def closed(self):
+        return not self._finalizer.alive or self._raw.closed
+
+    def close(self):
+        self._finalizer()
+
+    def cursor(self, *args, **kwargs):
+        cur = self._raw.cursor(*args, **kwargs)
+        stats = current_stats()
+        return InstrumentedCursor(cur, stats) if stats is not None else cur
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        if name in PooledConnection.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._raw, name, value)
+
+    # `with conn:` keeps psycopg2 semantics (commit / rollback, no close)
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._raw.__exit__(exc_type, exc, tb)
+
+
+# ============================================================
+# PROCESS-WIDE PROVIDER
+# ============================================================
+_pool = None
+_read_pool = None
+_pool_lock = threading.Lock()
+
+# Set by @read_only (or replica_reads()) for the current request / task
+_use_replica: ContextVar[bool] = ContextVar("hrms_use_replica", default=False)
+# Set by the API middleware when the caller wrote recently
+_force_primary: ContextVar[bool] = ContextVar("hrms_force_primary", default=False)
+
+
+def configure_pool(minconn=POOL_MIN_SIZE, maxconn=POOL_MAX_SIZE, **kwargs):
+    """(Re)build the shared pool, e.g. from app startup or a worker process."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+        _pool = ConnectionPool(minconn=minconn, maxconn=maxconn, **kwargs)
+    return _pool
+
+
+def configure_read_pool(dsn, minconn=0, maxconn=READ_POOL_MAX_SIZE, **kwargs):
+    """(Re)build the replica pool; dsn=None turns replica routing off."""
+    global _read_pool, READ_DB_DSN
+    with _pool_lock:
+        if _read_pool is not None:
+            _read_pool.closeall()
+        _read_pool = None
+        READ_DB_DSN = dsn
+        if dsn:
+            _read_pool = ConnectionPool(
+                minconn=minconn, maxconn=maxconn, readonly=True, dsn=dsn, **kwargs
+            )
+    return _read_pool
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_read_pool():
+    """Replica pool, or None when no HRMS_READ_DB_DSN is configured."""
+    global _read_pool
+    if READ_DB_DSN is None:
+        return None
+    if _read_pool is None:
+        with _pool_lock:
+            if _read_pool is None:
+                _read_pool = ConnectionPool(minconn=0, maxconn=READ_POOL_MAX_SIZE,
+                                            readonly=True, dsn=READ_DB_DSN)
+    return _read_pool
+
+
+def close_pool():
+    global _pool, _read_pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+        if _read_pool is not None:
+            _read_pool.closeall()
+        _pool = None
+        _read_pool = None
+
+
+def replica_configured() -> bool:
+    return READ_DB_DSN is not None
+
+
 def get_connection():
-    return psycopg2.connect(**DB_PARAMS)
+    """
+    Check out a pooled connection.
+    Callers keep the usual pattern: use it, commit, then conn.close().
+
+    Inside a @read_only endpoint (or replica_reads()) the connection
+    comes from the read replica, unless the caller wrote recently.
+    """
+    pool = None
+    if _use_replica.get() and not _force_primary.get():
+        pool = get_read_pool()
+    pool = pool or get_pool()
+    return PooledConnection(pool.getconn(), pool)
+
+
+# ============================================================
+# READ ROUTING
+# ============================================================
+@contextmanager
+def replica_reads(enabled=True):
+    """Route get_connection() inside the block to the read replica."""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Read-your-writes: keep the block on the primary even under @read_only."""
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+def read_only(func):
+    """
+    Mark an endpoint or service function as read-only so its queries
+    run on the replica:
+
+        @router.get("/reports/late")
+        @read_only
+        def late_report(...):
+            ...
+
+    Without a configured replica this is a no-op.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def db_connection():
+    """
+    Context-manager API over the pool:
+
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            ...
+
+    Commits on success, rolls back on error, always returns the connection.
+    """
+    conn = get_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+@contextmanager
+def use_connection(conn=None):
+    """
+    Run DB helpers either inside the caller's unit of work or standalone.
+
+    - conn given  → yield it untouched; the owner commits / rolls back
+    - conn None   → behave like db_connection() (own transaction)
+    """
+    if conn is not None:
+        yield conn
+        return
+
+    with db_connection() as own:
+        yield own
+
+
+# ============================================================
+# REQUEST-SCOPED UNIT OF WORK (FastAPI dependency)
+# ============================================================
+def get_db():
+    """
+    One pooled connection and one transaction per API request:
+
+        @router.post("/check-in")
+        def check_in(payload, conn=Depends(get_db)):
+            return AttendanceService.check_in(..., conn=conn)
+
+    Commits once when the endpoint returns, rolls back if it raises.
+    """
+    with db_connection() as conn:
+        yield conn
@@ -1,22 +1,12 @@
-import psycopg2
 from psycopg2.extras import RealDictCursor
 
-# ============================================================
-# DATABASE CONFIG
-# ============================================================
-DB_PARAMS = {
-    "dbname": "hrms_db",
-    "user": "varun",
-    "password": "varun@123",
-    "host": "localhost",
-    "port": 5432,
-}
-
-# ============================================================
-# CONNECTOR
-# ============================================================
-def get_connection():
-    return psycopg2.connect(**DB_PARAMS)
+from app.database.connection import get_connection
+from app.database.migrate import migrate
+from app.database.partitions import (
+    PARTITIONED_TABLES,
+    create_default_partition,
+    maintain_partitions,
+)
 
 # ============================================================
 # CREATE ALL TABLES
@@ -82,14 +72,15 @@ def create_tables():
     # ============================================================
     cur.execute("""
     CREATE TABLE IF NOT EXISTS attendance_events (
-        event_id SERIAL PRIMARY KEY,
+        event_id SERIAL,
         employee_id INT REFERENCES employees(employee_id) ON DELETE CASCADE,
         event_type VARCHAR(20) NOT NULL,
         event_time TIMESTAMP NOT NULL,
         source VARCHAR(40) DEFAULT 'manual',
         meta JSONB,
-        created_at TIMESTAMP DEFAULT NOW()
-    );
+        created_at TIMESTAMP DEFAULT NOW(),
+        PRIMARY KEY (event_id, event_time)
+    ) PARTITION BY RANGE (event_time);
     """)
 
     # ============================================================
@@ -97,7 +88,7 @@ def create_tables():
     # ============================================================
     cur.execute("""
     CREATE TABLE IF NOT EXISTS attendance (
-        attendance_id SERIAL PRIMARY KEY,
+        attendance_id SERIAL,
         employee_id INT REFERENCES employees(employee_id) ON DELETE CASCADE,
         shift_id INT,
         date DATE NOT NULL,
@@ -119,8 +110,9 @@ def create_tables():
         is_payroll_locked BOOLEAN DEFAULT FALSE,
         locked_at TIMESTAMP,
         created_at TIMESTAMP DEFAULT NOW(),
+        PRIMARY KEY (attendance_id, date),
         UNIQUE(employee_id, date)
-    );
+    ) PARTITION BY RANGE (date);
     """)
 
     # ============================================================
@@ -325,10 +317,21 @@ def create_tables():
     );
     """)
 
+    # ============================================================
+    # MONTHLY PARTITIONS (attendance_events / attendance)
+    # ============================================================
+    for table in PARTITIONED_TABLES:
+        create_default_partition(cur, table)
+    maintain_partitions(conn=conn)
+
     conn.commit()
     cur.close()
     conn.close()
 
+    # Everything added since the baseline schema (payroll runs, locks, bank
+    # details, ...) comes from the versioned migrations
+    migrate("up")
+
     print("✅ ALL HRMS TABLES CREATED SUCCESSFULLY")
 
 # ============================================================
@@ -1,7 +1,8 @@
 # app/database/employee_db.py
 
 from psycopg2.extras import RealDictCursor
-from app.database.connection import get_connection
+from app.database.connection import get_connection, use_connection
+from app.database.records import RecordCursor
 
 
 class EmployeeDB:
@@ -43,6 +44,35 @@ class EmployeeDB:
         conn.close()
         return row and row[0] == "active"
 
+    # ============================
+    # ✅ ACTIVE IDS (BULK PAYROLL)
+    # ============================
+    @staticmethod
+    def get_active_ids(conn=None):
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT employee_id FROM employees WHERE status = 'active' ORDER BY employee_id;"
+            )
+            rows = cur.fetchall()
+            cur.close()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def get_active_departments(conn=None):
+        """[(employee_id, department)] for active employees, by employee_id."""
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT employee_id, department
+                FROM employees
+                WHERE status = 'active'
+                ORDER BY employee_id;
+            """)
+            rows = cur.fetchall()
+            cur.close()
+        return [(row[0], row[1]) for row in rows]
+
     # ============================
     # ✅ GET ALL (PAGINATED)
     # ============================
@@ -50,7 +80,7 @@ class EmployeeDB:
     def get_all(page=1, limit=50, status=""):
         offset = (page - 1) * limit
         conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur = conn.cursor(cursor_factory=RecordCursor)
 
         if status:
             cur.execute("""
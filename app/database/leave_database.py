@@ -1,21 +1,9 @@
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime, date
 
-# -----------------------------------
-# app/database/connection.py
-# -----------------------------------
-
-DB_PARAMS = {
-    "dbname": "hrms_db",
-    "user": "varun",
-    "password": "varun@123",
-    "host": "localhost",
-    "port": 5432,
-}
-
-def get_connection():
-    return psycopg2.connect(**DB_PARAMS)
+from app.database.connection import get_connection, use_connection
+from app.database.payroll_dirty import PayrollDirtyDB
+from app.database.streaming import iter_rows
 
 
 # ===============================================
@@ -251,25 +239,25 @@ class LeaveRequestDB:
     # --------- VALIDATION HELPERS ---------
 
     @staticmethod
-    def has_overlapping_approved_leave(employee_id, start_date, end_date):
+    def has_overlapping_approved_leave(employee_id, start_date, end_date, conn=None):
         """
         Check if employee already has an APPROVED leave overlapping this range.
         """
-        conn = get_connection()
-        cur = conn.cursor()
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
 
-        cur.execute("""
-            SELECT 1 FROM leave_requests
-            WHERE employee_id=%s
-              AND status='approved'
-              AND (
-                    (start_date <= %s AND end_date >= %s)
-                  )
-            LIMIT 1;
-        """, (employee_id, end_date, start_date))
-
-        exists = cur.fetchone()
-        conn.close()
+            cur.execute("""
+                SELECT 1 FROM leave_requests
+                WHERE employee_id=%s
+                  AND status='approved'
+                  AND (
+                        (start_date <= %s AND end_date >= %s)
+                      )
+                LIMIT 1;
+            """, (employee_id, end_date, start_date))
+
+            exists = cur.fetchone()
+            cur.close()
         return exists is not None
 
     # --------- CRUD / ACTIONS ---------
@@ -389,6 +377,11 @@ class LeaveRequestDB:
 
             history = cur.fetchone()
 
+            # 6️⃣ Payroll for the leave months must be recomputed
+            PayrollDirtyDB.mark_range(
+                leave["employee_id"], leave["start_date"], leave["end_date"], "leave", conn=conn
+            )
+
             # ✅ COMMIT ALL CHANGES
             conn.commit()
 
@@ -424,31 +417,36 @@ class LeaveRequestDB:
         conn.close()
         return res
 
-    @staticmethod
-    def list_requests(employee_id=None):
+    REQUESTS_SQL = """
+        SELECT lr.*, lt.name AS leave_type_name
+        FROM leave_requests lr
+        JOIN leave_types lt ON lr.leave_type_id = lt.leave_type_id
+        {where}
+        ORDER BY lr.applied_on DESC;
+    """
+
+    @classmethod
+    def _requests_query(cls, employee_id=None):
+        if employee_id:
+            return cls.REQUESTS_SQL.format(where="WHERE lr.employee_id=%s"), (employee_id,)
+        return cls.REQUESTS_SQL.format(where=""), None
+
+    @classmethod
+    def list_requests(cls, employee_id=None):
         conn = get_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        if employee_id:
-            cur.execute("""
-                SELECT lr.*, lt.name AS leave_type_name
-                FROM leave_requests lr
-                JOIN leave_types lt ON lr.leave_type_id = lt.leave_type_id
-                WHERE lr.employee_id=%s
-                ORDER BY lr.applied_on DESC;
-            """, (employee_id,))
-        else:
-            cur.execute("""
-                SELECT lr.*, lt.name AS leave_type_name
-                FROM leave_requests lr
-                JOIN leave_types lt ON lr.leave_type_id = lt.leave_type_id
-                ORDER BY lr.applied_on DESC;
-            """)
+        cur.execute(*cls._requests_query(employee_id))
 
         rows = cur.fetchall()
         conn.close()
         return rows
 
+    @classmethod
+    def iter_requests(cls, employee_id=None):
+        """Streaming form of list_requests (server-side cursor)."""
+        return iter_rows(*cls._requests_query(employee_id))
+
     @staticmethod
     def list_pending_requests():
         conn = get_connection()
@@ -482,6 +480,10 @@ class LeaveRequestDB:
         """, (status, leave_id))
 
         row = cur.fetchone()
+        if row and status == "approved":
+            PayrollDirtyDB.mark_range(
+                row["employee_id"], row["start_date"], row["end_date"], "leave", conn=conn
+            )
         conn.commit()
         conn.close()
         return row
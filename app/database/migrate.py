@@ -0,0 +1,229 @@
+# app/database/migrate.py
+"""
+Versioned schema migrations.
+
+Migrations live in app/database/migrations/NNNN_name.py and define:
+
+    DESCRIPTION = "what it does"
+    TRANSACTIONAL = True      # False for CREATE INDEX CONCURRENTLY & co.
+
+    def up(cur): ...
+    def down(cur): ...
+
+Applied versions are recorded in `schema_migrations`. Usage:
+
+    python -m app.database.migrate status
+    python -m app.database.migrate up [--target N]
+    python -m app.database.migrate down --target N
+"""
+import argparse
+import importlib
+import pkgutil
+import re
+from dataclasses import dataclass
+from types import ModuleType
+from typing import List, Optional
+
+import psycopg2
+
+from app.database.connection import DB_PARAMS
+from app.database import migrations as migrations_pkg
+
+# Arbitrary constant: serialises runners started from several nodes
+MIGRATION_LOCK_KEY = 7_320_001
+
+_NAME_RE = re.compile(r"^(\d{4})_(\w+)$")
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    module: ModuleType
+
+    @property
+    def description(self) -> str:
+        return getattr(self.module, "DESCRIPTION", self.name)
+
+    @property
+    def transactional(self) -> bool:
+        return getattr(self.module, "TRANSACTIONAL", True)
+
+
+# ============================================================
+# DISCOVERY
+# ============================================================
+def discover_migrations() -> List[Migration]:
+    found = []
+    for info in pkgutil.iter_modules(migrations_pkg.__path__):
+        match = _NAME_RE.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{migrations_pkg.__name__}.{info.name}")
+        found.append(Migration(int(match.group(1)), match.group(2), module))
+
+    found.sort(key=lambda m: m.version)
+
+    versions = [m.version for m in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+
+    return found
+
+
+# ============================================================
+# HISTORY TABLE
+# ============================================================
+def _ensure_history_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name VARCHAR(200) NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+            );
+        """)
+
+
+def applied_versions(conn) -> List[int]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT version FROM schema_migrations ORDER BY version;")
+        return [row[0] for row in cur.fetchall()]
+
+
+def _record(conn, migration: Migration, applied: bool):
+    with conn.cursor() as cur:
+        if applied:
+            cur.execute("""
+                INSERT INTO schema_migrations (version, name)
+                VALUES (%s, %s)
+                ON CONFLICT (version) DO NOTHING;
+            """, (migration.version, migration.name))
+        else:
+            cur.execute(
+                "DELETE FROM schema_migrations WHERE version = %s;",
+                (migration.version,),
+            )
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+def _run(conn, migration: Migration, direction: str):
+    step = getattr(migration.module, direction)
+
+    if migration.transactional:
+        conn.autocommit = False
+        with conn.cursor() as cur:
+            step(cur)
+        _record(conn, migration, applied=(direction == "up"))
+        conn.commit()
+        return
+
+    # CONCURRENTLY-style DDL cannot run inside a transaction block.
+    # Steps must be idempotent: if the process dies between the DDL and
+    # the history insert, the next run simply repeats them.
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        step(cur)
+    _record(conn, migration, applied=(direction == "up"))
+
+
+def migrate(direction: str = "up", target: Optional[int] = None, conn=None, log=print):
+    """
+    Apply (up) or revert (down) migrations.
+
+    up   → apply every pending migration with version <= target (default: all)
+    down → revert applied migrations with version > target (target required)
+    """
+    if direction not in ("up", "down"):
+        raise ValueError("direction must be 'up' or 'down'")
+    if direction == "down" and target is None:
+        raise ValueError("down migrations need an explicit target version")
+
+    own_conn = conn is None
+    if own_conn:
+        conn = psycopg2.connect(**DB_PARAMS)
+
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_KEY,))
+
+        try:
+            _ensure_history_table(conn)
+            done = set(applied_versions(conn))
+            all_migrations = discover_migrations()
+
+            if direction == "up":
+                plan = [
+                    m for m in all_migrations
+                    if m.version not in done and (target is None or m.version <= target)
+                ]
+            else:
+                plan = [
+                    m for m in reversed(all_migrations)
+                    if m.version in done and m.version > target
+                ]
+
+            for migration in plan:
+                log(f"{direction:>4} {migration.version:04d} {migration.description}")
+                _run(conn, migration, direction)
+
+            return [m.version for m in plan]
+
+        finally:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_KEY,))
+
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def status(conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = psycopg2.connect(**DB_PARAMS)
+
+    try:
+        conn.autocommit = True
+        _ensure_history_table(conn)
+        done = set(applied_versions(conn))
+        return [
+            {
+                "version": m.version,
+                "name": m.name,
+                "description": m.description,
+                "applied": m.version in done,
+            }
+            for m in discover_migrations()
+        ]
+    finally:
+        if own_conn:
+            conn.close()
+
+
+# ============================================================
+# CLI
+# ============================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HRMS schema migrations")
+    parser.add_argument("command", choices=["up", "down", "status"])
+    parser.add_argument("--target", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        for row in status():
+            mark = "x" if row["applied"] else " "
+            print(f"[{mark}] {row['version']:04d} {row['description']}")
+        return
+
+    applied = migrate(args.command, target=args.target)
+    if not applied:
+        print("Nothing to do.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Indexes for the hot service queries.
+
+Built CONCURRENTLY so punches and payroll keep writing while they build.
+"""
+
+DESCRIPTION = "Add performance indexes for attendance, payroll, shifts, leave, approvals, salary"
+TRANSACTIONAL = False
+
+INDEXES = [
+    # AttendanceEventDB.get_events_for_window / dashboard live feed
+    ("idx_attendance_events_employee_time",
+     "attendance_events (employee_id, event_time)"),
+
+    # company / dashboard / report queries filter on a single date
+    ("idx_attendance_date",
+     "attendance (date)"),
+
+    # /month/list, bulk payroll, payroll UI list
+    ("idx_payroll_year_month",
+     "payroll (year, month)"),
+
+    # ShiftDB.get_employee_shift (effective-dated lookup)
+    ("idx_employee_shifts_employee_effective",
+     "employee_shifts (employee_id, effective_from DESC)"),
+
+    # overlap checks, employee leave lists
+    ("idx_leave_requests_employee_status_start",
+     "leave_requests (employee_id, status, start_date)"),
+
+    # pending approvals per approver
+    ("idx_approval_logs_approver_status",
+     "approval_logs (approver_id, status)"),
+
+    # SalaryDB.get_active_for_date (effective-dated lookup)
+    ("idx_salary_structure_employee_effective",
+     "salary_structure (employee_id, effective_from DESC)"),
+]
+
+
+def _drop_if_invalid(cur, name):
+    # A failed CONCURRENTLY build leaves an INVALID index behind that
+    # IF NOT EXISTS would happily skip; clear it so the build is retried.
+    cur.execute("""
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s
+          AND NOT i.indisvalid;
+    """, (name,))
+    if cur.fetchone():
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
+
+
+def up(cur):
+    for name, target in INDEXES:
+        _drop_if_invalid(cur, name)
+        cur.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target};")
+
+
+def down(cur):
+    for name, _ in reversed(INDEXES):
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
@@ -0,0 +1,187 @@
+"""
+Monthly range partitioning for attendance_events (event_time) and
+attendance (date).
+
+Each table is rebuilt as a partitioned parent: the existing rows are
+copied into monthly partitions covering their range, the id sequence
+is carried over, and the hot indexes are recreated on the parent.
+Primary keys gain the partition key, as PostgreSQL requires.
+
+Runs in one transaction and holds ACCESS EXCLUSIVE on both tables
+while copying; schedule it in a maintenance window on large installs.
+
+The partition DDL helpers are frozen in this file rather than imported
+from app.database.partitions, so later changes there cannot change what
+this migration does.
+"""
+import os
+from datetime import date, datetime
+
+DESCRIPTION = "Partition attendance_events and attendance by month"
+TRANSACTIONAL = True
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("HRMS_PARTITION_MONTHS_AHEAD", "3"))
+
+TABLES = {
+    "attendance_events": {
+        "pk": "event_id",
+        "key": "event_time",
+        "columns": """
+            event_id INT NOT NULL,
+            employee_id INT REFERENCES employees(employee_id) ON DELETE CASCADE,
+            event_type VARCHAR(20) NOT NULL,
+            event_time TIMESTAMP NOT NULL,
+            source VARCHAR(40) DEFAULT 'manual',
+            meta JSONB,
+            created_at TIMESTAMP DEFAULT NOW()
+        """,
+        "names": [
+            "event_id", "employee_id", "event_type", "event_time",
+            "source", "meta", "created_at",
+        ],
+        "constraints": [
+            "ADD PRIMARY KEY (event_id, event_time)",
+        ],
+        "indexes": [
+            ("idx_attendance_events_employee_time", "(employee_id, event_time)"),
+        ],
+    },
+    "attendance": {
+        "pk": "attendance_id",
+        "key": "date",
+        "columns": """
+            attendance_id INT NOT NULL,
+            employee_id INT REFERENCES employees(employee_id) ON DELETE CASCADE,
+            shift_id INT,
+            date DATE NOT NULL,
+            check_in TIMESTAMP,
+            check_out TIMESTAMP,
+            total_hours NUMERIC(5,2),
+            net_hours NUMERIC(5,2),
+            break_minutes INT DEFAULT 0,
+            overtime_minutes INT DEFAULT 0,
+            late_minutes INT DEFAULT 0,
+            early_exit_minutes INT DEFAULT 0,
+            is_late BOOLEAN DEFAULT FALSE,
+            is_early_checkout BOOLEAN DEFAULT FALSE,
+            is_overtime BOOLEAN DEFAULT FALSE,
+            is_weekend BOOLEAN DEFAULT FALSE,
+            is_holiday BOOLEAN DEFAULT FALSE,
+            is_night_shift BOOLEAN DEFAULT FALSE,
+            status VARCHAR(20) DEFAULT 'present',
+            is_payroll_locked BOOLEAN DEFAULT FALSE,
+            locked_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT NOW()
+        """,
+        "names": [
+            "attendance_id", "employee_id", "shift_id", "date", "check_in",
+            "check_out", "total_hours", "net_hours", "break_minutes",
+            "overtime_minutes", "late_minutes", "early_exit_minutes",
+            "is_late", "is_early_checkout", "is_overtime", "is_weekend",
+            "is_holiday", "is_night_shift", "status", "is_payroll_locked",
+            "locked_at", "created_at",
+        ],
+        "constraints": [
+            "ADD PRIMARY KEY (attendance_id, date)",
+            # upsert_full_attendance: ON CONFLICT (employee_id, date)
+            "ADD CONSTRAINT attendance_employee_id_date_key UNIQUE (employee_id, date)",
+        ],
+        "indexes": [
+            ("idx_attendance_date", "(date)"),
+        ],
+    },
+}
+
+
+# ============================================================
+# PARTITION DDL (as of this migration)
+# ============================================================
+def _add_months(year, month, n):
+    index = year * 12 + (month - 1) + n
+    return index // 12, index % 12 + 1
+
+
+def _is_partitioned(cur, table):
+    cur.execute("""
+        SELECT 1
+        FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relname = %s;
+    """, (table,))
+    return cur.fetchone() is not None
+
+
+def _create_partition(cur, table, year, month):
+    next_year, next_month = _add_months(year, month, 1)
+    start, end = date(year, month, 1), date(next_year, next_month, 1)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table}_y{year:04d}m{month:02d}
+        PARTITION OF {table}
+        FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}');
+    """)
+
+
+def _create_default_partition(cur, table):
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT;")
+
+
+def _ensure_partitions(cur, table, first, last):
+    """Every monthly partition from first's month to last's month."""
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        _create_partition(cur, table, year, month)
+        year, month = _add_months(year, month, 1)
+
+
+def _sequence(cur, table, column):
+    cur.execute("SELECT pg_get_serial_sequence(%s, %s);", (table, column))
+    return cur.fetchone()[0]
+
+
+def _rebuild(cur, table, spec, partitioned):
+    """Copy `table` into a fresh (partitioned or plain) table of the same name."""
+    old = f"{table}_old"
+    names = ", ".join(spec["names"])
+    seq = _sequence(cur, table, spec["pk"])
+
+    cur.execute(f"ALTER TABLE {table} RENAME TO {old};")
+    # Keep the id sequence alive when the old table is dropped
+    cur.execute(f"ALTER SEQUENCE {seq} OWNED BY NONE;")
+
+    clause = f" PARTITION BY RANGE ({spec['key']})" if partitioned else ""
+    cur.execute(f"CREATE TABLE {table} ({spec['columns']}){clause};")
+    cur.execute(f"ALTER TABLE {table} ALTER COLUMN {spec['pk']} SET DEFAULT nextval('{seq}');")
+
+    if partitioned:
+        cur.execute(f"SELECT MIN({spec['key']}), MAX({spec['key']}) FROM {old};")
+        low, high = (v.date() if isinstance(v, datetime) else v for v in cur.fetchone())
+        today = date.today()
+        first = min(low, today) if low else today
+        last = date(*_add_months(today.year, today.month, PARTITION_MONTHS_AHEAD), 1)
+        if high and high > last:
+            last = high
+        _ensure_partitions(cur, table, date(first.year, first.month, 1), last)
+        _create_default_partition(cur, table)
+
+    cur.execute(f"INSERT INTO {table} ({names}) SELECT {names} FROM {old};")
+    cur.execute(f"DROP TABLE {old};")
+
+    cur.execute(f"ALTER SEQUENCE {seq} OWNED BY {table}.{spec['pk']};")
+    for constraint in spec["constraints"]:
+        cur.execute(f"ALTER TABLE {table} {constraint};")
+    for name, columns in spec["indexes"]:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {columns};")
+
+
+def up(cur):
+    for table, spec in TABLES.items():
+        if not _is_partitioned(cur, table):
+            _rebuild(cur, table, spec, partitioned=True)
+
+
+def down(cur):
+    # Partitions detached by maintenance are not part of the parent any
+    # more and are left in place as standalone tables.
+    for table, spec in TABLES.items():
+        if _is_partitioned(cur, table):
+            _rebuild(cur, table, spec, partitioned=False)
@@ -0,0 +1,55 @@
+"""
+Background payroll run jobs.
+
+payroll_runs holds one row per run (progress counters, cancel flag);
+payroll_run_items is the checkpoint: one row per employee, flipped
+from 'pending' to 'success' / 'failed' in the same transaction that
+writes the employee's payroll row.
+"""
+
+DESCRIPTION = "Add payroll_runs and payroll_run_items"
+TRANSACTIONAL = True
+
+
+def up(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS payroll_runs (
+            run_id SERIAL PRIMARY KEY,
+            year INT NOT NULL,
+            month INT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            total_employees INT NOT NULL DEFAULT 0,
+            processed INT NOT NULL DEFAULT 0,
+            succeeded INT NOT NULL DEFAULT 0,
+            failed INT NOT NULL DEFAULT 0,
+            cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT NOW(),
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_runs_status
+        ON payroll_runs (status, created_at);
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS payroll_run_items (
+            run_id INT NOT NULL REFERENCES payroll_runs(run_id) ON DELETE CASCADE,
+            employee_id INT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            error TEXT,
+            processed_at TIMESTAMP,
+            PRIMARY KEY (run_id, employee_id)
+        );
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_run_items_status
+        ON payroll_run_items (run_id, status, employee_id);
+    """)
+
+
+def down(cur):
+    cur.execute("DROP TABLE IF EXISTS payroll_run_items;")
+    cur.execute("DROP TABLE IF EXISTS payroll_runs;")
@@ -0,0 +1,32 @@
+"""
+Dirty tracking for incremental payroll regeneration.
+
+A row means the employee's payroll inputs for that month changed after
+the payroll was last computed. Marks are written alongside the change
+(attendance, salary_structure, leave approval, policy) and deleted by
+POST /hrms/payroll/regenerate with incremental=true.
+"""
+
+DESCRIPTION = "Add payroll_dirty"
+TRANSACTIONAL = True
+
+
+def up(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS payroll_dirty (
+            employee_id INT NOT NULL,
+            year INT NOT NULL,
+            month INT NOT NULL,
+            reason VARCHAR(30),
+            marked_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (employee_id, year, month)
+        );
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_dirty_period
+        ON payroll_dirty (year, month);
+    """)
+
+
+def down(cur):
+    cur.execute("DROP TABLE IF EXISTS payroll_dirty;")
@@ -0,0 +1,20 @@
+"""
+Record the payroll policy version each run computes with.
+
+Policies are insert-only (update_policy adds a row), so payroll_policies.id
+is the version stamp. A resumed run keeps using the version it started with.
+"""
+
+DESCRIPTION = "Add payroll_runs.policy_id"
+TRANSACTIONAL = True
+
+
+def up(cur):
+    cur.execute("""
+        ALTER TABLE payroll_runs
+        ADD COLUMN IF NOT EXISTS policy_id INT REFERENCES payroll_policies(id);
+    """)
+
+
+def down(cur):
+    cur.execute("ALTER TABLE payroll_runs DROP COLUMN IF EXISTS policy_id;")
@@ -0,0 +1,62 @@
+"""
+Period-level attendance lock.
+
+Payroll used to lock attendance by setting attendance.is_payroll_locked on
+every row of the month (~150k row rewrites per company run). A lock is now
+one attendance_lock row per (year, month), with optional per-employee
+overrides in attendance_lock_exception. attendance_is_locked() resolves the
+effective lock for write guards; the application caches it per month
+(app.database.payroll.AttendanceLockDB).
+
+Existing row flags are left in place; they are still honoured.
+"""
+
+DESCRIPTION = "Add attendance_lock and attendance_lock_exception"
+TRANSACTIONAL = True
+
+
+def up(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_lock (
+            year INT NOT NULL,
+            month INT NOT NULL,
+            locked_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (year, month)
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_lock_exception (
+            employee_id INT NOT NULL,
+            year INT NOT NULL,
+            month INT NOT NULL,
+            is_locked BOOLEAN NOT NULL,
+            updated_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (year, month, employee_id)
+        );
+    """)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION attendance_is_locked(p_employee_id INT, p_date DATE)
+        RETURNS BOOLEAN
+        LANGUAGE sql STABLE
+        AS $$
+            SELECT COALESCE(
+                (SELECT x.is_locked
+                 FROM attendance_lock_exception x
+                 WHERE x.employee_id = p_employee_id
+                   AND x.year = EXTRACT(YEAR FROM p_date)::int
+                   AND x.month = EXTRACT(MONTH FROM p_date)::int),
+                EXISTS (
+                    SELECT 1
+                    FROM attendance_lock l
+                    WHERE l.year = EXTRACT(YEAR FROM p_date)::int
+                      AND l.month = EXTRACT(MONTH FROM p_date)::int
+                )
+            );
+        $$;
+    """)
+
+
+def down(cur):
+    cur.execute("DROP FUNCTION IF EXISTS attendance_is_locked(INT, DATE);")
+    cur.execute("DROP TABLE IF EXISTS attendance_lock_exception;")
+    cur.execute("DROP TABLE IF EXISTS attendance_lock;")
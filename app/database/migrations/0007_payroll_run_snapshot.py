@@ -0,0 +1,41 @@
+"""
+Per-run payroll snapshots.
+
+payroll keeps only the latest version of each (employee, month); a
+regeneration overwrites it. payroll_run_snapshot keeps the rows each
+payroll run wrote, so GET /hrms/payroll/compare can diff a run against
+the previous run of the same period (or any other run / month).
+"""
+
+DESCRIPTION = "Add payroll_run_snapshot"
+TRANSACTIONAL = True
+
+
+def up(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS payroll_run_snapshot (
+            run_id INT NOT NULL REFERENCES payroll_runs(run_id) ON DELETE CASCADE,
+            employee_id INT NOT NULL,
+            working_days INT,
+            present_days INT,
+            total_hours NUMERIC(10,2),
+            gross_salary NUMERIC(10,2),
+            net_salary NUMERIC(10,2),
+            basic_pay NUMERIC(10,2),
+            hra_pay NUMERIC(10,2),
+            allowances_pay NUMERIC(10,2),
+            overtime_hours NUMERIC(10,2),
+            overtime_pay NUMERIC(10,2),
+            lop_days NUMERIC(5,2),
+            lop_deduction NUMERIC(10,2),
+            late_penalty NUMERIC(10,2),
+            early_penalty NUMERIC(10,2),
+            holiday_pay NUMERIC(10,2),
+            night_shift_allowance NUMERIC(10,2),
+            PRIMARY KEY (run_id, employee_id)
+        );
+    """)
+
+
+def down(cur):
+    cur.execute("DROP TABLE IF EXISTS payroll_run_snapshot;")
@@ -0,0 +1,28 @@
+"""
+Bank details for salary transfers.
+
+Used by the bank-transfer CSV export (GET /hrms/payroll/export/bank-transfer).
+Nullable: employees without details are left out of the transfer file and
+flagged in the summary CSV.
+"""
+
+DESCRIPTION = "Add bank account columns to employees"
+TRANSACTIONAL = True
+
+
+def up(cur):
+    cur.execute("""
+        ALTER TABLE employees
+            ADD COLUMN IF NOT EXISTS bank_account_holder VARCHAR(200),
+            ADD COLUMN IF NOT EXISTS bank_account_number VARCHAR(34),
+            ADD COLUMN IF NOT EXISTS bank_ifsc VARCHAR(11);
+    """)
+
+
+def down(cur):
+    cur.execute("""
+        ALTER TABLE employees
+            DROP COLUMN IF EXISTS bank_account_holder,
+            DROP COLUMN IF EXISTS bank_account_number,
+            DROP COLUMN IF EXISTS bank_ifsc;
+    """)
@@ -0,0 +1,91 @@
+"""
+Year-to-date payroll ledger.
+
+payroll_ytd_ledger holds one row per employee per financial year
+(HRMS_FISCAL_YEAR_START_MONTH, April by default) with the running totals
+of every payroll month written so far. PayrollDB refreshes it in the
+same transaction as each payroll upsert; this migration backfills it
+from the existing payroll rows.
+
+The backfill SQL is frozen here rather than imported from
+app.database.payroll_ledger, so later changes to the ledger code cannot
+change what this migration does.
+"""
+import os
+
+DESCRIPTION = "Add payroll_ytd_ledger"
+TRANSACTIONAL = True
+
+# First calendar month of the financial year (4 = April..March)
+FISCAL_YEAR_START_MONTH = int(os.getenv("HRMS_FISCAL_YEAR_START_MONTH", "4"))
+
+_BACKFILL_SQL = """
+    INSERT INTO payroll_ytd_ledger (
+        employee_id, fiscal_year, months, finalized_months, through_year, through_month,
+        gross_salary, net_salary, basic_pay, hra_pay, allowances_pay,
+        overtime_hours, overtime_pay, lop_days, lop_deduction,
+        late_penalty, early_penalty, holiday_pay, night_shift_allowance, updated_at
+    )
+    SELECT
+        p.employee_id,
+        p.fiscal_year,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE p.is_finalized),
+        (ARRAY_AGG(p.year ORDER BY p.year DESC, p.month DESC))[1],
+        (ARRAY_AGG(p.month ORDER BY p.year DESC, p.month DESC))[1],
+        COALESCE(SUM(p.gross_salary), 0),
+        COALESCE(SUM(p.net_salary), 0),
+        COALESCE(SUM(p.basic_pay), 0),
+        COALESCE(SUM(p.hra_pay), 0),
+        COALESCE(SUM(p.allowances_pay), 0),
+        COALESCE(SUM(p.overtime_hours), 0),
+        COALESCE(SUM(p.overtime_pay), 0),
+        COALESCE(SUM(p.lop_days), 0),
+        COALESCE(SUM(p.lop_deduction), 0),
+        COALESCE(SUM(p.late_penalty), 0),
+        COALESCE(SUM(p.early_penalty), 0),
+        COALESCE(SUM(p.holiday_pay), 0),
+        COALESCE(SUM(p.night_shift_allowance), 0),
+        NOW()
+    FROM (
+        SELECT payroll.*,
+               CASE WHEN month >= %(start)s THEN year ELSE year - 1 END AS fiscal_year
+        FROM payroll
+    ) p
+    GROUP BY p.employee_id, p.fiscal_year
+    ON CONFLICT (employee_id, fiscal_year) DO NOTHING;
+"""
+
+
+def up(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS payroll_ytd_ledger (
+            employee_id INT NOT NULL REFERENCES employees(employee_id) ON DELETE CASCADE,
+            fiscal_year INT NOT NULL,
+            months INT NOT NULL DEFAULT 0,
+            finalized_months INT NOT NULL DEFAULT 0,
+            through_year INT,
+            through_month INT,
+            gross_salary NUMERIC(12,2) NOT NULL DEFAULT 0,
+            net_salary NUMERIC(12,2) NOT NULL DEFAULT 0,
+            basic_pay NUMERIC(12,2) NOT NULL DEFAULT 0,
+            hra_pay NUMERIC(12,2) NOT NULL DEFAULT 0,
+            allowances_pay NUMERIC(12,2) NOT NULL DEFAULT 0,
+            overtime_hours NUMERIC(10,2) NOT NULL DEFAULT 0,
+            overtime_pay NUMERIC(12,2) NOT NULL DEFAULT 0,
+            lop_days NUMERIC(6,2) NOT NULL DEFAULT 0,
+            lop_deduction NUMERIC(12,2) NOT NULL DEFAULT 0,
+            late_penalty NUMERIC(12,2) NOT NULL DEFAULT 0,
+            early_penalty NUMERIC(12,2) NOT NULL DEFAULT 0,
+            holiday_pay NUMERIC(12,2) NOT NULL DEFAULT 0,
+            night_shift_allowance NUMERIC(12,2) NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (employee_id, fiscal_year)
+        );
+    """)
+
+    cur.execute(_BACKFILL_SQL, {"start": FISCAL_YEAR_START_MONTH})
+
+
+def down(cur):
+    cur.execute("DROP TABLE IF EXISTS payroll_ytd_ledger;")
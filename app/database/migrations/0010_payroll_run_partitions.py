@@ -0,0 +1,67 @@
+"""
+Claimable partitions of a payroll run.
+
+A run's employees are split into contiguous employee_id ranges
+(payroll_run_partitions). Workers on any node claim one partition at a
+time with FOR UPDATE SKIP LOCKED, so several API nodes / worker
+processes share a month-end run. `attempts` is bumped on every claim
+and doubles as a fencing token: a worker whose partition was reclaimed
+after it stopped heart-beating can no longer commit into it.
+
+Unfinished runs created before this migration get their partitions here,
+with the partitioning SQL frozen in this file rather than imported from
+app.database.payroll_runs.
+"""
+import os
+
+DESCRIPTION = "Add payroll_run_partitions"
+TRANSACTIONAL = True
+
+# Employees per partition (HRMS_PAYROLL_RUN_PARTITION_SIZE)
+PARTITION_SIZE = int(os.getenv("HRMS_PAYROLL_RUN_PARTITION_SIZE", "1000"))
+
+# Contiguous employee_id ranges of every unfinished run's items
+_BACKFILL_SQL = """
+    INSERT INTO payroll_run_partitions
+        (run_id, partition_no, first_employee_id, last_employee_id, employees)
+    SELECT run_id, (rn - 1) / %(size)s, MIN(employee_id), MAX(employee_id), COUNT(*)
+    FROM (
+        SELECT i.run_id, i.employee_id,
+               ROW_NUMBER() OVER (PARTITION BY i.run_id ORDER BY i.employee_id) AS rn
+        FROM payroll_run_items i
+        JOIN payroll_runs r ON r.run_id = i.run_id
+        WHERE r.status IN ('pending', 'running')
+    ) i
+    GROUP BY run_id, (rn - 1) / %(size)s
+    ON CONFLICT (run_id, partition_no) DO NOTHING;
+"""
+
+
+def up(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS payroll_run_partitions (
+            run_id INT NOT NULL REFERENCES payroll_runs(run_id) ON DELETE CASCADE,
+            partition_no INT NOT NULL,
+            first_employee_id INT NOT NULL,
+            last_employee_id INT NOT NULL,
+            employees INT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            worker_id VARCHAR(100),
+            attempts INT NOT NULL DEFAULT 0,
+            claimed_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            PRIMARY KEY (run_id, partition_no)
+        );
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_payroll_run_partitions_open
+        ON payroll_run_partitions (run_id, partition_no)
+        WHERE status <> 'done';
+    """)
+
+    cur.execute(_BACKFILL_SQL, {"size": PARTITION_SIZE})
+
+
+def down(cur):
+    cur.execute("DROP TABLE IF EXISTS payroll_run_partitions;")
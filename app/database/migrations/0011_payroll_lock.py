@@ -0,0 +1,28 @@
+"""
+Payroll period lock.
+
+payroll_lock holds one row per (year, month) whose payroll is locked
+against regeneration. It used to be created with CREATE TABLE IF NOT
+EXISTS on every API worker start; the application now only reads and
+writes it (app.database.payroll.PayrollLockDB).
+"""
+
+DESCRIPTION = "Add payroll_lock"
+TRANSACTIONAL = True
+
+
+def up(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS payroll_lock (
+            id SERIAL PRIMARY KEY,
+            year INT NOT NULL,
+            month INT NOT NULL,
+            is_locked BOOLEAN NOT NULL DEFAULT FALSE,
+            locked_at TIMESTAMP,
+            UNIQUE (year, month)
+        );
+    """)
+
+
+def down(cur):
+    cur.execute("DROP TABLE IF EXISTS payroll_lock;")
@@ -0,0 +1 @@
+# Numbered schema migrations, applied by app/database/migrate.py
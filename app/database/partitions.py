@@ -0,0 +1,196 @@
+# app/database/partitions.py
+"""
+Monthly range partitions for the time-series attendance tables.
+
+    attendance_events  PARTITION BY RANGE (event_time)
+    attendance         PARTITION BY RANGE (date)
+
+Partitions are named <table>_yYYYYmMM and cover one calendar month.
+maintain_partitions() keeps PARTITION_MONTHS_AHEAD future months
+created and detaches (optionally drops) partitions older than the
+table's retention. It is idempotent and runs on app startup; schedule
+
+    python -m app.database.partitions
+
+daily from cron on long-running deployments.
+"""
+import argparse
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional
+
+from app.database.connection import use_connection
+
+# table -> partition key column
+PARTITIONED_TABLES = {
+    "attendance_events": "event_time",
+    "attendance": "date",
+}
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("HRMS_PARTITION_MONTHS_AHEAD", "3"))
+
+# Months kept attached; 0 = keep forever. Processed attendance feeds
+# payroll history, so only the raw punch log expires by default.
+RETENTION_MONTHS = {
+    "attendance_events": int(os.getenv("HRMS_ATTENDANCE_EVENTS_RETENTION_MONTHS", "24")),
+    "attendance": int(os.getenv("HRMS_ATTENDANCE_RETENTION_MONTHS", "0")),
+}
+
+# Expired partitions are detached (kept as standalone tables for
+# archiving) unless this is set, in which case they are dropped.
+DROP_EXPIRED = os.getenv("HRMS_PARTITION_DROP_EXPIRED", "0") == "1"
+
+# Serialises maintenance started from several app workers
+PARTITION_LOCK_KEY = 7_320_002
+
+_NAME_RE = re.compile(r"^(?P<table>\w+)_y(?P<year>\d{4})m(?P<month>\d{2})$")
+
+
+# ============================================================
+# NAMING / BOUNDS
+# ============================================================
+def add_months(year: int, month: int, n: int):
+    index = year * 12 + (month - 1) + n
+    return index // 12, index % 12 + 1
+
+
+def partition_name(table: str, year: int, month: int) -> str:
+    return f"{table}_y{year:04d}m{month:02d}"
+
+
+def month_bounds(year: int, month: int):
+    """[first day of month, first day of next month)"""
+    next_year, next_month = add_months(year, month, 1)
+    return date(year, month, 1), date(next_year, next_month, 1)
+
+
+# ============================================================
+# DDL HELPERS (take a cursor; caller owns the transaction)
+# ============================================================
+def is_partitioned(cur, table: str) -> bool:
+    cur.execute("""
+        SELECT 1
+        FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relname = %s;
+    """, (table,))
+    return cur.fetchone() is not None
+
+
+def list_partitions(cur, table: str) -> List[str]:
+    cur.execute("""
+        SELECT child.relname
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child  ON child.oid  = i.inhrelid
+        WHERE parent.relname = %s
+        ORDER BY child.relname;
+    """, (table,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def create_partition(cur, table: str, year: int, month: int) -> str:
+    name = partition_name(table, year, month)
+    start, end = month_bounds(year, month)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {name}
+        PARTITION OF {table}
+        FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}');
+    """)
+    return name
+
+
+def create_default_partition(cur, table: str) -> str:
+    # Safety net for rows outside every monthly range (e.g. a backdated
+    # import). Kept empty in normal operation so new months attach cheaply.
+    name = f"{table}_default"
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} DEFAULT;")
+    return name
+
+
+def ensure_partitions(cur, table: str, first: date, last: date) -> List[str]:
+    """Create every monthly partition from first's month to last's month."""
+    created = []
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        created.append(create_partition(cur, table, year, month))
+        year, month = add_months(year, month, 1)
+    return created
+
+
+def expired_partitions(partitions: List[str], table: str, keep_months: int, today: date) -> List[str]:
+    """Monthly partitions that end before the retention cutoff."""
+    if keep_months <= 0:
+        return []
+
+    cutoff = date(*add_months(today.year, today.month, -keep_months), 1)
+    expired = []
+    for name in partitions:
+        match = _NAME_RE.match(name)
+        if not match or match.group("table") != table:
+            continue
+        _, end = month_bounds(int(match.group("year")), int(match.group("month")))
+        if end <= cutoff:
+            expired.append(name)
+    return expired
+
+
+# ============================================================
+# MAINTENANCE
+# ============================================================
+def maintain_partitions(conn=None, today: Optional[date] = None,
+                        months_ahead: int = PARTITION_MONTHS_AHEAD,
+                        drop_expired: bool = DROP_EXPIRED) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Create upcoming monthly partitions and retire expired ones for
+    every table in PARTITIONED_TABLES. Tables that are not partitioned
+    yet (migration 0002 not applied) are skipped.
+    """
+    today = today or date.today()
+    last = date(*add_months(today.year, today.month, months_ahead), 1)
+    report = {}
+
+    with use_connection(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_xact_lock(%s);", (PARTITION_LOCK_KEY,))
+
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(cur, table):
+                continue
+
+            existing = set(list_partitions(cur, table))
+            wanted = ensure_partitions(cur, table, date(today.year, today.month, 1), last)
+
+            retired = []
+            for name in expired_partitions(sorted(existing), table, RETENTION_MONTHS[table], today):
+                cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name};")
+                if drop_expired:
+                    cur.execute(f"DROP TABLE {name};")
+                retired.append(name)
+
+            report[table] = {
+                "created": [n for n in wanted if n not in existing],
+                "dropped" if drop_expired else "detached": retired,
+            }
+
+        cur.close()
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain attendance table partitions")
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--drop-expired", action="store_true", default=DROP_EXPIRED)
+    args = parser.parse_args(argv)
+
+    report = maintain_partitions(months_ahead=args.months_ahead, drop_expired=args.drop_expired)
+    for table, changes in report.items():
+        for action, names in changes.items():
+            for name in names:
+                print(f"{table}: {action} {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,66 @@
 # app/database/payroll_db.py
 
+import json
+import logging
+import os
+import select
+import threading
+import time
 from datetime import date
-from psycopg2.extras import RealDictCursor
-from app.database.connection import get_connection
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.extras import RealDictCursor, execute_values
+from app.database.connection import DB_PARAMS, get_connection, use_connection
+from app.database.payroll_dirty import PayrollDirtyDB, months_between
+from app.database.payroll_ledger import PayrollLedgerDB
+from app.database.records import RecordCursor
+
+logger = logging.getLogger("hrms.payroll")
 
 
 # ============================================================
 # ✅ PAYROLL DATABASE (FULL PERSISTENCE)
 # ============================================================
 
+# Value columns written by upsert_payroll / bulk_upsert_payroll
+PAYROLL_VALUE_COLUMNS = (
+    "working_days",
+    "present_days",
+    "total_hours",
+    "gross_salary",
+    "net_salary",
+    "basic_pay",
+    "hra_pay",
+    "allowances_pay",
+    "overtime_hours",
+    "overtime_pay",
+    "lop_days",
+    "lop_deduction",
+    "late_penalty",
+    "early_penalty",
+    "holiday_pay",
+    "night_shift_allowance",
+    "is_finalized",
+)
+
+_BULK_UPSERT_PAYROLL_SQL = """
+    INSERT INTO payroll (employee_id, month, year, {columns}, generated_at)
+    VALUES %s
+    ON CONFLICT (employee_id, month, year)
+    DO UPDATE SET
+        {updates},
+        generated_at = NOW()
+    RETURNING *;
+""".format(
+    columns=", ".join(PAYROLL_VALUE_COLUMNS),
+    updates=",\n        ".join("%s = EXCLUDED.%s" % (c, c) for c in PAYROLL_VALUE_COLUMNS),
+)
+
+_BULK_UPSERT_PAYROLL_TEMPLATE = "(%s)" % ", ".join(
+    ["%s"] * (3 + len(PAYROLL_VALUE_COLUMNS)) + ["NOW()"]
+)
+
 class PayrollDB:
 
     @staticmethod
@@ -41,8 +93,12 @@ class PayrollDB:
         night_shift_allowance: float,
 
         is_finalized: bool = False,
+        conn=None,
     ):
-        conn = get_connection()
+        # Caller's connection: the caller owns the transaction
+        own_conn = conn is None
+        if own_conn:
+            conn = get_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
 
         cur.execute("""
@@ -159,15 +215,18 @@ class PayrollDB:
         ))
 
         row = cur.fetchone()
-        conn.commit()
+        # Same transaction: the YTD ledger never disagrees with payroll
+        PayrollLedgerDB.refresh([(employee_id, year, month)], conn=conn)
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.commit()
+            conn.close()
         return row
 
     @staticmethod
     def get_payroll(employee_id: int, month: int, year: int):
         conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur = conn.cursor(cursor_factory=RecordCursor)
 
         cur.execute("""
             SELECT *
@@ -183,51 +242,165 @@ class PayrollDB:
         return row
 
     @staticmethod
-    def lock_attendance_for_period(employee_id: int, start_date: date, end_date: date):
-        conn = get_connection()
-        cur = conn.cursor()
+    def lock_attendance_for_period(employee_id: int, start_date: date, end_date: date, conn=None):
+        """Per-employee lock exception for every month in the period (no row UPDATEs)."""
+        with use_connection(conn) as conn:
+            for year, month in months_between(start_date, end_date):
+                AttendanceLockDB.set_employees([employee_id], year, month, True, conn=conn)
+        return True
 
-        cur.execute("""
-            UPDATE attendance
-            SET
-                is_payroll_locked = TRUE,
-                locked_at = NOW()
-            WHERE employee_id = %s
-              AND date BETWEEN %s AND %s;
-        """, (employee_id, start_date, end_date))
+    # ============================================================
+    # ✅ SET-BASED WRITES (bulk payroll engine)
+    # ============================================================
 
-        conn.commit()
-        cur.close()
-        conn.close()
-        return True
+    @staticmethod
+    def bulk_upsert_payroll(year: int, month: int, rows, conn=None, page_size: int = 1000):
+        """
+        Multi-row upsert: rows are (employee_id, fields) pairs where fields
+        has every PAYROLL_VALUE_COLUMNS key. Returns {employee_id: payroll row}.
+        """
+        values = [
+            (employee_id, month, year, *(fields[c] for c in PAYROLL_VALUE_COLUMNS))
+            for employee_id, fields in rows
+        ]
+        if not values:
+            return {}
+
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            written = execute_values(
+                cur,
+                _BULK_UPSERT_PAYROLL_SQL,
+                values,
+                template=_BULK_UPSERT_PAYROLL_TEMPLATE,
+                page_size=page_size,
+                fetch=True,
+            )
+            cur.close()
+            PayrollLedgerDB.refresh_month([row["employee_id"] for row in written], year, month, conn=conn)
+
+        return {row["employee_id"]: row for row in written}
+
+    @staticmethod
+    def lock_attendance_month(year: int, month: int, employee_ids, conn=None) -> int:
+        """
+        Lock the month's attendance of the employees a run computed (one
+        multi-row exception write). Employees outside the run, e.g. hired
+        or activated after it, are not locked and keep punching.
+        """
+        return AttendanceLockDB.set_employees(employee_ids, year, month, True, conn=conn)
 
 
 # ============================================================
-# ✅ PAYROLL POLICY DATABASE (ADMIN CONTROL)
+# ✅ PAYROLL POLICY DATABASE (ADMIN CONTROL, CACHED)
 # ============================================================
 
+# NOTIFY channel announcing a new active policy (payload: policy id)
+POLICY_CHANNEL = "payroll_policy"
+
+# NOTIFY channel announcing an attendance lock change (payload: "year-month")
+ATTENDANCE_LOCK_CHANNEL = "attendance_lock"
+
+# NOTIFY channel announcing a payroll period lock change (payload: "year-month")
+PAYROLL_LOCK_CHANNEL = "payroll_lock"
+
+
 class PayrollPolicyDB:
+    """
+    Active payroll policy, cached per process.
+
+    Policies are never edited in place: update_policy() inserts a new row,
+    so the row id is the policy version. The writer refreshes its own
+    cache and NOTIFYs POLICY_CHANNEL; PayrollChangeListener drops the cache
+    in every other process. Without a listener, entries expire after
+    CACHE_TTL_SECONDS.
+    """
+
+    CACHE_TTL_SECONDS = float(os.getenv("HRMS_PAYROLL_POLICY_CACHE_TTL", "300"))
+
+    _active = None              # (policy, cached_at)
+    _generation = 0             # bumped by invalidate()
+    _versions = {}              # policy id -> policy (rows are immutable)
+    _cache_lock = threading.Lock()
+
+    # --------------------------------------------------------
+    @classmethod
+    def invalidate(cls):
+        with cls._cache_lock:
+            cls._active = None
+            cls._generation += 1
+
+    @classmethod
+    def _store(cls, policy, generation: int = None):
+        with cls._cache_lock:
+            # A NOTIFY arrived while this row was being read: don't cache it
+            if generation is not None and generation != cls._generation:
+                return
+            cls._active = (policy, time.monotonic())
+            if policy is not None:
+                cls._versions[policy["id"]] = policy
+
+    @classmethod
+    def _cached(cls):
+        with cls._cache_lock:
+            hit = cls._active
+        if hit is None:
+            return None
+        if not PayrollChangeListener.connected.is_set() and \
+                time.monotonic() - hit[1] >= cls.CACHE_TTL_SECONDS:
+            return None
+        return hit
+
+    # --------------------------------------------------------
+    @classmethod
+    def get_active_policy(cls, conn=None):
+        hit = cls._cached()
+        if hit is not None:
+            return dict(hit[0]) if hit[0] is not None else None
+
+        generation = cls._generation
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute("""
+                SELECT *
+                FROM payroll_policies
+                WHERE active = TRUE
+                ORDER BY created_at DESC
+                LIMIT 1;
+            """)
+
+            policy = cur.fetchone()
+            cur.close()
+
+        policy = dict(policy) if policy else None
+        cls._store(policy, generation)
+        return dict(policy) if policy else None
+
+    @classmethod
+    def get_policy(cls, policy_id: int):
+        """A specific policy version (e.g. the one a payroll run started with)."""
+        with cls._cache_lock:
+            policy = cls._versions.get(policy_id)
+        if policy is not None:
+            return dict(policy)
 
-    @staticmethod
-    def get_active_policy():
         conn = get_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        cur.execute("""
-            SELECT *
-            FROM payroll_policies
-            WHERE active = TRUE
-            ORDER BY created_at DESC
-            LIMIT 1;
-        """)
-
+        cur.execute("SELECT * FROM payroll_policies WHERE id = %s;", (policy_id,))
         policy = cur.fetchone()
         cur.close()
         conn.close()
-        return policy
 
-    @staticmethod
-    def update_policy(data: dict):
+        if not policy:
+            return None
+        policy = dict(policy)
+        with cls._cache_lock:
+            cls._versions[policy_id] = policy
+        return dict(policy)
+
+    @classmethod
+    def update_policy(cls, data: dict):
         conn = get_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
 
@@ -262,7 +435,454 @@ class PayrollPolicyDB:
         """, data)
 
         policy = cur.fetchone()
+        # Every unfinalized payroll was computed with the old policy
+        PayrollDirtyDB.mark_all("policy", conn=conn)
+        # Delivered to other workers on commit
+        cur.execute("SELECT pg_notify(%s, %s);", (POLICY_CHANNEL, str(policy["id"])))
         conn.commit()
         cur.close()
         conn.close()
+
+        cls._store(dict(policy))
         return policy
+
+
+# ============================================================
+# ✅ PAYROLL CHANGE LISTENER (LISTEN / NOTIFY)
+# ============================================================
+
+class PayrollChangeListener(threading.Thread):
+    """
+    Holds one dedicated autocommit connection (outside the pool) that
+    LISTENs on POLICY_CHANNEL, ATTENDANCE_LOCK_CHANNEL and
+    PAYROLL_LOCK_CHANNEL and drops the matching process-local cache on
+    every notification. Reconnects with backoff; while disconnected the
+    caches fall back to their TTLs.
+    """
+
+    RECONNECT_SECONDS = 5.0
+
+    # Set while a listener is connected: caches may then skip their TTL
+    connected = threading.Event()
+
+    def __init__(self, conn_params=None, poll_seconds: float = 5.0):
+        super().__init__(name="payroll-change-listener", daemon=True)
+        self.conn_params = conn_params or DB_PARAMS
+        self.poll_seconds = poll_seconds
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def handlers():
+        return {
+            POLICY_CHANNEL: lambda payload: PayrollPolicyDB.invalidate(),
+            ATTENDANCE_LOCK_CHANNEL: AttendanceLockDB.invalidate_payload,
+            PAYROLL_LOCK_CHANNEL: PayrollLockDB.invalidate_payload,
+        }
+
+    @classmethod
+    def invalidate_all(cls):
+        PayrollPolicyDB.invalidate()
+        AttendanceLockDB.invalidate()
+        PayrollLockDB.invalidate()
+
+    def stop(self, timeout: float = None):
+        self._stop_event.set()
+        self.join(timeout)
+
+    def _listen_once(self):
+        handlers = self.handlers()
+        conn = psycopg2.connect(**self.conn_params)
+        try:
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            cur = conn.cursor()
+            for channel in handlers:
+                cur.execute(f"LISTEN {channel};")
+            cur.close()
+
+            # Anything cached before LISTEN may already be stale
+            self.invalidate_all()
+            self.connected.set()
+
+            while not self._stop_event.is_set():
+                if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    handlers[note.channel](note.payload)
+        finally:
+            self.connected.clear()
+            conn.close()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception("payroll change listener disconnected")
+                self.invalidate_all()
+                self._stop_event.wait(self.RECONNECT_SECONDS)
+
+
+_change_listener = None
+
+
+def start_change_listener():
+    global _change_listener
+    if _change_listener is None or not _change_listener.is_alive():
+        _change_listener = PayrollChangeListener()
+        _change_listener.start()
+    return _change_listener
+
+
+def stop_change_listener(timeout: float = 10):
+    global _change_listener
+    if _change_listener is not None:
+        _change_listener.stop(timeout)
+        _change_listener = None
+
+
+# ============================================================
+# ✅ PAYROLL PERIOD LOCK (CACHED)
+# ============================================================
+
+class PayrollLockDB:
+    """
+    Period-level payroll lock (one row per year/month).
+
+    The table is created by migration 0011_payroll_lock, never on the
+    request path. Lock state is cached per process; set_lock() invalidates
+    the local cache and NOTIFYs PAYROLL_LOCK_CHANNEL so PayrollChangeListener
+    drops it in every other worker (API and payroll run workers alike).
+    Without a listener, entries expire after CACHE_TTL_SECONDS.
+    """
+
+    CACHE_TTL_SECONDS = float(os.getenv("HRMS_PAYROLL_LOCK_CACHE_TTL", "60"))
+
+    _cache = {}                 # (year, month) -> (status_row, cached_at)
+    _generation = {}            # (year, month) -> bumped by invalidate()
+    _cache_lock = threading.Lock()
+
+    # --------------------------------------------------------
+    @classmethod
+    def _cached(cls, year: int, month: int):
+        with cls._cache_lock:
+            hit = cls._cache.get((year, month))
+        if hit is None:
+            return None
+        if not PayrollChangeListener.connected.is_set() and \
+                time.monotonic() - hit[1] >= cls.CACHE_TTL_SECONDS:
+            return None
+        return hit[0]
+
+    @classmethod
+    def _store(cls, status: dict, generation: int):
+        key = (status["year"], status["month"])
+        with cls._cache_lock:
+            # A NOTIFY arrived while this row was being read: don't cache it
+            if cls._generation.get(key, 0) == generation:
+                cls._cache[key] = (status, time.monotonic())
+
+    @classmethod
+    def invalidate(cls, year: int = None, month: int = None):
+        with cls._cache_lock:
+            if year is None:
+                cls._cache.clear()
+                for key in cls._generation:
+                    cls._generation[key] += 1
+            else:
+                cls._cache.pop((year, month), None)
+                cls._generation[(year, month)] = cls._generation.get((year, month), 0) + 1
+
+    @classmethod
+    def invalidate_payload(cls, payload: str):
+        try:
+            year, month = (int(p) for p in payload.split("-"))
+        except ValueError:
+            cls.invalidate()
+            return
+        cls.invalidate(year, month)
+
+    # --------------------------------------------------------
+    @classmethod
+    def get_status(cls, year: int, month: int, conn=None) -> dict:
+        status = cls._cached(year, month)
+        if status is not None:
+            return status
+
+        generation = cls._generation.get((year, month), 0)
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute("""
+                SELECT year, month, is_locked, locked_at
+                FROM payroll_lock
+                WHERE year = %s AND month = %s;
+            """, (year, month))
+
+            row = cur.fetchone()
+            cur.close()
+
+        status = dict(row) if row else {
+            "year": year,
+            "month": month,
+            "is_locked": False,
+            "locked_at": None,
+        }
+        cls._store(status, generation)
+        return status
+
+    @classmethod
+    def is_locked(cls, year: int, month: int, conn=None) -> bool:
+        return bool(cls.get_status(year, month, conn=conn)["is_locked"])
+
+    @classmethod
+    def set_lock(cls, year: int, month: int, lock: bool) -> dict:
+        conn = get_connection()
+        cur = conn.cursor()
+
+        try:
+            if lock:
+                cur.execute("""
+                    INSERT INTO payroll_lock (year, month, is_locked, locked_at)
+                    VALUES (%s, %s, TRUE, NOW())
+                    ON CONFLICT (year, month)
+                    DO UPDATE SET is_locked = TRUE, locked_at = NOW();
+                """, (year, month))
+            else:
+                cur.execute("""
+                    INSERT INTO payroll_lock (year, month, is_locked, locked_at)
+                    VALUES (%s, %s, FALSE, NULL)
+                    ON CONFLICT (year, month)
+                    DO UPDATE SET is_locked = FALSE, locked_at = NULL;
+                """, (year, month))
+
+            # Delivered to every listening worker on commit
+            cur.execute("SELECT pg_notify(%s, %s);", (PAYROLL_LOCK_CHANNEL, f"{year}-{month}"))
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+        # Next lookup re-reads the committed row
+        cls.invalidate(year, month)
+
+        return {"year": year, "month": month, "is_locked": lock}
+
+
+# ============================================================
+# ✅ ATTENDANCE LOCK (PERIOD + PER-EMPLOYEE EXCEPTIONS, CACHED)
+# ============================================================
+
+class AttendanceLockDB:
+    """
+    Which attendance can no longer change because payroll used it.
+
+        attendance_lock            one row per locked (year, month)
+        attendance_lock_exception  per-employee override inside a month
+                                   (is_locked TRUE = locked on its own,
+                                    FALSE = left open in a locked month)
+
+    A payroll run locks the employees it computed with one multi-row
+    exception write instead of an UPDATE of every attendance row; only
+    lock_period() locks a whole month, including employees added later.
+    Lookups are served from a per-month cache, invalidated locally on
+    write and in other processes via ATTENDANCE_LOCK_CHANNEL (TTL fallback
+    when no listener is connected).
+
+    attendance.is_payroll_locked is still honoured for the admin
+    per-day lock routes; payroll no longer writes it.
+    """
+
+    CACHE_TTL_SECONDS = float(os.getenv("HRMS_ATTENDANCE_LOCK_CACHE_TTL", "30"))
+
+    _cache = {}                 # (year, month) -> (state, cached_at)
+    _generation = {}            # (year, month) -> bumped by invalidate()
+    _cache_lock = threading.Lock()
+
+    STATE_SQL = """
+        SELECT
+            EXISTS (
+                SELECT 1 FROM attendance_lock WHERE year = %s AND month = %s
+            ) AS period_locked,
+            COALESCE((
+                SELECT json_object_agg(employee_id, is_locked)
+                FROM attendance_lock_exception
+                WHERE year = %s AND month = %s
+            ), '{}'::json) AS exceptions;
+    """
+
+    # asyncpg flavour of STATE_SQL
+    STATE_ASYNC_SQL = """
+        SELECT
+            EXISTS (
+                SELECT 1 FROM attendance_lock WHERE year = $1 AND month = $2
+            ) AS period_locked,
+            COALESCE((
+                SELECT json_object_agg(employee_id, is_locked)
+                FROM attendance_lock_exception
+                WHERE year = $1 AND month = $2
+            ), '{}'::json) AS exceptions;
+    """
+
+    # --------------------------------------------------------
+    @classmethod
+    def invalidate(cls, year: int = None, month: int = None):
+        with cls._cache_lock:
+            if year is None:
+                cls._cache.clear()
+                for key in cls._generation:
+                    cls._generation[key] += 1
+            else:
+                cls._cache.pop((year, month), None)
+                cls._generation[(year, month)] = cls._generation.get((year, month), 0) + 1
+
+    @classmethod
+    def invalidate_payload(cls, payload: str):
+        try:
+            year, month = (int(p) for p in payload.split("-"))
+        except ValueError:
+            cls.invalidate()
+            return
+        cls.invalidate(year, month)
+
+    @staticmethod
+    def _notify(cur, year: int, month: int):
+        # Delivered to every listening worker on commit
+        cur.execute("SELECT pg_notify(%s, %s);", (ATTENDANCE_LOCK_CHANNEL, f"{year}-{month}"))
+
+    # --------------------------------------------------------
+    # LOOKUP
+    # --------------------------------------------------------
+    @classmethod
+    def _cached(cls, year: int, month: int):
+        with cls._cache_lock:
+            hit = cls._cache.get((year, month))
+        if hit is None:
+            return None
+        if not PayrollChangeListener.connected.is_set() and \
+                time.monotonic() - hit[1] >= cls.CACHE_TTL_SECONDS:
+            return None
+        return hit[0]
+
+    @classmethod
+    def _store(cls, year: int, month: int, state: dict, generation: int):
+        with cls._cache_lock:
+            if cls._generation.get((year, month), 0) == generation:
+                cls._cache[(year, month)] = (state, time.monotonic())
+
+    @staticmethod
+    def _state(period_locked, exceptions) -> dict:
+        if isinstance(exceptions, str):
+            exceptions = json.loads(exceptions)
+        return {
+            "period_locked": bool(period_locked),
+            "exceptions": {int(k): bool(v) for k, v in (exceptions or {}).items()},
+        }
+
+    @classmethod
+    def get_state(cls, year: int, month: int, conn=None) -> dict:
+        state = cls._cached(year, month)
+        if state is not None:
+            return state
+
+        generation = cls._generation.get((year, month), 0)
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute(cls.STATE_SQL, (year, month, year, month))
+            row = cur.fetchone()
+            cur.close()
+
+        state = cls._state(row[0], row[1])
+        cls._store(year, month, state, generation)
+        return state
+
+    @classmethod
+    async def get_state_async(cls, conn, year: int, month: int) -> dict:
+        """asyncpg flavour of get_state (same cache)."""
+        state = cls._cached(year, month)
+        if state is not None:
+            return state
+
+        generation = cls._generation.get((year, month), 0)
+        row = await conn.fetchrow(cls.STATE_ASYNC_SQL, year, month)
+
+        state = cls._state(row["period_locked"], row["exceptions"])
+        cls._store(year, month, state, generation)
+        return state
+
+    @staticmethod
+    def _resolve(state: dict, employee_id: int) -> bool:
+        return state["exceptions"].get(employee_id, state["period_locked"])
+
+    @classmethod
+    def is_locked(cls, employee_id: int, dt: date, conn=None) -> bool:
+        return cls._resolve(cls.get_state(dt.year, dt.month, conn=conn), employee_id)
+
+    @classmethod
+    async def is_locked_async(cls, conn, employee_id: int, dt: date) -> bool:
+        return cls._resolve(await cls.get_state_async(conn, dt.year, dt.month), employee_id)
+
+    # --------------------------------------------------------
+    # WRITES
+    # --------------------------------------------------------
+    @classmethod
+    def lock_period(cls, year: int, month: int, unlocked_ids=(), conn=None):
+        """
+        Lock the whole month in O(1). Earlier per-employee exceptions are
+        dropped; `unlocked_ids` stay open (e.g. employees payroll skipped).
+        """
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO attendance_lock (year, month, locked_at)
+                VALUES (%s, %s, NOW())
+                ON CONFLICT (year, month) DO UPDATE SET locked_at = NOW();
+            """, (year, month))
+            cur.execute(
+                "DELETE FROM attendance_lock_exception WHERE year = %s AND month = %s;",
+                (year, month),
+            )
+            if unlocked_ids:
+                cls._write_exceptions(cur, year, month, unlocked_ids, False)
+            cls._notify(cur, year, month)
+            cur.close()
+        cls.invalidate(year, month)
+
+    @classmethod
+    def unlock_period(cls, year: int, month: int, conn=None):
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM attendance_lock WHERE year = %s AND month = %s;", (year, month))
+            cur.execute(
+                "DELETE FROM attendance_lock_exception WHERE year = %s AND month = %s;",
+                (year, month),
+            )
+            cls._notify(cur, year, month)
+            cur.close()
+        cls.invalidate(year, month)
+
+    @classmethod
+    def set_employees(cls, employee_ids, year: int, month: int, locked: bool, conn=None) -> int:
+        """Per-employee lock / unlock inside a month: one row per employee."""
+        employee_ids = list(employee_ids)
+        if not employee_ids:
+            return 0
+
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cls._write_exceptions(cur, year, month, employee_ids, locked)
+            cls._notify(cur, year, month)
+            cur.close()
+        cls.invalidate(year, month)
+        return len(employee_ids)
+
+    @staticmethod
+    def _write_exceptions(cur, year: int, month: int, employee_ids, locked: bool):
+        execute_values(cur, """
+            INSERT INTO attendance_lock_exception (employee_id, year, month, is_locked, updated_at)
+            VALUES %s
+            ON CONFLICT (employee_id, year, month)
+            DO UPDATE SET is_locked = EXCLUDED.is_locked, updated_at = NOW();
+        """, [(emp_id, year, month, locked) for emp_id in employee_ids],
+            template="(%s, %s, %s, %s, NOW())", page_size=1000)
@@ -0,0 +1,181 @@
+# app/database/payroll_compare.py
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from psycopg2.extras import RealDictCursor
+
+from app.database.connection import use_connection
+
+
+# ============================================================
+# ✅ PAYROLL COMPARISON (RUN vs RUN, MONTH vs MONTH)
+# ============================================================
+
+# Components diffed per employee and summed per department
+COMPARED_COMPONENTS = (
+    "net_salary",
+    "gross_salary",
+    "present_days",
+    "lop_days",
+    "lop_deduction",
+    "overtime_hours",
+    "overtime_pay",
+    "late_penalty",
+    "early_penalty",
+    "holiday_pay",
+    "night_shift_allowance",
+)
+
+
+class PayrollCompareDB:
+    """
+    Diff two payroll versions in SQL: a side is a month of the payroll
+    table ({"year", "month"}) or what one payroll run wrote
+    ({"run_id"}, from payroll_run_snapshot). The sides are FULL OUTER
+    JOINed on employee_id; only employees whose components moved by at
+    least min_delta (and min_pct percent, if given) are returned, while
+    the department aggregates cover everyone.
+    """
+
+    @staticmethod
+    def _source(side: Dict[str, int], prefix: str):
+        if side.get("run_id") is not None:
+            return (
+                f"SELECT * FROM payroll_run_snapshot WHERE run_id = %({prefix}_run_id)s",
+                {f"{prefix}_run_id": side["run_id"]},
+            )
+        return (
+            f"SELECT * FROM payroll WHERE year = %({prefix}_year)s AND month = %({prefix}_month)s",
+            {f"{prefix}_year": side["year"], f"{prefix}_month": side["month"]},
+        )
+
+    @classmethod
+    def _diff_cte(cls, base: Dict[str, int], target: Dict[str, int],
+                  components: Sequence[str], min_delta: float, min_pct: Optional[float]):
+        base_sql, params = cls._source(base, "base")
+        target_sql, target_params = cls._source(target, "target")
+        params.update(target_params, min_delta=min_delta, min_pct=min_pct)
+
+        columns = ",\n".join(
+            f"""a.{c} AS {c}_before,
+                b.{c} AS {c}_after,
+                COALESCE(b.{c}, 0) - COALESCE(a.{c}, 0) AS {c}_delta"""
+            for c in COMPARED_COMPONENTS
+        )
+        moved = "\n                 OR ".join(
+            f"""(ABS({c}_delta) >= %(min_delta)s
+                     AND (%(min_pct)s IS NULL
+                          OR ABS({c}_delta) * 100 >= ABS(COALESCE({c}_before, 0)) * %(min_pct)s))"""
+            for c in components
+        )
+
+        sql = f"""
+            WITH a AS ({base_sql}),
+            b AS ({target_sql}),
+            d AS (
+                SELECT
+                    COALESCE(b.employee_id, a.employee_id) AS employee_id,
+                    CASE
+                        WHEN a.employee_id IS NULL THEN 'added'
+                        WHEN b.employee_id IS NULL THEN 'removed'
+                        ELSE 'changed'
+                    END AS change,
+                    {columns}
+                FROM a
+                FULL OUTER JOIN b ON b.employee_id = a.employee_id
+            ),
+            flagged AS (
+                SELECT d.*,
+                       (change <> 'changed'
+                        OR {moved}) AS is_changed
+                FROM d
+            )
+        """
+        return sql, params
+
+    @classmethod
+    def compare(cls, base: Dict[str, int], target: Dict[str, int],
+                components: Sequence[str] = COMPARED_COMPONENTS,
+                min_delta: float = 0.01, min_pct: Optional[float] = None,
+                limit: int = 500, offset: int = 0, conn=None) -> Dict[str, Any]:
+
+        components = [c for c in components if c in COMPARED_COMPONENTS]
+        if not components:
+            raise ValueError(f"components must be among {', '.join(COMPARED_COMPONENTS)}")
+
+        cte, params = cls._diff_cte(base, target, components, min_delta, min_pct)
+        params.update(limit=limit, offset=offset)
+
+        sums = ",\n".join(
+            f"""SUM({c}_before) AS {c}_before,
+                SUM({c}_after) AS {c}_after,
+                SUM({c}_delta) AS {c}_delta"""
+            for c in COMPARED_COMPONENTS
+        )
+
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute(cte + """
+                SELECT f.*, e.first_name, e.last_name, e.department,
+                       COUNT(*) OVER () AS total_changed
+                FROM flagged f
+                LEFT JOIN employees e ON e.employee_id = f.employee_id
+                WHERE f.is_changed
+                ORDER BY ABS(f.net_salary_delta) DESC, f.employee_id
+                LIMIT %(limit)s OFFSET %(offset)s;
+            """, params)
+            employees = cur.fetchall()
+
+            cur.execute(cte + f"""
+                SELECT
+                    e.department,
+                    COUNT(*) AS employees,
+                    COUNT(*) FILTER (WHERE f.is_changed) AS changed,
+                    {sums}
+                FROM flagged f
+                LEFT JOIN employees e ON e.employee_id = f.employee_id
+                GROUP BY e.department
+                ORDER BY e.department NULLS LAST;
+            """, params)
+            departments = cur.fetchall()
+            cur.close()
+
+        return {
+            "changed": employees[0]["total_changed"] if employees else 0,
+            "employees": [cls._employee(row) for row in employees],
+            "departments": [cls._department(row) for row in departments],
+        }
+
+    # --------------------------------------------------------
+    @staticmethod
+    def _components(row) -> Dict[str, Dict[str, Any]]:
+        return {
+            c: {"before": row[f"{c}_before"], "after": row[f"{c}_after"], "delta": row[f"{c}_delta"]}
+            for c in COMPARED_COMPONENTS
+        }
+
+    @classmethod
+    def _employee(cls, row) -> Dict[str, Any]:
+        components = cls._components(row)
+        return {
+            "employee_id": row["employee_id"],
+            "first_name": row["first_name"],
+            "last_name": row["last_name"],
+            "department": row["department"],
+            "change": row["change"],
+            # Only what moved (everything for added / removed employees)
+            "components": {
+                c: v for c, v in components.items()
+                if row["change"] != "changed" or v["delta"]
+            },
+        }
+
+    @classmethod
+    def _department(cls, row) -> Dict[str, Any]:
+        return {
+            "department": row["department"],
+            "employees": row["employees"],
+            "changed": row["changed"],
+            "components": cls._components(row),
+        }
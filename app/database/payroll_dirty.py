@@ -0,0 +1,168 @@
+# app/database/payroll_dirty.py
+
+from datetime import date
+from typing import List
+
+from app.database.connection import use_connection
+
+
+# ============================================================
+# ✅ PAYROLL DIRTY TRACKING
+# ============================================================
+
+# One row per (employee, month) whose payroll inputs changed since it was
+# last computed. DO NOTHING keeps repeated punches in a month to a no-op.
+MARK_DIRTY_SQL = """
+    INSERT INTO payroll_dirty (employee_id, year, month, reason)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (employee_id, year, month) DO NOTHING;
+"""
+
+# Punches: only a month whose payroll was already generated can go stale
+# (months without a payroll row are picked up by get_missing), so the
+# insert is skipped after one probe of the payroll unique index.
+MARK_GENERATED_DIRTY_SQL = """
+    INSERT INTO payroll_dirty (employee_id, year, month, reason)
+    SELECT %(employee_id)s, %(year)s, %(month)s, %(reason)s
+    WHERE EXISTS (
+        SELECT 1 FROM payroll
+        WHERE employee_id = %(employee_id)s AND month = %(month)s AND year = %(year)s
+    )
+    ON CONFLICT (employee_id, year, month) DO NOTHING;
+"""
+
+# asyncpg flavour of MARK_GENERATED_DIRTY_SQL
+MARK_GENERATED_DIRTY_ASYNC_SQL = """
+    INSERT INTO payroll_dirty (employee_id, year, month, reason)
+    SELECT $1, $2, $3, $4
+    WHERE EXISTS (
+        SELECT 1 FROM payroll
+        WHERE employee_id = $1 AND month = $3 AND year = $2
+    )
+    ON CONFLICT (employee_id, year, month) DO NOTHING;
+"""
+
+
+def months_between(start: date, end: date) -> List[tuple]:
+    """[(year, month)] for every month touched by start..end (inclusive)."""
+    if end < start:
+        start, end = end, start
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class PayrollDirtyDB:
+    """
+    Marks are written in the same transaction as the change that caused
+    them (attendance upsert / override, salary structure, leave approval,
+    policy change) and consumed by incremental regeneration.
+    """
+
+    @staticmethod
+    def mark(employee_id: int, year: int, month: int, reason: str, conn=None):
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute(MARK_DIRTY_SQL, (employee_id, year, month, reason))
+            cur.close()
+
+    @staticmethod
+    def mark_range(employee_id: int, start: date, end: date, reason: str, conn=None):
+        """Every month overlapping start..end (e.g. an approved leave)."""
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            for year, month in months_between(start, end):
+                cur.execute(MARK_DIRTY_SQL, (employee_id, year, month, reason))
+            cur.close()
+
+    @staticmethod
+    def mark_from(employee_id: int, from_date: date, reason: str, conn=None):
+        """
+        Salary structure changes: the effective month plus every later
+        month that already has an unfinalized payroll row.
+        """
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute(MARK_DIRTY_SQL, (employee_id, from_date.year, from_date.month, reason))
+            cur.execute("""
+                INSERT INTO payroll_dirty (employee_id, year, month, reason)
+                SELECT employee_id, year, month, %s
+                FROM payroll
+                WHERE employee_id = %s
+                  AND make_date(year, month, 1) >= date_trunc('month', %s::date)
+                  AND is_finalized = FALSE
+                ON CONFLICT (employee_id, year, month) DO NOTHING;
+            """, (reason, employee_id, from_date))
+            cur.close()
+
+    @staticmethod
+    def mark_all(reason: str, conn=None) -> int:
+        """Policy change: every unfinalized payroll row becomes dirty."""
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO payroll_dirty (employee_id, year, month, reason)
+                SELECT employee_id, year, month, %s
+                FROM payroll
+                WHERE is_finalized = FALSE
+                ON CONFLICT (employee_id, year, month) DO NOTHING;
+            """, (reason,))
+            count = cur.rowcount
+            cur.close()
+        return count
+
+    # --------------------------------------------------------
+    @staticmethod
+    def get_dirty(year: int, month: int, conn=None) -> List[int]:
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT employee_id
+                FROM payroll_dirty
+                WHERE year = %s AND month = %s
+                ORDER BY employee_id;
+            """, (year, month))
+            rows = cur.fetchall()
+            cur.close()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def take(year: int, month: int, conn=None) -> List[int]:
+        """
+        Remove and return the month's marks. Call inside the recompute
+        transaction: a rollback restores them, and a change committed
+        while the recompute runs leaves a fresh mark behind.
+        """
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                DELETE FROM payroll_dirty
+                WHERE year = %s AND month = %s
+                RETURNING employee_id;
+            """, (year, month))
+            rows = cur.fetchall()
+            cur.close()
+        return sorted(row[0] for row in rows)
+
+    @staticmethod
+    def get_missing(year: int, month: int, conn=None) -> List[int]:
+        """Active employees with no payroll row for the month yet."""
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT e.employee_id
+                FROM employees e
+                WHERE e.status = 'active'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM payroll p
+                      WHERE p.employee_id = e.employee_id
+                        AND p.year = %s AND p.month = %s
+                  )
+                ORDER BY e.employee_id;
+            """, (year, month))
+            rows = cur.fetchall()
+            cur.close()
+        return [row[0] for row in rows]
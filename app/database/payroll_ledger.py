@@ -0,0 +1,211 @@
+# app/database/payroll_ledger.py
+
+import os
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from app.database.connection import use_connection
+from app.database.records import RecordCursor
+
+
+# ============================================================
+# ✅ FINANCIAL YEAR
+# ============================================================
+
+# First calendar month of the financial year (4 = April..March)
+FISCAL_YEAR_START_MONTH = int(os.getenv("HRMS_FISCAL_YEAR_START_MONTH", "4"))
+
+
+def fiscal_year(year: int, month: int) -> int:
+    """Financial year a payroll month belongs to, named by its starting year."""
+    return year if month >= FISCAL_YEAR_START_MONTH else year - 1
+
+
+def current_fiscal_year(today: date = None) -> int:
+    today = today or date.today()
+    return fiscal_year(today.year, today.month)
+
+
+def fiscal_months(fy: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """((year, month), (year, month)) first and last month of `fy`."""
+    start = FISCAL_YEAR_START_MONTH
+    last = (fy + 1, start - 1) if start > 1 else (fy, 12)
+    return (fy, start), last
+
+
+def _month_index(year: int, month: int) -> int:
+    return year * 12 + month
+
+
+# ============================================================
+# ✅ YEAR-TO-DATE PAYROLL LEDGER
+# ============================================================
+
+# payroll columns summed into payroll_ytd_ledger (same names there)
+LEDGER_COLUMNS = (
+    "gross_salary",
+    "net_salary",
+    "basic_pay",
+    "hra_pay",
+    "allowances_pay",
+    "overtime_hours",
+    "overtime_pay",
+    "lop_days",
+    "lop_deduction",
+    "late_penalty",
+    "early_penalty",
+    "holiday_pay",
+    "night_shift_allowance",
+)
+
+# Re-sums the financial year of each touched (employee, year, month) from
+# payroll. Recomputing instead of adding deltas keeps regenerations,
+# finalization and re-runs idempotent; each pair reads at most 12 payroll
+# rows through the (employee_id, month, year) unique index.
+_REFRESH_SQL = """
+    WITH touched AS (
+        SELECT DISTINCT t.employee_id, t.fiscal_year
+        FROM UNNEST(%(employee_ids)s::int[], %(fiscal_years)s::int[]) AS t(employee_id, fiscal_year)
+    )
+    INSERT INTO payroll_ytd_ledger (
+        employee_id, fiscal_year, months, finalized_months, through_year, through_month,
+        {columns}, updated_at
+    )
+    SELECT
+        t.employee_id,
+        t.fiscal_year,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE p.is_finalized),
+        (ARRAY_AGG(p.year ORDER BY p.year DESC, p.month DESC))[1],
+        (ARRAY_AGG(p.month ORDER BY p.year DESC, p.month DESC))[1],
+        {sums},
+        NOW()
+    FROM touched t
+    JOIN payroll p
+      ON p.employee_id = t.employee_id
+     AND p.year * 12 + p.month BETWEEN t.fiscal_year * 12 + %(start)s
+                                   AND t.fiscal_year * 12 + %(start)s + 11
+    GROUP BY t.employee_id, t.fiscal_year
+    ON CONFLICT (employee_id, fiscal_year)
+    DO UPDATE SET
+        months = EXCLUDED.months,
+        finalized_months = EXCLUDED.finalized_months,
+        through_year = EXCLUDED.through_year,
+        through_month = EXCLUDED.through_month,
+        {updates},
+        updated_at = NOW();
+""".format(
+    columns=", ".join(LEDGER_COLUMNS),
+    sums=",\n        ".join("COALESCE(SUM(p.%s), 0)" % c for c in LEDGER_COLUMNS),
+    updates=",\n        ".join("%s = EXCLUDED.%s" % (c, c) for c in LEDGER_COLUMNS),
+)
+
+# Payroll months with running year-to-date totals (reset every financial year)
+_RUNNING_SQL = """
+    SELECT
+        p.*,
+        {running}
+    FROM payroll p
+    WHERE p.employee_id = %s
+      AND p.year * 12 + p.month BETWEEN %s AND %s
+    ORDER BY p.year, p.month;
+""".format(
+    running=",\n        ".join(
+        "SUM(p.{c}) OVER (ORDER BY p.year, p.month) AS ytd_{c}".format(c=c) for c in LEDGER_COLUMNS
+    ),
+)
+
+
+class PayrollLedgerDB:
+    """
+    payroll_ytd_ledger: one row per employee per financial year with the
+    running totals of every payroll month written so far. Refreshed in
+    the same transaction as each payroll upsert (PayrollDB.upsert_payroll,
+    bulk_upsert_payroll), so YTD and tax reports are a primary-key read.
+    """
+
+    @staticmethod
+    def refresh(keys: Iterable[Tuple[int, int, int]], conn=None) -> int:
+        """Recompute the ledger rows for (employee_id, year, month) keys."""
+        touched = {(emp_id, fiscal_year(year, month)) for emp_id, year, month in keys}
+        if not touched:
+            return 0
+
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            PayrollLedgerDB.refresh_with(cur, touched)
+            cur.close()
+        return len(touched)
+
+    @staticmethod
+    def refresh_with(cur, touched):
+        """Run the refresh for (employee_id, fiscal_year) pairs on an open cursor."""
+        employee_ids, fiscal_years = zip(*sorted(touched))
+        cur.execute(_REFRESH_SQL, {
+            "employee_ids": list(employee_ids),
+            "fiscal_years": list(fiscal_years),
+            "start": FISCAL_YEAR_START_MONTH,
+        })
+
+    @staticmethod
+    def refresh_month(employee_ids: Iterable[int], year: int, month: int, conn=None) -> int:
+        return PayrollLedgerDB.refresh(((emp_id, year, month) for emp_id in employee_ids), conn=conn)
+
+    # ============================================================
+    # ✅ READS
+    # ============================================================
+
+    @staticmethod
+    def get_ytd(employee_id: int, fy: int, conn=None) -> Optional[dict]:
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                SELECT *
+                FROM payroll_ytd_ledger
+                WHERE employee_id = %s AND fiscal_year = %s;
+            """, (employee_id, fy))
+            row = cur.fetchone()
+            cur.close()
+        return row
+
+    @staticmethod
+    def get_history(employee_id: int, months: int = 6, through: date = None, conn=None) -> List:
+        """The last `months` payroll months up to `through` (default today), newest first."""
+        through = through or date.today()
+        last = _month_index(through.year, through.month)
+
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RecordCursor)
+            cur.execute("""
+                SELECT *
+                FROM payroll
+                WHERE employee_id = %s
+                  AND year * 12 + month BETWEEN %s AND %s
+                ORDER BY year DESC, month DESC;
+            """, (employee_id, last - months + 1, last))
+            rows = cur.fetchall()
+            cur.close()
+        return rows
+
+    @staticmethod
+    def get_statement(employee_id: int, fy: int, conn=None) -> dict:
+        """Annual statement: the ledger row plus each month with its running YTD."""
+        first, last = fiscal_months(fy)
+
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(_RUNNING_SQL, (employee_id, _month_index(*first), _month_index(*last)))
+            months = cur.fetchall()
+            cur.close()
+            ytd = PayrollLedgerDB.get_ytd(employee_id, fy, conn=conn)
+
+        return {
+            "employee_id": employee_id,
+            "fiscal_year": fy,
+            "from": "%d-%02d" % first,
+            "to": "%d-%02d" % last,
+            "ytd": ytd,
+            "months": months,
+        }
@@ -0,0 +1,502 @@
+# app/database/payroll_runs.py
+
+import os
+from typing import Dict, List, Optional
+
+from psycopg2.extras import RealDictCursor, execute_values
+
+from app.database.connection import use_connection
+from app.database.payroll import PAYROLL_VALUE_COLUMNS
+
+# payroll columns copied into payroll_run_snapshot
+SNAPSHOT_COLUMNS = tuple(c for c in PAYROLL_VALUE_COLUMNS if c != "is_finalized")
+
+_SNAPSHOT_SQL = """
+    INSERT INTO payroll_run_snapshot (run_id, employee_id, {columns})
+    SELECT r.run_id, p.employee_id, {source}
+    FROM payroll_runs r
+    JOIN payroll p ON p.year = r.year AND p.month = r.month
+    WHERE r.run_id = %s
+      AND p.employee_id = ANY(%s)
+    ON CONFLICT (run_id, employee_id)
+    DO UPDATE SET
+        {updates};
+""".format(
+    columns=", ".join(SNAPSHOT_COLUMNS),
+    source=", ".join("p.%s" % c for c in SNAPSHOT_COLUMNS),
+    updates=",\n        ".join("%s = EXCLUDED.%s" % (c, c) for c in SNAPSHOT_COLUMNS),
+)
+
+
+# Groups payroll_run_items into contiguous employee_id ranges of `size`
+_CREATE_PARTITIONS_SQL = """
+    INSERT INTO payroll_run_partitions
+        (run_id, partition_no, first_employee_id, last_employee_id, employees)
+    SELECT run_id, (rn - 1) / %(size)s, MIN(employee_id), MAX(employee_id), COUNT(*)
+    FROM (
+        SELECT run_id, employee_id, ROW_NUMBER() OVER (ORDER BY employee_id) AS rn
+        FROM payroll_run_items
+        WHERE run_id = %(run_id)s
+    ) i
+    GROUP BY run_id, (rn - 1) / %(size)s
+    ON CONFLICT (run_id, partition_no) DO NOTHING;
+"""
+
+
+class PartitionLeaseLost(Exception):
+    """The partition was reclaimed by another worker; this one must stop."""
+
+
+# ============================================================
+# ✅ PAYROLL RUN JOBS
+# ============================================================
+
+class PayrollRunDB:
+    """
+    payroll_runs (one row per run) + payroll_run_items (checkpoint:
+    one row per employee) + payroll_run_partitions (employee_id ranges
+    claimed by workers). Statuses:
+
+        run:       pending → running → completed | cancelled | failed
+        item:      pending → success | failed
+        partition: pending → running → done  (running → pending on release)
+    """
+
+    # A 'running' partition whose worker stopped heart-beating this long
+    # ago is considered orphaned (process died) and may be claimed again
+    STALE_AFTER_SECONDS = int(os.getenv("HRMS_PAYROLL_RUN_STALE_SECONDS", "300"))
+
+    # Employees per claimable partition
+    PARTITION_SIZE = int(os.getenv("HRMS_PAYROLL_RUN_PARTITION_SIZE", "1000"))
+
+    # --------------------------------------------------------
+    @staticmethod
+    def create_run(year: int, month: int, employee_ids: List[int], conn=None):
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            # No employees → no partition for a worker to finish it: done at once
+            cur.execute("""
+                INSERT INTO payroll_runs (year, month, status, total_employees, finished_at)
+                VALUES (%(year)s, %(month)s,
+                        CASE WHEN %(total)s > 0 THEN 'pending' ELSE 'completed' END,
+                        %(total)s,
+                        CASE WHEN %(total)s > 0 THEN NULL ELSE NOW() END)
+                RETURNING *;
+            """, {"year": year, "month": month, "total": len(employee_ids)})
+            run = cur.fetchone()
+            if not employee_ids:
+                cur.close()
+                return run
+
+            execute_values(
+                cur,
+                "INSERT INTO payroll_run_items (run_id, employee_id) VALUES %s;",
+                [(run["run_id"], emp_id) for emp_id in employee_ids],
+                page_size=1000,
+            )
+            PayrollRunDB.create_partitions_with(cur, run["run_id"])
+            cur.close()
+        return run
+
+    @classmethod
+    def create_partitions_with(cls, cur, run_id: int, size: int = None):
+        """Partition a run's items (idempotent: existing partitions are kept)."""
+        cur.execute(_CREATE_PARTITIONS_SQL, {"run_id": run_id, "size": size or cls.PARTITION_SIZE})
+
+    @staticmethod
+    def get_run(run_id: int, conn=None) -> Optional[dict]:
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("SELECT * FROM payroll_runs WHERE run_id = %s;", (run_id,))
+            row = cur.fetchone()
+            cur.close()
+        return row
+
+    @staticmethod
+    def get_active_run(year: int, month: int, conn=None) -> Optional[dict]:
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                SELECT *
+                FROM payroll_runs
+                WHERE year = %s AND month = %s
+                  AND status IN ('pending', 'running')
+                ORDER BY run_id DESC
+                LIMIT 1;
+            """, (year, month))
+            row = cur.fetchone()
+            cur.close()
+        return row
+
+    @staticmethod
+    def get_previous_run(run_id: int, conn=None) -> Optional[dict]:
+        """The latest earlier run of the same period that finished with a snapshot."""
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                SELECT prev.*
+                FROM payroll_runs cur
+                JOIN payroll_runs prev
+                  ON prev.year = cur.year
+                 AND prev.month = cur.month
+                 AND prev.run_id < cur.run_id
+                WHERE cur.run_id = %s
+                  AND prev.succeeded > 0
+                ORDER BY prev.run_id DESC
+                LIMIT 1;
+            """, (run_id,))
+            row = cur.fetchone()
+            cur.close()
+        return row
+
+    @staticmethod
+    def get_failures(run_id: int, limit: int = 500, offset: int = 0, conn=None) -> List[dict]:
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                SELECT employee_id, error, processed_at
+                FROM payroll_run_items
+                WHERE run_id = %s AND status = 'failed'
+                ORDER BY employee_id
+                LIMIT %s OFFSET %s;
+            """, (run_id, limit, offset))
+            rows = cur.fetchall()
+            cur.close()
+        return rows
+
+    # --------------------------------------------------------
+    # STATE CHANGES
+    # --------------------------------------------------------
+    @staticmethod
+    def request_cancel(run_id: int, conn=None) -> Optional[dict]:
+        """
+        Pending runs are cancelled at once; running runs stop at the next
+        batch boundary (the worker checks the flag between batches).
+        """
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                UPDATE payroll_runs
+                SET cancel_requested = TRUE,
+                    status = CASE WHEN status = 'pending' THEN 'cancelled' ELSE status END,
+                    finished_at = CASE WHEN status = 'pending' THEN NOW() ELSE finished_at END,
+                    updated_at = NOW()
+                WHERE run_id = %s
+                RETURNING *;
+            """, (run_id,))
+            row = cur.fetchone()
+            cur.close()
+        return row
+
+    @staticmethod
+    def reopen(run_id: int, retry_failed: bool = False, conn=None) -> Optional[dict]:
+        """
+        Resume from the checkpoint: the run goes back to 'pending' and
+        only items still 'pending' (plus 'failed' ones if retry_failed)
+        are processed again.
+        """
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            if retry_failed:
+                cur.execute("""
+                    WITH reset AS (
+                        UPDATE payroll_run_items
+                        SET status = 'pending', error = NULL, processed_at = NULL
+                        WHERE run_id = %s AND status = 'failed'
+                        RETURNING 1
+                    )
+                    UPDATE payroll_runs
+                    SET failed = failed - (SELECT COUNT(*) FROM reset),
+                        processed = processed - (SELECT COUNT(*) FROM reset)
+                    WHERE run_id = %s;
+                """, (run_id, run_id))
+
+            cur.execute("""
+                UPDATE payroll_runs
+                SET status = 'pending',
+                    cancel_requested = FALSE,
+                    error = NULL,
+                    finished_at = NULL,
+                    updated_at = NOW()
+                WHERE run_id = %s
+                  AND status IN ('cancelled', 'failed', 'completed')
+                RETURNING *;
+            """, (run_id,))
+            row = cur.fetchone()
+
+            if row:
+                # Runs created before partitioning get their partitions now
+                PayrollRunDB.create_partitions_with(cur, run_id)
+                # Every partition with work left becomes claimable again
+                cur.execute("""
+                    UPDATE payroll_run_partitions p
+                    SET status = 'pending',
+                        worker_id = NULL,
+                        finished_at = NULL
+                    WHERE p.run_id = %s
+                      AND (p.status = 'running'
+                           OR EXISTS (
+                               SELECT 1
+                               FROM payroll_run_items i
+                               WHERE i.run_id = p.run_id
+                                 AND i.status = 'pending'
+                                 AND i.employee_id BETWEEN p.first_employee_id AND p.last_employee_id
+                           ));
+                """, (run_id,))
+            cur.close()
+        return row
+
+    # --------------------------------------------------------
+    # PARTITION LEASES (multi-worker execution)
+    # --------------------------------------------------------
+    @classmethod
+    def claim_partition(cls, worker_id: str, conn=None) -> Optional[dict]:
+        """
+        Lease the next open partition of the oldest active run: a pending
+        one, or a running one whose worker stopped heart-beating. SKIP
+        LOCKED lets any number of workers poll concurrently; a partition
+        in the middle of a batch is row-locked and therefore skipped.
+        Returns the partition joined with its run (year, month, policy_id).
+        """
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                WITH candidate AS (
+                    SELECT p.run_id, p.partition_no
+                    FROM payroll_run_partitions p
+                    JOIN payroll_runs r ON r.run_id = p.run_id
+                    WHERE r.status IN ('pending', 'running')
+                      AND NOT r.cancel_requested
+                      AND (p.status = 'pending'
+                           OR (p.status = 'running'
+                               AND p.heartbeat_at < NOW() - make_interval(secs => %s)))
+                    ORDER BY r.created_at, p.partition_no
+                    LIMIT 1
+                    FOR UPDATE OF p SKIP LOCKED
+                )
+                UPDATE payroll_run_partitions p
+                SET status = 'running',
+                    worker_id = %s,
+                    attempts = p.attempts + 1,
+                    claimed_at = NOW(),
+                    heartbeat_at = NOW()
+                FROM candidate c
+                WHERE p.run_id = c.run_id
+                  AND p.partition_no = c.partition_no
+                RETURNING p.*;
+            """, (cls.STALE_AFTER_SECONDS, worker_id))
+            lease = cur.fetchone()
+            if not lease:
+                cur.close()
+                return None
+
+            cur.execute("""
+                UPDATE payroll_runs
+                SET status = 'running',
+                    started_at = COALESCE(started_at, NOW()),
+                    updated_at = NOW()
+                WHERE run_id = %s
+                RETURNING year, month, policy_id;
+            """, (lease["run_id"],))
+            lease.update(cur.fetchone())
+            cur.close()
+        return lease
+
+    @staticmethod
+    def fence(lease: dict, conn) -> None:
+        """
+        First statement of every batch transaction: heart-beat the lease
+        and row-lock the partition until commit. Raises PartitionLeaseLost
+        when another worker has claimed it since (attempts moved on), so a
+        stalled worker can never write payroll for a reclaimed partition.
+        """
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE payroll_run_partitions
+            SET heartbeat_at = NOW()
+            WHERE run_id = %s AND partition_no = %s
+              AND attempts = %s AND status = 'running'
+            RETURNING partition_no;
+        """, (lease["run_id"], lease["partition_no"], lease["attempts"]))
+        held = cur.fetchone()
+        cur.close()
+        if not held:
+            raise PartitionLeaseLost(
+                f"run {lease['run_id']} partition {lease['partition_no']} was reclaimed"
+            )
+
+    @staticmethod
+    def complete_partition(lease: dict, conn) -> bool:
+        """
+        Mark a fenced partition done and, if it was the last one, complete
+        the run. The run row is locked first so two workers finishing the
+        last partitions at once cannot both miss each other. Returns True
+        when this call completed the run.
+        """
+        cur = conn.cursor()
+        cur.execute("SELECT status FROM payroll_runs WHERE run_id = %s FOR UPDATE;", (lease["run_id"],))
+        cur.execute("""
+            UPDATE payroll_run_partitions
+            SET status = 'done',
+                finished_at = NOW()
+            WHERE run_id = %s AND partition_no = %s AND attempts = %s;
+        """, (lease["run_id"], lease["partition_no"], lease["attempts"]))
+        cur.execute("""
+            UPDATE payroll_runs
+            SET status = 'completed',
+                finished_at = NOW(),
+                updated_at = NOW()
+            WHERE run_id = %s
+              AND status = 'running'
+              AND NOT EXISTS (
+                  SELECT 1 FROM payroll_run_partitions
+                  WHERE run_id = %s AND status <> 'done'
+              )
+            RETURNING run_id;
+        """, (lease["run_id"], lease["run_id"]))
+        completed = cur.fetchone() is not None
+        cur.close()
+        return completed
+
+    @staticmethod
+    def release_partition(lease: dict, conn=None):
+        """Hand an unfinished partition back (worker stopping, run cancelled / failed)."""
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE payroll_run_partitions
+                SET status = 'pending',
+                    worker_id = NULL
+                WHERE run_id = %s AND partition_no = %s
+                  AND attempts = %s AND status = 'running';
+            """, (lease["run_id"], lease["partition_no"], lease["attempts"]))
+            cur.close()
+
+    @staticmethod
+    def get_partition_summary(run_id: int, conn=None) -> dict:
+        """Partition counts by status and the workers currently holding leases."""
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                SELECT
+                    COUNT(*) AS total,
+                    COUNT(*) FILTER (WHERE status = 'pending') AS pending,
+                    COUNT(*) FILTER (WHERE status = 'running') AS running,
+                    COUNT(*) FILTER (WHERE status = 'done') AS done,
+                    COALESCE(
+                        ARRAY_AGG(DISTINCT worker_id) FILTER (WHERE status = 'running'),
+                        '{}'
+                    ) AS workers
+                FROM payroll_run_partitions
+                WHERE run_id = %s;
+            """, (run_id,))
+            row = cur.fetchone()
+            cur.close()
+        return row
+
+    @staticmethod
+    def get_run_state(run_id: int, conn=None) -> Optional[dict]:
+        """status + cancel_requested, checked by workers between batches."""
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(
+                "SELECT status, cancel_requested FROM payroll_runs WHERE run_id = %s;", (run_id,)
+            )
+            row = cur.fetchone()
+            cur.close()
+        return row
+
+    @staticmethod
+    def set_policy(run_id: int, policy_id: int, conn=None) -> int:
+        """Pin a policy version unless a concurrent worker already did; returns the pinned id."""
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE payroll_runs
+                SET policy_id = COALESCE(policy_id, %s)
+                WHERE run_id = %s
+                RETURNING policy_id;
+            """, (policy_id, run_id))
+            row = cur.fetchone()
+            cur.close()
+        return row[0] if row else policy_id
+
+    @staticmethod
+    def finish(run_id: int, status: str, error: str = None, conn=None):
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE payroll_runs
+                SET status = %s,
+                    error = %s,
+                    finished_at = NOW(),
+                    updated_at = NOW()
+                WHERE run_id = %s;
+            """, (status, error, run_id))
+            cur.close()
+
+    # --------------------------------------------------------
+    # CHECKPOINT
+    # --------------------------------------------------------
+    @staticmethod
+    def next_batch(run_id: int, size: int, first_employee_id: int = None,
+                   last_employee_id: int = None, conn=None) -> List[int]:
+        """Pending employees of the run, optionally within one partition's range."""
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT employee_id
+                FROM payroll_run_items
+                WHERE run_id = %s AND status = 'pending'
+                  AND (%s::int IS NULL OR employee_id >= %s)
+                  AND (%s::int IS NULL OR employee_id <= %s)
+                ORDER BY employee_id
+                LIMIT %s;
+            """, (run_id, first_employee_id, first_employee_id,
+                  last_employee_id, last_employee_id, size))
+            rows = cur.fetchall()
+            cur.close()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def record_batch(run_id: int, results: List[Dict], conn=None):
+        """
+        Mark a batch of items done, snapshot the rows it wrote and bump the
+        run counters. Call it in the same transaction as the payroll upsert
+        so the checkpoint and the payroll rows commit (or roll back) together.
+        """
+        if not results:
+            return
+
+        ok = sum(1 for r in results if r["status"] == "success")
+
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
+            execute_values(cur, """
+                UPDATE payroll_run_items AS i
+                SET status = v.status,
+                    error = v.error,
+                    processed_at = NOW()
+                FROM (VALUES %s) AS v (run_id, employee_id, status, error)
+                WHERE i.run_id = v.run_id
+                  AND i.employee_id = v.employee_id;
+            """, [
+                (run_id, r["employee_id"], r["status"], r.get("error")) for r in results
+            ], template="(%s::int, %s::int, %s, %s)", page_size=1000)
+
+            # Keep what this run wrote: payroll rows are overwritten by the next run
+            cur.execute(_SNAPSHOT_SQL, (
+                run_id, [r["employee_id"] for r in results if r["status"] == "success"]
+            ))
+
+            cur.execute("""
+                UPDATE payroll_runs
+                SET processed = processed + %s,
+                    succeeded = succeeded + %s,
+                    failed = failed + %s,
+                    updated_at = NOW()
+                WHERE run_id = %s;
+            """, (len(results), ok, len(results) - ok, run_id))
+            cur.close()
@@ -0,0 +1,188 @@
+# app/database/query_stats.py
+"""
+Per-request SQL accounting.
+
+While a QueryStats collector is active (the HTTP middleware in
+app/api/main.py opens one per request, tests can use track_queries()),
+every statement run through a pooled cursor or the asyncpg pool is
+counted, timed and fingerprinted. A fingerprint that runs more than
+NPLUS1_THRESHOLD times in one request is reported as a likely N+1.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger("hrms.database")
+
+NPLUS1_THRESHOLD = int(os.getenv("HRMS_NPLUS1_THRESHOLD", "5"))
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("hrms_query_stats", default=None)
+
+
+# ============================================================
+# FINGERPRINTING
+# ============================================================
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(sql) -> str:
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    elif not isinstance(sql, str):
+        # psycopg2.sql.Composed and friends
+        sql = str(sql)
+
+    sql = _COMMENTS.sub(" ", sql)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _IN_LISTS.sub("(?)", sql)
+    return _SPACES.sub(" ", sql).strip().rstrip(";").strip()
+
+
+def fingerprint(sql) -> str:
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+# ============================================================
+# COLLECTOR
+# ============================================================
+class QueryStats:
+
+    def __init__(self, label: str = "", nplus1_threshold: int = NPLUS1_THRESHOLD):
+        self.label = label
+        self.nplus1_threshold = nplus1_threshold
+        self.count = 0
+        self.total_seconds = 0.0
+        self.by_fingerprint = Counter()
+        self.samples = {}                 # fingerprint -> normalized SQL
+        self._lock = threading.Lock()
+
+    def record(self, sql, seconds: float):
+        normalized = normalize_sql(sql)
+        fp = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.by_fingerprint[fp] += 1
+            self.samples.setdefault(fp, normalized)
+
+    @property
+    def total_ms(self) -> float:
+        return round(self.total_seconds * 1000, 2)
+
+    def repeated(self):
+        """Fingerprints that ran more than the N+1 threshold."""
+        return [
+            {"fingerprint": fp, "count": n, "sql": self.samples[fp]}
+            for fp, n in self.by_fingerprint.most_common()
+            if n > self.nplus1_threshold
+        ]
+
+    def headers(self):
+        return {
+            "X-DB-Queries": str(self.count),
+            "X-DB-Time-ms": f"{self.total_ms:.2f}",
+        }
+
+    def log(self):
+        logger.info(
+            "%s db_queries=%d db_time_ms=%.2f distinct=%d",
+            self.label, self.count, self.total_ms, len(self.by_fingerprint),
+        )
+        for item in self.repeated():
+            logger.warning(
+                "%s possible N+1: %d x [%s] %s",
+                self.label, item["count"], item["fingerprint"], item["sql"][:200],
+            )
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def record_query(sql, seconds: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.record(sql, seconds)
+
+
+@contextmanager
+def track_queries(label: str = "", nplus1_threshold: int = NPLUS1_THRESHOLD):
+    """
+    Collect statements run inside the block:
+
+        with track_queries() as stats:
+            client.get("/hrms/dashboard/today-stats")
+        assert stats.count <= 5
+    """
+    stats = QueryStats(label, nplus1_threshold)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# ============================================================
+# CURSOR WRAPPER (psycopg2)
+# ============================================================
+class InstrumentedCursor:
+    """Times execute()/executemany() and forwards everything else."""
+
+    __slots__ = ("_cur", "_stats")
+
+    def __init__(self, cur, stats: QueryStats):
+        self._cur = cur
+        self._stats = stats
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return self._cur.execute(query, vars)
+        finally:
+            self._stats.record(query, time.perf_counter() - start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return self._cur.executemany(query, vars_list)
+        finally:
+            self._stats.record(query, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def __setattr__(self, name, value):
+        if name in InstrumentedCursor.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cur, name, value)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def __enter__(self):
+        self._cur.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._cur.__exit__(exc_type, exc, tb)
+
+
+def asyncpg_query_logger(record):
+    """asyncpg Connection.add_query_logger callback."""
+    record_query(record.query, record.elapsed)
@@ -0,0 +1,158 @@
+# app/database/records.py
+"""
+Compact row records for the hot tables (attendance, attendance_events,
+employees, payroll).
+
+RecordCursor wraps the tuple psycopg2 already builds for each row in a
+small __slots__ object instead of copying it into a dict:
+
+    cur = conn.cursor(cursor_factory=RecordCursor)
+    cur.execute("SELECT * FROM attendance WHERE ...")
+    for row in cur.fetchall():
+        row.status          # attribute access
+        row["status"]       # dict-style access keeps old callers working
+
+dumps() writes records (and lists / dicts of them) straight to JSON
+with the same value encoding FastAPI uses.
+"""
+import json
+from collections.abc import Mapping
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from keyword import iskeyword
+from typing import Tuple
+
+from psycopg2 import extensions as pg_ext
+
+
+# ============================================================
+# RECORD TYPES
+# ============================================================
+class Record(Mapping):
+    """
+    Read-only row: one slot holding the driver's value tuple.
+    Behaves like a Mapping (keys / items / get / ==dict) so it can
+    replace RealDictRow wherever rows are only read.
+    """
+
+    __slots__ = ("_values",)
+    _fields: Tuple[str, ...] = ()
+    _index = {}
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._index[key]]
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __repr__(self):
+        return "Record(%s)" % ", ".join(
+            "%s=%r" % (k, v) for k, v in zip(self._fields, self._values)
+        )
+
+    def __reduce__(self):
+        # Generated classes are not importable; rebuild from the field list
+        return make_record, (self._fields, tuple(self._values))
+
+    def _asdict(self):
+        return dict(zip(self._fields, self._values))
+
+    def to_json(self) -> str:
+        return "{%s}" % ",".join(
+            "%s:%s" % (json.dumps(k), dumps(v))
+            for k, v in zip(self._fields, self._values)
+        )
+
+
+@lru_cache(maxsize=256)
+def record_class(fields: Tuple[str, ...]):
+    """One generated Record subclass per distinct column list."""
+    namespace = {
+        "__slots__": (),
+        "_fields": fields,
+        "_index": {name: i for i, name in enumerate(fields)},
+    }
+    for i, name in enumerate(fields):
+        # Attribute access for plain column names that don't shadow
+        # Mapping methods (keys, get, items, ...)
+        if name.isidentifier() and not iskeyword(name) and not hasattr(Record, name):
+            namespace[name] = property(lambda self, i=i: self._values[i], doc="column %r" % name)
+    return type("Record", (Record,), namespace)
+
+
+def make_record(fields, values):
+    return record_class(tuple(fields))(values)
+
+
+# ============================================================
+# CURSOR FACTORY
+# ============================================================
+class RecordCursor(pg_ext.cursor):
+    """cursor_factory returning Record rows (works for named cursors too)."""
+
+    def _record_type(self):
+        return record_class(tuple(col[0] for col in self.description))
+
+    def fetchone(self):
+        row = super().fetchone()
+        return None if row is None else self._record_type()(row)
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(size) if size is not None else super().fetchmany()
+        make = self._record_type() if rows else None
+        return [make(r) for r in rows]
+
+    def fetchall(self):
+        rows = super().fetchall()
+        make = self._record_type() if rows else None
+        return [make(r) for r in rows]
+
+    def __iter__(self):
+        it = super().__iter__()
+        try:
+            first = next(it)
+        except StopIteration:
+            return
+        # description is only known once the first row is in
+        make = self._record_type()
+        yield make(first)
+        for row in it:
+            yield make(row)
+
+
+# ============================================================
+# JSON
+# ============================================================
+def json_default(value):
+    """Value encoding compatible with fastapi.encoders.jsonable_encoder."""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError("Object of type %s is not JSON serializable" % type(value).__name__)
+
+
+def dumps(obj) -> str:
+    """JSON-encode records, lists of records, or anything json.dumps takes."""
+    if isinstance(obj, Record):
+        return obj.to_json()
+    if isinstance(obj, (list, tuple)) and obj and isinstance(obj[0], Record):
+        return "[%s]" % ",".join(dumps(item) for item in obj)
+    return json.dumps(obj, default=json_default, separators=(",", ":"))
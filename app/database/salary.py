@@ -1,9 +1,11 @@
 # app/database/salary_db.py
 
-from datetime import date
-from typing import Optional
+from bisect import bisect_right
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
 from psycopg2.extras import RealDictCursor
-from .connection import get_connection
+from .connection import get_connection, use_connection
+from .payroll_dirty import PayrollDirtyDB
 
 
 class SalaryDB:
@@ -32,6 +34,8 @@ class SalaryDB:
         ))
 
         res = cur.fetchone()
+        # Payroll from the effective month onwards must be recomputed
+        PayrollDirtyDB.mark_from(employee_id, res["effective_from"], "salary_structure", conn=conn)
         conn.commit()
         conn.close()
         return res
@@ -62,46 +66,206 @@ class SalaryDB:
     # ============================================================
 
     @staticmethod
-    def get_active_for_date(employee_id: int, for_date: date) -> Optional[dict]:
+    def get_active_for_date(employee_id: int, for_date: date, conn=None) -> Optional[dict]:
         """
         ✅ This is REQUIRED by PayrollService
         """
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        cur.execute("""
-            SELECT *
-            FROM salary_structure
-            WHERE employee_id = %s
-              AND effective_from <= %s
-              AND (effective_to IS NULL OR effective_to >= %s)
-            ORDER BY effective_from DESC
-            LIMIT 1;
-        """, (employee_id, for_date, for_date))
-
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+            cur.execute("""
+                SELECT *
+                FROM salary_structure
+                WHERE employee_id = %s
+                  AND effective_from <= %s
+                  AND (effective_to IS NULL OR effective_to >= %s)
+                ORDER BY effective_from DESC
+                LIMIT 1;
+            """, (employee_id, for_date, for_date))
+
+            row = cur.fetchone()
+            cur.close()
         return row
 
     @staticmethod
-    def get_base_salary_from_employee(employee_id: int) -> Optional[float]:
+    def get_base_salary_from_employee(employee_id: int, conn=None) -> Optional[float]:
         """
         ✅ Payroll fallback if structure missing
         """
-        conn = get_connection()
-        cur = conn.cursor()
+        with use_connection(conn) as conn:
+            cur = conn.cursor()
 
-        cur.execute("""
-            SELECT base_salary
-            FROM employees
-            WHERE employee_id = %s;
-        """, (employee_id,))
+            cur.execute("""
+                SELECT base_salary
+                FROM employees
+                WHERE employee_id = %s;
+            """, (employee_id,))
 
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
+            row = cur.fetchone()
+            cur.close()
 
         if not row:
             return None
         return float(row[0]) if row[0] is not None else None
+
+    @staticmethod
+    def get_salary_inputs_for_date(employee_ids: List[int], for_date: date, conn=None) -> Dict[int, dict]:
+        """
+        get_active_for_date + get_base_salary_from_employee for many
+        employees in one query: {employee_id: {"structure": row | None,
+        "base_salary": float | None}}.
+        """
+        index = SalaryDB.load_index(employee_ids, for_date, for_date, conn=conn)
+        return index.inputs_for(employee_ids, for_date)
+
+    @staticmethod
+    def load_index(employee_ids: List[int], start_date: date, end_date: date,
+                   conn=None) -> "SalaryStructureIndex":
+        """
+        Every salary_structure row overlapping start..end for the given
+        employees, plus their base_salary, in one query.
+        """
+        with use_connection(conn) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute("""
+                SELECT
+                    e.employee_id,
+                    e.base_salary,
+                    s.id AS structure_id,
+                    s.basic,
+                    s.hra,
+                    s.allowances,
+                    s.deductions,
+                    s.effective_from,
+                    s.effective_to
+                FROM employees e
+                LEFT JOIN salary_structure s
+                  ON s.employee_id = e.employee_id
+                 AND s.effective_from <= %s
+                 AND (s.effective_to IS NULL OR s.effective_to >= %s)
+                WHERE e.employee_id = ANY(%s)
+                ORDER BY e.employee_id, s.effective_from, s.id;
+            """, (end_date, start_date, list(employee_ids)))
+
+            rows = cur.fetchall()
+            cur.close()
+
+        return SalaryStructureIndex.from_rows(rows)
+
+
+# ============================================================
+# ✅ EFFECTIVE-DATED SALARY INDEX (IN MEMORY)
+# ============================================================
+
+class SalaryStructureIndex:
+    """
+    Per-employee salary structures sorted by effective_from, with the
+    employees.base_salary fallback folded in. Answers "which structure is
+    effective on date D" with a bisect instead of a query:
+
+        index = SalaryDB.load_index(ids, first_day, last_day)
+        index.structure_on(42, first_day)       # same row get_active_for_date picks
+        index.revisions(42, first_day, last_day)
+    """
+
+    def __init__(self, structures: Dict[int, List[dict]], base_salaries: Dict[int, Optional[float]]):
+        # structures[emp] must be sorted by (effective_from, id)
+        self._structures = structures
+        self._starts = {emp: [s["effective_from"] for s in rows] for emp, rows in structures.items()}
+        self._base = base_salaries
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> "SalaryStructureIndex":
+        structures: Dict[int, List[dict]] = {}
+        base: Dict[int, Optional[float]] = {}
+
+        for row in rows:
+            emp_id = row["employee_id"]
+            if emp_id not in base:
+                value = row["base_salary"]
+                base[emp_id] = float(value) if value is not None else None
+                structures[emp_id] = []
+            if row["structure_id"] is not None:
+                structures[emp_id].append({
+                    "id": row["structure_id"],
+                    "basic": row["basic"],
+                    "hra": row["hra"],
+                    "allowances": row["allowances"],
+                    "deductions": row["deductions"],
+                    "effective_from": row["effective_from"],
+                    "effective_to": row["effective_to"],
+                })
+
+        return cls(structures, base)
+
+    # --------------------------------------------------------
+    def structure_on(self, employee_id: int, on: date) -> Optional[dict]:
+        """Latest structure with effective_from <= on that has not ended before `on`."""
+        rows = self._structures.get(employee_id)
+        if not rows:
+            return None
+
+        i = bisect_right(self._starts[employee_id], on)
+        # Normally the first candidate; closed rows (effective_to < on) are skipped
+        while i > 0:
+            i -= 1
+            row = rows[i]
+            if row["effective_to"] is None or row["effective_to"] >= on:
+                return row
+        return None
+
+    def base_salary(self, employee_id: int) -> Optional[float]:
+        return self._base.get(employee_id)
+
+    def inputs_on(self, employee_id: int, on: date) -> dict:
+        """get_salary_inputs_for_date shape for one employee."""
+        row = self.structure_on(employee_id, on)
+        structure = None
+        if row is not None:
+            structure = {k: row[k] for k in ("basic", "hra", "allowances", "deductions")}
+        return {"structure": structure, "base_salary": self._base.get(employee_id)}
+
+    def inputs_for(self, employee_ids: Iterable[int], on: date) -> Dict[int, dict]:
+        return {emp_id: self.inputs_on(emp_id, on) for emp_id in employee_ids if emp_id in self._base}
+
+    # --------------------------------------------------------
+    # MID-PERIOD REVISIONS
+    # --------------------------------------------------------
+    def revisions(self, employee_id: int, start: date, end: date) -> List[dict]:
+        """
+        The period split into segments with a constant effective structure:
+        [{"from", "to", "days", "structure"}] (structure None = base_salary
+        fallback). One segment means no revision inside the period.
+        """
+        boundaries = {start}
+        for row in self._structures.get(employee_id, ()):
+            if start < row["effective_from"] <= end:
+                boundaries.add(row["effective_from"])
+            if row["effective_to"] is not None and start <= row["effective_to"] < end:
+                boundaries.add(row["effective_to"] + timedelta(days=1))
+
+        segments = []
+        for day in sorted(boundaries):
+            row = self.structure_on(employee_id, day)
+            structure_id = row["id"] if row else None
+            if segments and segments[-1]["structure_id"] == structure_id:
+                continue
+            if segments:
+                segments[-1]["to"] = day - timedelta(days=1)
+            segments.append({"from": day, "to": end, "structure_id": structure_id, "structure": row})
+
+        for seg in segments:
+            seg["days"] = (seg["to"] - seg["from"]).days + 1
+        return segments
+
+    def mid_period_revisions(self, start: date, end: date,
+                             employee_ids: Iterable[int] = None) -> Dict[int, List[dict]]:
+        """Employees whose effective structure changes inside start..end."""
+        ids = self._base.keys() if employee_ids is None else employee_ids
+        result = {}
+        for emp_id in ids:
+            segments = self.revisions(emp_id, start, end)
+            if len(segments) > 1:
+                result[emp_id] = segments
+        return result
@@ -0,0 +1,46 @@
+# app/database/streaming.py
+import os
+import uuid
+
+
+from app.database.connection import get_connection
+from app.database.records import RecordCursor
+
+# Rows fetched per round trip by a server-side cursor
+STREAM_ITERSIZE = int(os.getenv("HRMS_STREAM_ITERSIZE", "500"))
+
+
+def iter_rows(query, params=None, itersize=STREAM_ITERSIZE):
+    """
+    Stream a SELECT through a named (server-side) cursor:
+
+        for row in iter_rows("SELECT * FROM attendance WHERE ...", (...,)):
+            ...
+
+    Only `itersize` rows are held in memory at a time. The generator
+    owns its pooled connection and returns it when exhausted or closed,
+    so it is safe to hand straight to a StreamingResponse.
+
+    The connection is checked out here, not on first iteration, so
+    replica routing follows the calling endpoint.
+    """
+    return _stream(get_connection(), query, params, itersize)
+
+
+def _stream(conn, query, params, itersize):
+    try:
+        cur = conn.cursor(
+            name="hrms_stream_%s" % uuid.uuid4().hex,
+            cursor_factory=RecordCursor,
+        )
+        cur.itersize = itersize
+        cur.execute(query, params)
+
+        for row in cur:
+            yield row
+
+        cur.close()
+    finally:
+        # Read-only: nothing to commit, just end the cursor's transaction
+        conn.rollback()
+        conn.close()
@@ -1,25 +1,12 @@
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime
 from typing import Optional
 
+from app.database.connection import get_connection
 from app.database.employee_db import EmployeeDB
 from app.database.leave_database import LeaveRequestDB
 
 
-DB_PARAMS = {
-    "dbname": "hrms_db",
-    "user": "varun",
-    "password": "varun@123",
-    "host": "localhost",
-    "port": 5432,
-}
-
-
-def get_connection():
-    return psycopg2.connect(**DB_PARAMS)
-
-
 # ================================
 # ✅ TABLE CREATION
 # ================================
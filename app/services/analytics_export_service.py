@@ -0,0 +1,318 @@
+"""
+Columnar exports of payroll, attendance and attendance_events for BI.
+
+A period (first..last month, inclusive) of one table is streamed from a
+server-side cursor and written as Parquet or an Arrow IPC stream with a
+fixed, typed schema: integers stay integers, money stays decimal(10,2),
+and low-cardinality strings (status, event_type, source) are
+dictionary-encoded. Record batches of EXPORT_BATCH_ROWS are converted
+and flushed one at a time, so memory is bounded by the batch, not the
+period.
+
+    python -m app.services.analytics_export_service payroll \\
+        --from 2025-01 --to 2025-12 --output payroll_2025.parquet
+    python -m app.services.analytics_export_service attendance \\
+        --from 2025-01 --to 2025-12 --format arrow --output attendance_2025.arrow
+
+The same exports are served by GET /hrms/analytics/export/{table}.
+
+pyarrow is an optional dependency of the API: without it the rest of the
+app works and these exports raise ColumnarExportUnavailable.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+from typing import Dict, Iterator, List, Tuple
+
+from app.database.payroll import PAYROLL_VALUE_COLUMNS
+from app.database.partitions import add_months
+from app.database.streaming import iter_rows
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for the analytics exports
+    pa = pq = None
+
+# Rows converted into one Arrow record batch / Parquet row group
+EXPORT_BATCH_ROWS = int(os.getenv("HRMS_EXPORT_BATCH_ROWS", "50000"))
+
+EXPORT_FORMATS = ("parquet", "arrow")
+
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+class ColumnarExportUnavailable(RuntimeError):
+    pass
+
+
+# ============================================================
+# ✅ TABLE SCHEMAS
+# ============================================================
+# (column, arrow type name); names resolve to pyarrow types lazily so the
+# module imports without pyarrow.
+
+_MONEY = "decimal(10,2)"
+
+EXPORT_TABLES: Dict[str, Dict[str, object]] = {
+    "payroll": {
+        "columns": (
+            ("payroll_id", "int32"),
+            ("employee_id", "int32"),
+            ("year", "int16"),
+            ("month", "int8"),
+            *((c, "bool" if c == "is_finalized"
+                  else "int16" if c in ("working_days", "present_days")
+                  else "decimal(5,2)" if c == "lop_days"
+                  else _MONEY)
+              for c in PAYROLL_VALUE_COLUMNS),
+            ("generated_at", "timestamp"),
+        ),
+        # Row comparison, so idx_payroll_year_month serves the range
+        "where": "(year, month) BETWEEN (%s, %s) AND (%s, %s)",
+        "order": "year, month, employee_id",
+    },
+    "attendance": {
+        "columns": (
+            ("attendance_id", "int32"),
+            ("employee_id", "int32"),
+            ("shift_id", "int32"),
+            ("date", "date"),
+            ("check_in", "timestamp"),
+            ("check_out", "timestamp"),
+            ("total_hours", "decimal(5,2)"),
+            ("net_hours", "decimal(5,2)"),
+            ("break_minutes", "int32"),
+            ("overtime_minutes", "int32"),
+            ("late_minutes", "int32"),
+            ("early_exit_minutes", "int32"),
+            ("is_late", "bool"),
+            ("is_early_checkout", "bool"),
+            ("is_overtime", "bool"),
+            ("is_weekend", "bool"),
+            ("is_holiday", "bool"),
+            ("is_night_shift", "bool"),
+            ("status", "dictionary"),
+            ("is_payroll_locked", "bool"),
+        ),
+        # Range on the partition key: only the period's partitions are scanned
+        "where": "date >= %s AND date < %s",
+        "order": "date, employee_id",
+    },
+    "attendance_events": {
+        "columns": (
+            ("event_id", "int64"),
+            ("employee_id", "int32"),
+            ("event_type", "dictionary"),
+            ("event_time", "timestamp"),
+            ("source", "dictionary"),
+            ("meta", "json"),
+        ),
+        "where": "event_time >= %s AND event_time < %s",
+        "order": "event_time, event_id",
+    },
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ColumnarExportUnavailable(
+            "Parquet/Arrow export needs pyarrow (pip install pyarrow)"
+        )
+
+
+def _arrow_type(name: str):
+    if name == "dictionary":
+        # dictionary_encode()'s index type
+        return pa.dictionary(pa.int32(), pa.string())
+    if name == "json":
+        return pa.string()
+    if name == "timestamp":
+        return pa.timestamp("us")
+    if name == "date":
+        return pa.date32()
+    if name == "bool":
+        return pa.bool_()
+    if name.startswith("decimal("):
+        precision, scale = name[8:-1].split(",")
+        return pa.decimal128(int(precision), int(scale))
+    return getattr(pa, name)()
+
+
+def arrow_schema(table: str):
+    _require_pyarrow()
+    return pa.schema([
+        pa.field(column, _arrow_type(kind)) for column, kind in EXPORT_TABLES[table]["columns"]
+    ])
+
+
+def export_sql(table: str, first: Tuple[int, int], last: Tuple[int, int]) -> Tuple[str, tuple]:
+    """SELECT (and params) for `table` over the months first..last."""
+    spec = EXPORT_TABLES[table]
+    if table == "payroll":
+        params = (*first, *last)
+    else:
+        end = add_months(last[0], last[1], 1)
+        params = (date(first[0], first[1], 1), date(end[0], end[1], 1))
+
+    columns = ", ".join(column for column, _ in spec["columns"])
+    sql = f"SELECT {columns} FROM {table} WHERE {spec['where']} ORDER BY {spec['order']};"
+    return sql, params
+
+
+# ============================================================
+# ✅ ROWS → RECORD BATCHES
+# ============================================================
+
+def record_batches(rows, table: str, batch_rows: int = None) -> Iterator["pa.RecordBatch"]:
+    """Pivot a row iterator into typed record batches of `batch_rows` rows."""
+    schema = arrow_schema(table)
+    batch_rows = batch_rows or EXPORT_BATCH_ROWS
+    names = schema.names
+    json_columns = {c for c, kind in EXPORT_TABLES[table]["columns"] if kind == "json"}
+
+    def to_batch(buffered: List) -> "pa.RecordBatch":
+        arrays = []
+        for field in schema:
+            values = [row[field.name] for row in buffered]
+            if field.name in json_columns:
+                values = [None if v is None else json.dumps(v, default=str) for v in values]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, names=names)
+
+    buffered = []
+    for row in rows:
+        buffered.append(row)
+        if len(buffered) >= batch_rows:
+            yield to_batch(buffered)
+            buffered = []
+    if buffered:
+        yield to_batch(buffered)
+
+
+class _StreamSink:
+    """Write-only file handed to the Arrow writers; drained after each batch."""
+
+    def __init__(self):
+        self._chunks = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _write(batches, schema, fmt: str, sink, drain) -> Iterator[bytes]:
+    """Write batches as `fmt` to sink, yielding whatever drain() returns after each."""
+    if fmt == "parquet":
+        # One row group per batch
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            chunk = drain()
+            if chunk:
+                yield chunk
+    finally:
+        # Parquet footer / Arrow end-of-stream marker
+        writer.close()
+    chunk = drain()
+    if chunk:
+        yield chunk
+
+
+class AnalyticsExportService:
+
+    @staticmethod
+    def validate(table: str, fmt: str):
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"table must be one of {', '.join(EXPORT_TABLES)}")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+        _require_pyarrow()
+
+    @classmethod
+    def stream(cls, table: str, first: Tuple[int, int], last: Tuple[int, int],
+               fmt: str = "parquet") -> Iterator[bytes]:
+        """Bytes of the export, produced while rows are read from Postgres."""
+        cls.validate(table, fmt)
+        sql, params = export_sql(table, first, last)
+        # Checked out now, so replica routing follows the calling endpoint
+        rows = iter_rows(sql, params)
+        sink = _StreamSink()
+        return _write(record_batches(rows, table), arrow_schema(table), fmt, sink, sink.drain)
+
+    @classmethod
+    def to_file(cls, table: str, first: Tuple[int, int], last: Tuple[int, int],
+                path: str, fmt: str = "parquet") -> int:
+        """Write the export to `path`; returns the number of rows written."""
+        cls.validate(table, fmt)
+        sql, params = export_sql(table, first, last)
+        count = 0
+
+        def counted():
+            nonlocal count
+            for batch in record_batches(iter_rows(sql, params), table):
+                count += batch.num_rows
+                yield batch
+
+        with open(path, "wb") as fh:
+            for _ in _write(counted(), arrow_schema(table), fmt, fh, lambda: b""):
+                pass
+        return count
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+def parse_month(value: str) -> Tuple[int, int]:
+    try:
+        year, month = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"month out of range in {value!r}")
+    return year, month
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a period as Parquet / Arrow")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--from", dest="first", type=parse_month, required=True, help="YYYY-MM")
+    parser.add_argument("--to", dest="last", type=parse_month, help="YYYY-MM (default: --from)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="parquet")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args(argv)
+
+    try:
+        rows = AnalyticsExportService.to_file(
+            args.table, args.first, args.last or args.first, args.output, args.format
+        )
+    except ColumnarExportUnavailable as e:
+        parser.exit(1, f"{e}\n")
+    print(f"{args.table}: {rows} rows → {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
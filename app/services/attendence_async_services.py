@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from datetime import datetime, date, time
+
+from app.database.attendence_async import (
+    AsyncAttendanceDB,
+    AsyncAttendanceEventDB,
+    AsyncHolidayDB,
+    AsyncLeaveRequestDB,
+    AsyncShiftDB,
+)
+from app.database.payroll import AttendanceLockDB
+from app.services.attendence_services import (
+    AttendancePolicy,
+    AttendancePolicyDB,
+    AttendanceService,
+    AttendanceLocked,
+    AlreadyCheckedIn,
+    NoActiveCheckIn,
+    BreakAlreadyRunning,
+    NoActiveBreak,
+)
+
+
+# =========================================================
+# POLICY LOADER (ASYNC)
+# =========================================================
+class AsyncAttendancePolicyDB:
+
+    @staticmethod
+    async def get_policy_for_date(conn, dt: date) -> AttendancePolicy:
+        end_of_day = datetime.combine(dt, time(23, 59, 59))
+
+        try:
+            # Nested transaction = savepoint; a failure here must not
+            # abort the punch transaction around it
+            async with conn.transaction():
+                row = await conn.fetchrow(
+                    """
+                    SELECT
+                        late_grace_minutes,
+                        early_exit_grace_minutes,
+                        early_checkin_grace_minutes,
+                        full_day_fraction,
+                        half_day_fraction,
+                        overtime_enabled
+                    FROM attendance_policies
+                    WHERE created_at <= $1
+                    ORDER BY created_at DESC
+                    LIMIT 1;
+                    """,
+                    end_of_day,
+                )
+        except Exception:
+            return AttendancePolicyDB.DEFAULT_POLICY
+
+        if not row:
+            return AttendancePolicyDB.DEFAULT_POLICY
+
+        return AttendancePolicy(
+            late_grace_minutes=row[0],
+            early_exit_grace_minutes=row[1],
+            early_checkin_grace_minutes=row[2],
+            full_day_fraction=row[3],
+            half_day_fraction=row[4],
+            overtime_enabled=row[5],
+        )
+
+
+# =========================================================
+# ATTENDANCE SERVICE (ASYNC)
+# =========================================================
+class AsyncAttendanceService:
+    """
+    Non-blocking counterpart of AttendanceService for the `async def`
+    routes. All business rules (shift windows, row building) are reused
+    from AttendanceService; only the I/O is awaited here.
+    """
+
+    # =====================================================
+    # PUBLIC ACTIONS
+    # =====================================================
+    @classmethod
+    async def check_in(cls, conn, employee_id: int, source="manual", meta=None):
+        today = datetime.now().date()
+        if (await cls._session_state(conn, employee_id, today))["checked_in"]:
+            raise AlreadyCheckedIn("Employee already checked in for this session.")
+
+        return await cls._record(conn, employee_id, "check_in", source, meta, today)
+
+    @classmethod
+    async def check_out(cls, conn, employee_id: int, source="manual", meta=None):
+        today = datetime.now().date()
+        if not (await cls._session_state(conn, employee_id, today))["checked_in"]:
+            raise NoActiveCheckIn("No active check-in for this session.")
+
+        return await cls._record(conn, employee_id, "check_out", source, meta, today)
+
+    @classmethod
+    async def break_start(cls, conn, employee_id: int, source="manual", meta=None):
+        today = datetime.now().date()
+        state = await cls._session_state(conn, employee_id, today)
+        if not state["checked_in"]:
+            raise NoActiveCheckIn("No active check-in for this session.")
+        if state["on_break"]:
+            raise BreakAlreadyRunning("Break already running.")
+
+        return await cls._record(conn, employee_id, "break_start", source, meta, today)
+
+    @classmethod
+    async def break_end(cls, conn, employee_id: int, source="manual", meta=None):
+        today = datetime.now().date()
+        if not (await cls._session_state(conn, employee_id, today))["on_break"]:
+            raise NoActiveBreak("No active break to end.")
+
+        return await cls._record(conn, employee_id, "break_end", source, meta, today)
+
+    # =====================================================
+    # HELPERS
+    # =====================================================
+    @classmethod
+    async def _record(cls, conn, employee_id: int, event_type: str, source, meta, dt: date):
+        event = await AsyncAttendanceEventDB.add_event(
+            conn, employee_id, event_type, source, meta
+        )
+        await cls.recalculate_for_date(conn, employee_id, dt)
+        return event
+
+    @classmethod
+    async def _session_state(cls, conn, employee_id: int, dt: date):
+        shift = await AsyncShiftDB.get_employee_shift(conn, employee_id, dt)
+        policy = await AsyncAttendancePolicyDB.get_policy_for_date(conn, dt)
+        allowed_start, window_end = AttendanceService._get_event_window(shift, dt, policy)
+
+        events = await AsyncAttendanceEventDB.get_events_for_window(
+            conn, employee_id, allowed_start, window_end
+        )
+        return AttendanceService._derive_state(events)
+
+    # =====================================================
+    # PAYROLL RECALCULATION
+    # =====================================================
+    @classmethod
+    async def recalculate_for_date(cls, conn, employee_id: int, dt: date):
+        policy = await AsyncAttendancePolicyDB.get_policy_for_date(conn, dt)
+
+        if await AttendanceLockDB.is_locked_async(conn, employee_id, dt):
+            raise AttendanceLocked("Attendance locked for payroll.")
+
+        existing = await AsyncAttendanceDB.get_by_employee_and_date(conn, employee_id, dt)
+        if existing and existing.get("is_payroll_locked"):
+            raise AttendanceLocked("Attendance locked for payroll.")
+
+        is_holiday = await AsyncHolidayDB.is_holiday(conn, dt)
+        has_leave = await AsyncLeaveRequestDB.has_overlapping_approved_leave(
+            conn, employee_id, dt, dt
+        )
+
+        shift = await AsyncShiftDB.get_employee_shift(conn, employee_id, dt)
+        allowed_start, window_end = AttendanceService._get_event_window(shift, dt, policy)
+
+        events = await AsyncAttendanceEventDB.get_events_for_window(
+            conn, employee_id, allowed_start, window_end
+        )
+
+        row = AttendanceService.build_attendance_row(
+            employee_id, dt, policy, shift, events, is_holiday, has_leave
+        )
+        return await AsyncAttendanceDB.upsert_full_attendance(conn, row)
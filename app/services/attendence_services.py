@@ -10,8 +10,9 @@ from app.database.attendence import (
     HolidayDB,
     ShiftDB,
 )
-from app.database.connection import get_connection
+from app.database.connection import use_connection
 from app.database.leave_database import LeaveRequestDB, LeaveBalanceDB
+from app.database.payroll import AttendanceLockDB
 
 
 # =========================================================
@@ -68,33 +69,40 @@ class AttendancePolicyDB:
     )
 
     @staticmethod
-    def get_policy_for_date(dt: date) -> AttendancePolicy:
-        conn = None
+    def get_policy_for_date(dt: date, conn=None) -> AttendancePolicy:
         try:
-            conn = get_connection()
-            cur = conn.cursor()
-
-            end_of_day = datetime.combine(dt, time(23, 59, 59))
-
-            cur.execute(
-                """
-                SELECT
-                    late_grace_minutes,
-                    early_exit_grace_minutes,
-                    early_checkin_grace_minutes,
-                    full_day_fraction,
-                    half_day_fraction,
-                    overtime_enabled
-                FROM attendance_policies
-                WHERE created_at <= %s
-                ORDER BY created_at DESC
-                LIMIT 1;
-                """,
-                (end_of_day,),
-            )
-
-            row = cur.fetchone()
-            cur.close()
+            with use_connection(conn) as conn:
+                cur = conn.cursor()
+
+                end_of_day = datetime.combine(dt, time(23, 59, 59))
+
+                # Savepoint so a missing/broken policy table does not
+                # abort the caller's request transaction
+                cur.execute("SAVEPOINT attendance_policy;")
+                try:
+                    cur.execute(
+                        """
+                        SELECT
+                            late_grace_minutes,
+                            early_exit_grace_minutes,
+                            early_checkin_grace_minutes,
+                            full_day_fraction,
+                            half_day_fraction,
+                            overtime_enabled
+                        FROM attendance_policies
+                        WHERE created_at <= %s
+                        ORDER BY created_at DESC
+                        LIMIT 1;
+                        """,
+                        (end_of_day,),
+                    )
+                    row = cur.fetchone()
+                    cur.execute("RELEASE SAVEPOINT attendance_policy;")
+                except Exception:
+                    cur.execute("ROLLBACK TO SAVEPOINT attendance_policy;")
+                    row = None
+
+                cur.close()
 
             if not row:
                 return AttendancePolicyDB.DEFAULT_POLICY
@@ -111,10 +119,6 @@ class AttendancePolicyDB:
         except Exception:
             return AttendancePolicyDB.DEFAULT_POLICY
 
-        finally:
-            if conn:
-                conn.close()
-
 
 # =========================================================
 # ATTENDANCE SERVICE
@@ -125,59 +129,64 @@ class AttendanceService:
     # PUBLIC ACTIONS
     # =====================================================
     @classmethod
-    def check_in(cls, employee_id: int, source="manual", meta=None):
+    def check_in(cls, employee_id: int, source="manual", meta=None, conn=None):
         today = datetime.now().date()
-        cls._ensure_no_open_checkin(employee_id, today)
 
-        event = AttendanceEventDB.add_event(employee_id, "check_in", source, meta)
-        cls.recalculate_for_date(employee_id, today)
+        with use_connection(conn) as conn:
+            cls._ensure_no_open_checkin(employee_id, today, conn)
+
+            event = AttendanceEventDB.add_event(employee_id, "check_in", source, meta, conn=conn)
+            cls.recalculate_for_date(employee_id, today, conn=conn)
         return event
 
     @classmethod
-    def check_out(cls, employee_id: int, source="manual", meta=None):
+    def check_out(cls, employee_id: int, source="manual", meta=None, conn=None):
         today = datetime.now().date()
-        cls._ensure_has_open_checkin(employee_id, today)
 
-        event = AttendanceEventDB.add_event(employee_id, "check_out", source, meta)
-        cls.recalculate_for_date(employee_id, today)
+        with use_connection(conn) as conn:
+            cls._ensure_has_open_checkin(employee_id, today, conn)
+
+            event = AttendanceEventDB.add_event(employee_id, "check_out", source, meta, conn=conn)
+            cls.recalculate_for_date(employee_id, today, conn=conn)
         return event
 
     @classmethod
-    def break_start(cls, employee_id: int, source="manual", meta=None):
+    def break_start(cls, employee_id: int, source="manual", meta=None, conn=None):
         today = datetime.now().date()
-        cls._ensure_has_open_checkin(employee_id, today)
-        cls._ensure_no_open_break(employee_id, today)
 
-        event = AttendanceEventDB.add_event(employee_id, "break_start", source, meta)
-        cls.recalculate_for_date(employee_id, today)
+        with use_connection(conn) as conn:
+            cls._ensure_has_open_checkin(employee_id, today, conn)
+            cls._ensure_no_open_break(employee_id, today, conn)
+
+            event = AttendanceEventDB.add_event(employee_id, "break_start", source, meta, conn=conn)
+            cls.recalculate_for_date(employee_id, today, conn=conn)
         return event
 
     @classmethod
-    def break_end(cls, employee_id: int, source="manual", meta=None):
+    def break_end(cls, employee_id: int, source="manual", meta=None, conn=None):
         today = datetime.now().date()
-        cls._ensure_has_open_break(employee_id, today)
 
-        event = AttendanceEventDB.add_event(employee_id, "break_end", source, meta)
-        cls.recalculate_for_date(employee_id, today)
+        with use_connection(conn) as conn:
+            cls._ensure_has_open_break(employee_id, today, conn)
+
+            event = AttendanceEventDB.add_event(employee_id, "break_end", source, meta, conn=conn)
+            cls.recalculate_for_date(employee_id, today, conn=conn)
         return event
 
     # =====================================================
     # SESSION-AWARE VALIDATION HELPERS
     # =====================================================
     @classmethod
-    def _get_session_events(cls, employee_id: int, dt: date):
-        shift = ShiftDB.get_employee_shift(employee_id, dt)
-        window_start, window_end, _, _, _ = cls._get_shift_window(shift, dt)
-
-        policy = AttendancePolicyDB.get_policy_for_date(dt)
-        allowed_start = window_start - timedelta(
-            minutes=policy.early_checkin_grace_minutes
-        )
+    def _get_session_events(cls, employee_id: int, dt: date, conn=None):
+        shift = ShiftDB.get_employee_shift(employee_id, dt, conn=conn)
+        policy = AttendancePolicyDB.get_policy_for_date(dt, conn=conn)
+        allowed_start, window_end = cls._get_event_window(shift, dt, policy)
 
         return AttendanceEventDB.get_events_for_window(
             employee_id,
             allowed_start,
             window_end,
+            conn=conn,
         )
 
     @staticmethod
@@ -198,53 +207,98 @@ class AttendanceService:
         return state
 
     @classmethod
-    def _ensure_no_open_checkin(cls, employee_id: int, dt: date):
-        if cls._derive_state(cls._get_session_events(employee_id, dt))["checked_in"]:
+    def _ensure_no_open_checkin(cls, employee_id: int, dt: date, conn=None):
+        if cls._derive_state(cls._get_session_events(employee_id, dt, conn))["checked_in"]:
             raise AlreadyCheckedIn("Employee already checked in for this session.")
 
     @classmethod
-    def _ensure_has_open_checkin(cls, employee_id: int, dt: date):
-        if not cls._derive_state(cls._get_session_events(employee_id, dt))["checked_in"]:
+    def _ensure_has_open_checkin(cls, employee_id: int, dt: date, conn=None):
+        if not cls._derive_state(cls._get_session_events(employee_id, dt, conn))["checked_in"]:
             raise NoActiveCheckIn("No active check-in for this session.")
 
     @classmethod
-    def _ensure_no_open_break(cls, employee_id: int, dt: date):
-        if cls._derive_state(cls._get_session_events(employee_id, dt))["on_break"]:
+    def _ensure_no_open_break(cls, employee_id: int, dt: date, conn=None):
+        if cls._derive_state(cls._get_session_events(employee_id, dt, conn))["on_break"]:
             raise BreakAlreadyRunning("Break already running.")
 
     @classmethod
-    def _ensure_has_open_break(cls, employee_id: int, dt: date):
-        if not cls._derive_state(cls._get_session_events(employee_id, dt))["on_break"]:
+    def _ensure_has_open_break(cls, employee_id: int, dt: date, conn=None):
+        if not cls._derive_state(cls._get_session_events(employee_id, dt, conn))["on_break"]:
             raise NoActiveBreak("No active break to end.")
 
     # =====================================================
     # PAYROLL RECALCULATION (CRITICAL FIX APPLIED)
     # =====================================================
     @classmethod
-    def recalculate_for_date(cls, employee_id: int, dt: date):
-        policy = AttendancePolicyDB.get_policy_for_date(dt)
-        engine = AttendanceEngine(policy)
+    def recalculate_for_date(cls, employee_id: int, dt: date, conn=None):
+        """
+        Rebuild the processed attendance row for one day.
+        Pass `conn` to run every read and the final upsert in the
+        caller's transaction (see app.database.connection.get_db).
+        """
+        with use_connection(conn) as conn:
+            return cls._recalculate_for_date(employee_id, dt, conn)
+
+    @classmethod
+    def _recalculate_for_date(cls, employee_id: int, dt: date, conn):
+        policy = AttendancePolicyDB.get_policy_for_date(dt, conn=conn)
 
-        existing = AttendanceDB.get_by_employee_and_date(employee_id, dt)
+        # Period lock first: cached, so a locked month costs no query
+        if AttendanceLockDB.is_locked(employee_id, dt, conn=conn):
+            raise AttendanceLocked("Attendance locked for payroll.")
+
+        existing = AttendanceDB.get_by_employee_and_date(employee_id, dt, conn=conn)
         if existing and existing.get("is_payroll_locked"):
             raise AttendanceLocked("Attendance locked for payroll.")
 
-        is_weekend = dt.weekday() >= 5
-        is_holiday = HolidayDB.is_holiday(dt)
-        has_leave = LeaveDB.has_approved_leave(employee_id, dt)
+        is_holiday = HolidayDB.is_holiday(dt, conn=conn)
+        has_leave = LeaveRequestDB.has_overlapping_approved_leave(employee_id, dt, dt, conn=conn)
 
-        shift = ShiftDB.get_employee_shift(employee_id, dt)
-        window_start, window_end, required_hours, is_night_shift, shift_id = cls._get_shift_window(shift, dt)
-
-        allowed_start = window_start - timedelta(
-            minutes=policy.early_checkin_grace_minutes
-        )
+        shift = ShiftDB.get_employee_shift(employee_id, dt, conn=conn)
+        allowed_start, window_end = cls._get_event_window(shift, dt, policy)
 
         events = AttendanceEventDB.get_events_for_window(
             employee_id,
             allowed_start,
             window_end,
+            conn=conn,
+        )
+
+        row = cls.build_attendance_row(
+            employee_id, dt, policy, shift, events, is_holiday, has_leave
+        )
+        return AttendanceDB.upsert_full_attendance(row, conn=conn)
+
+    # =====================================================
+    # PURE ROW BUILDER (shared by sync + async paths)
+    # =====================================================
+    @classmethod
+    def _get_event_window(cls, shift, dt: date, policy: AttendancePolicy):
+        window_start, window_end, _, _, _ = cls._get_shift_window(shift, dt)
+        allowed_start = window_start - timedelta(
+            minutes=policy.early_checkin_grace_minutes
         )
+        return allowed_start, window_end
+
+    @classmethod
+    def build_attendance_row(
+        cls,
+        employee_id: int,
+        dt: date,
+        policy: AttendancePolicy,
+        shift,
+        events: List[Dict[str, Any]],
+        is_holiday: bool,
+        has_leave: bool,
+    ) -> Dict[str, Any]:
+        """
+        Turn already-loaded inputs into the attendance row to upsert.
+        No database access happens here.
+        """
+        engine = AttendanceEngine(policy)
+
+        is_weekend = dt.weekday() >= 5
+        _, _, required_hours, is_night_shift, shift_id = cls._get_shift_window(shift, dt)
 
         if not events:
             status = (
@@ -254,7 +308,7 @@ class AttendanceService:
                 else "absent"
             )
 
-            return AttendanceDB.upsert_full_attendance({
+            return {
                 "employee_id": employee_id,
                 "shift_id": shift_id,
                 "date": dt,
@@ -275,7 +329,7 @@ class AttendanceService:
                 "status": status,
                 "is_payroll_locked": False,
                 "locked_at": None,
-            })
+            }
 
         work_sec, break_sec, check_in, check_out = engine.compute_work_and_breaks(events)
 
@@ -303,7 +357,7 @@ class AttendanceService:
 
         status = engine.decide_status(net_hours, required_hours)
 
-        return AttendanceDB.upsert_full_attendance({
+        return {
             "employee_id": employee_id,
             "shift_id": shift_id,
             "date": dt,
@@ -324,7 +378,7 @@ class AttendanceService:
             "status": status,
             "is_payroll_locked": False,
             "locked_at": None,
-        })
+        }
 
     # =====================================================
     # SHIFT WINDOW
@@ -0,0 +1,172 @@
+from typing import Any, Dict, List, Optional
+
+from app.database.connection import use_connection
+from app.database.employee_db import EmployeeDB
+from app.database.payroll import PayrollDB, PayrollPolicyDB
+from app.database.payroll_dirty import PayrollDirtyDB
+from app.database.salary import SalaryDB
+from app.services.payroll_service import PayrollService
+from app.services.payroll_vectorized import VectorizedPayrollCalculator
+
+
+class BulkPayrollService:
+    """
+    Set-based payroll for a whole month.
+
+    Same rules and per-employee results as calling
+    PayrollService.generate_for_employee in a loop, but with a fixed
+    number of queries regardless of head count:
+
+        1 policy · 1 active employees · 1 salary structures (in-memory index)
+        1 attendance GROUP BY · ⌈N / page_size⌉ multi-row upserts
+        1 attendance lock write (one exception row per computed employee)
+
+    all inside one connection and transaction. The arithmetic runs once
+    for the whole batch in VectorizedPayrollCalculator.
+    """
+
+    @classmethod
+    def generate(cls, year: int, month: int, employee_ids: Optional[List[int]] = None,
+                 conn=None, policy=None, lock_attendance: bool = True) -> List[Dict[str, Any]]:
+        """
+        lock_attendance=False writes payroll only; the caller locks
+        lockable(results) itself (ParallelPayrollService, once per month).
+        """
+
+        first_day, last_day = PayrollService._get_month_range(year, month)
+
+        with use_connection(conn) as conn:
+            if employee_ids is None:
+                employee_ids = EmployeeDB.get_active_ids(conn=conn)
+            if not employee_ids:
+                return []
+
+            # Batched callers (runs, partitions) pass the policy they pinned
+            policy = policy or PayrollPolicyDB.get_active_policy(conn=conn)
+            if not policy:
+                return cls._all_failed(employee_ids, "No active payroll policy found")
+
+            # Every structure overlapping the month in one query, then bisect per employee
+            salaries_index = SalaryDB.load_index(employee_ids, first_day, last_day, conn=conn)
+            salary_inputs = salaries_index.inputs_for(employee_ids, first_day)
+            summaries = PayrollService.get_attendance_summaries(
+                employee_ids, first_day, last_day, conn=conn
+            )
+
+            # -------------------------------------------------
+            # Salary resolution (per employee errors collected),
+            # then one vectorized pass for every payroll component
+            # -------------------------------------------------
+            results: Dict[int, Dict[str, Any]] = {}
+            computed = []
+            salaries = []
+
+            for emp_id in employee_ids:
+                try:
+                    inputs = salary_inputs.get(emp_id) or {"structure": None, "base_salary": None}
+                    salaries.append(PayrollService.resolve_salary(
+                        emp_id, inputs["structure"], inputs["base_salary"]
+                    ))
+                except Exception as e:
+                    results[emp_id] = {"employee_id": emp_id, "status": "failed", "error": str(e)}
+                    continue
+                computed.append(emp_id)
+
+            to_write = []
+            to_lock = []
+
+            if computed:
+                cols = VectorizedPayrollCalculator.columns(
+                    salaries, [summaries[emp_id] for emp_id in computed]
+                )
+                out = VectorizedPayrollCalculator.calculate(policy, cols)
+                to_write = list(zip(computed, VectorizedPayrollCalculator.rows(out)))
+                # Attendance is locked only when there were working days
+                to_lock = [emp_id for emp_id, worked in zip(computed, out["worked"]) if worked]
+
+            # -------------------------------------------------
+            # One multi-row upsert + one attendance lock write
+            # -------------------------------------------------
+            try:
+                cls._write(conn, year, month, to_write, to_lock if lock_attendance else None, results)
+            except Exception as e:
+                for emp_id, _ in to_write:
+                    results[emp_id] = {"employee_id": emp_id, "status": "failed", "error": str(e)}
+
+            # Structure revised inside the month: flag it so it can be prorated
+            for emp_id, segments in salaries_index.mid_period_revisions(
+                    first_day, last_day, computed).items():
+                if results[emp_id]["status"] == "success":
+                    results[emp_id]["salary_revisions"] = [
+                        {k: seg[k] for k in ("from", "to", "days", "structure_id")}
+                        for seg in segments
+                    ]
+
+        return [results[emp_id] for emp_id in employee_ids]
+
+    @classmethod
+    def regenerate_dirty(cls, year: int, month: int, conn=None) -> Dict[str, Any]:
+        """
+        Incremental regeneration: recompute only employees marked dirty
+        for the month (plus active employees with no payroll row yet)
+        and clear their marks in the same transaction. Employees that
+        fail stay dirty for the next run.
+        """
+        with use_connection(conn) as conn:
+            dirty = PayrollDirtyDB.take(year, month, conn=conn)
+            missing = PayrollDirtyDB.get_missing(year, month, conn=conn)
+
+            employee_ids = sorted(set(dirty) | set(missing))
+            results = cls.generate(year, month, employee_ids=employee_ids, conn=conn) \
+                if employee_ids else []
+
+            for r in results:
+                if r["status"] != "success":
+                    PayrollDirtyDB.mark(r["employee_id"], year, month, "retry", conn=conn)
+
+        return {
+            "year": year,
+            "month": month,
+            "dirty": len(dirty),
+            "missing": len(missing),
+            "results": results,
+        }
+
+    @staticmethod
+    def _write(conn, year: int, month: int, to_write, to_lock, results):
+        cur = conn.cursor()
+        # A failed batch must not poison the caller's transaction
+        cur.execute("SAVEPOINT bulk_payroll;")
+        try:
+            written = PayrollDB.bulk_upsert_payroll(year, month, to_write, conn=conn)
+            if to_lock is not None:
+                # Only the employees computed here, never the calendar month
+                PayrollDB.lock_attendance_month(year, month, to_lock, conn=conn)
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT bulk_payroll;")
+            cur.close()
+            raise
+        cur.execute("RELEASE SAVEPOINT bulk_payroll;")
+        cur.close()
+
+        for emp_id, _ in to_write:
+            results[emp_id] = {
+                "employee_id": emp_id,
+                "status": "success",
+                "payroll": written.get(emp_id),
+            }
+
+    @staticmethod
+    def lockable(results) -> List[int]:
+        """Employees whose attendance a run locks: written, with working days."""
+        return [
+            r["employee_id"] for r in results
+            if r["status"] == "success" and r.get("payroll") and r["payroll"]["working_days"]
+        ]
+
+    @staticmethod
+    def _all_failed(employee_ids, error: str):
+        return [
+            {"employee_id": emp_id, "status": "failed", "error": error}
+            for emp_id in employee_ids
+        ]
@@ -0,0 +1,214 @@
+import csv
+import multiprocessing
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, Mapping
+
+from app.database.streaming import iter_rows
+from app.services.payslip_pdf import render_payslip
+
+# Processes rendering payslip PDFs (1 = render in the streaming thread)
+PAYSLIP_WORKERS = int(os.getenv("HRMS_PAYSLIP_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# Payslips rendered ahead of the zip writer, per worker
+PAYSLIP_PREFETCH = int(os.getenv("HRMS_PAYSLIP_PREFETCH", "8"))
+
+EXPORT_SQL = """
+    SELECT
+        p.*,
+        e.first_name,
+        e.last_name,
+        e.email,
+        e.designation,
+        e.department,
+        e.bank_account_holder,
+        e.bank_account_number,
+        e.bank_ifsc
+    FROM payroll p
+    JOIN employees e ON e.employee_id = p.employee_id
+    WHERE p.year = %s AND p.month = %s
+    ORDER BY p.employee_id;
+"""
+
+BANK_TRANSFER_COLUMNS = ("employee_id", "account_holder", "account_number", "ifsc", "amount", "reference")
+
+SUMMARY_COLUMNS = (
+    "employee_id", "name", "department", "designation",
+    "working_days", "present_days", "lop_days",
+    "gross_salary", "overtime_pay", "holiday_pay", "night_shift_allowance",
+    "lop_deduction", "net_salary", "is_finalized", "bank_details",
+)
+
+# Summed into the summary's TOTAL line
+SUMMARY_TOTALS = (
+    "gross_salary", "overtime_pay", "holiday_pay", "night_shift_allowance",
+    "lop_deduction", "net_salary",
+)
+
+
+class _Echo:
+    """csv.writer target that hands each rendered line straight back."""
+
+    def write(self, value):
+        return value
+
+
+class _ZipSink:
+    """
+    Unseekable file for zipfile.ZipFile: collects written bytes until the
+    generator drains them, so the archive streams in constant memory.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _name(row: Mapping[str, Any]) -> str:
+    return " ".join(p for p in (row["first_name"], row["last_name"]) if p)
+
+
+def _money(value) -> str:
+    return f"{float(value or 0):.2f}"
+
+
+class PayrollExportService:
+    """
+    Month-end exports streamed from one server-side cursor over
+    payroll JOIN employees (EXPORT_SQL): only a cursor page and the
+    payslips currently being rendered are held in memory.
+
+        payslips_zip         one PDF per employee, zipped
+        bank_transfer_csv    payable employees with bank details
+        summary_csv          one line per employee plus a TOTAL line
+    """
+
+    @staticmethod
+    def iter_payroll(year: int, month: int):
+        return iter_rows(EXPORT_SQL, (year, month))
+
+    # ============================================================
+    # ✅ PAYSLIPS (ZIP OF PDFs)
+    # ============================================================
+
+    @classmethod
+    def payslips_zip(cls, year: int, month: int, workers: int = None) -> Iterator[bytes]:
+        return cls._zip_payslips(cls.iter_payroll(year, month), workers or PAYSLIP_WORKERS)
+
+    @staticmethod
+    def payslip_filename(row: Mapping[str, Any]) -> str:
+        return f"payslip_{row['year']}_{row['month']:02d}_{row['employee_id']}.pdf"
+
+    @classmethod
+    def _zip_payslips(cls, rows, workers: int) -> Iterator[bytes]:
+        sink = _ZipSink()
+        pool = None
+        try:
+            with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                if workers > 1:
+                    # spawn: workers must not inherit the API's DB sockets / threads
+                    pool = ProcessPoolExecutor(
+                        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                    rendered = cls._render_parallel(pool, rows, workers * PAYSLIP_PREFETCH)
+                else:
+                    rendered = ((row, render_payslip(row)) for row in rows)
+
+                for row, pdf in rendered:
+                    archive.writestr(cls.payslip_filename(row), pdf)
+                    yield sink.drain()
+
+            # Central directory
+            yield sink.drain()
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _render_parallel(pool, rows, window: int):
+        """Keep `window` renders in flight; yield (row, pdf) in cursor order."""
+        pending = deque()
+        for row in rows:
+            pending.append((row, pool.submit(render_payslip, row)))
+            if len(pending) >= window:
+                row, future = pending.popleft()
+                yield row, future.result()
+        while pending:
+            row, future = pending.popleft()
+            yield row, future.result()
+
+    # ============================================================
+    # ✅ BANK TRANSFER CSV
+    # ============================================================
+
+    @classmethod
+    def bank_transfer_csv(cls, year: int, month: int) -> Iterator[str]:
+        return cls._bank_transfer_lines(cls.iter_payroll(year, month))
+
+    @staticmethod
+    def _bank_transfer_lines(rows) -> Iterator[str]:
+        writer = csv.writer(_Echo())
+        yield writer.writerow(BANK_TRANSFER_COLUMNS)
+
+        for row in rows:
+            # Nothing to pay, or nowhere to pay it (flagged in the summary)
+            if not row["net_salary"] or row["net_salary"] <= 0 or not row["bank_account_number"]:
+                continue
+            yield writer.writerow((
+                row["employee_id"],
+                row["bank_account_holder"] or _name(row),
+                row["bank_account_number"],
+                row["bank_ifsc"] or "",
+                _money(row["net_salary"]),
+                f"SAL-{row['year']}-{row['month']:02d}-{row['employee_id']}",
+            ))
+
+    # ============================================================
+    # ✅ SUMMARY CSV
+    # ============================================================
+
+    @classmethod
+    def summary_csv(cls, year: int, month: int) -> Iterator[str]:
+        return cls._summary_lines(cls.iter_payroll(year, month))
+
+    @staticmethod
+    def _summary_lines(rows) -> Iterator[str]:
+        writer = csv.writer(_Echo())
+        yield writer.writerow(SUMMARY_COLUMNS)
+
+        totals: Dict[str, float] = dict.fromkeys(SUMMARY_TOTALS, 0.0)
+        count = 0
+        for row in rows:
+            count += 1
+            for key in SUMMARY_TOTALS:
+                totals[key] += float(row[key] or 0)
+
+            yield writer.writerow((
+                row["employee_id"],
+                _name(row),
+                row["department"] or "",
+                row["designation"] or "",
+                row["working_days"] or 0,
+                row["present_days"] or 0,
+                row["lop_days"] or 0,
+                *(_money(row[key]) for key in SUMMARY_TOTALS),
+                "yes" if row["is_finalized"] else "no",
+                "ok" if row["bank_account_number"] else "missing",
+            ))
+
+        yield writer.writerow((
+            "TOTAL", f"{count} employees", "", "", "", "", "",
+            *(_money(totals[key]) for key in SUMMARY_TOTALS), "", "",
+        ))
@@ -0,0 +1,197 @@
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.database.connection import configure_pool, db_connection
+from app.database.employee_db import EmployeeDB
+from app.database.payroll import PayrollDB, PayrollPolicyDB
+from app.database.query_stats import track_queries
+from app.services.payroll_bulk_service import BulkPayrollService
+
+# Worker processes for a parallel month run (default: one per core)
+PARALLEL_WORKERS = int(os.getenv("HRMS_PAYROLL_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# "range" → contiguous employee_id ranges, "department" → one partition per department
+PARTITION_BY = os.getenv("HRMS_PAYROLL_PARTITION_BY", "range")
+
+PARTITION_STRATEGIES = ("range", "department")
+
+
+# ============================================================
+# ✅ PARTITIONING (deterministic)
+# ============================================================
+
+def partition_by_range(employee_ids: Sequence[int], partitions: int) -> List[List[int]]:
+    """Split sorted ids into at most `partitions` contiguous, equal-sized ranges."""
+    ids = sorted(employee_ids)
+    if not ids:
+        return []
+    size = math.ceil(len(ids) / max(1, partitions))
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def partition_by_department(rows: Sequence[Tuple[int, Optional[str]]]) -> List[List[int]]:
+    """One partition per department (NULL department grouped together), sorted by name."""
+    groups: Dict[str, List[int]] = {}
+    for employee_id, department in rows:
+        groups.setdefault(department or "", []).append(employee_id)
+    return [sorted(groups[name]) for name in sorted(groups)]
+
+
+# ============================================================
+# ✅ WORKER PROCESS
+# ============================================================
+
+def _init_worker():
+    # Fresh process: its own small pool, never a socket shared with the parent
+    configure_pool(minconn=1, maxconn=2)
+
+
+def _run_partition(year: int, month: int, employee_ids: List[int], policy: dict) -> Dict[str, Any]:
+    started = time.perf_counter()
+
+    # One transaction per partition, same engine and policy version as serial
+    # mode; attendance is locked by the parent once every partition succeeded
+    with track_queries("payroll partition") as stats, db_connection() as conn:
+        results = BulkPayrollService.generate(
+            year, month, employee_ids=employee_ids, conn=conn, policy=policy,
+            lock_attendance=False,
+        )
+
+    for r in results:
+        if r.get("payroll") is not None:
+            # RealDictRow → plain dict so it pickles back to the parent
+            r["payroll"] = dict(r["payroll"])
+
+    return {
+        "results": results,
+        "seconds": round(time.perf_counter() - started, 3),
+        "queries": stats.count,
+    }
+
+
+# ============================================================
+# ✅ PARALLEL PAYROLL SERVICE
+# ============================================================
+
+class ParallelPayrollService:
+    """
+    BulkPayrollService fanned out over a ProcessPoolExecutor.
+
+    The active employees are split into deterministic partitions; each
+    worker process computes and commits its partition's payroll with its
+    own pooled connection. Results are merged back in employee_id order,
+    so the report lists exactly what serial mode (workers=1) returns, and
+    once every partition succeeded the parent locks the computed
+    employees' attendance in one write, the same rows serial mode locks.
+    """
+
+    @staticmethod
+    def plan(partition_by: str = PARTITION_BY, workers: int = PARALLEL_WORKERS,
+             conn=None) -> List[List[int]]:
+        if partition_by not in PARTITION_STRATEGIES:
+            raise ValueError(f"partition_by must be one of {PARTITION_STRATEGIES}")
+
+        if partition_by == "department":
+            return partition_by_department(EmployeeDB.get_active_departments(conn=conn))
+        return partition_by_range(EmployeeDB.get_active_ids(conn=conn), workers)
+
+    @classmethod
+    def generate(cls, year: int, month: int, workers: int = None,
+                 partition_by: str = None) -> Dict[str, Any]:
+
+        workers = max(1, workers or PARALLEL_WORKERS)
+        partition_by = partition_by or PARTITION_BY
+        started = time.perf_counter()
+
+        # Read once here; every partition computes with this version
+        policy = PayrollPolicyDB.get_active_policy()
+        if not policy:
+            raise ValueError("No active payroll policy found")
+
+        partitions = cls.plan(partition_by, workers)
+
+        if workers == 1 or len(partitions) <= 1:
+            outcomes = [_run_partition(year, month, part, policy) for part in partitions]
+        else:
+            # spawn: children must not inherit the parent's open DB sockets
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(partitions)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            ) as pool:
+                futures = [
+                    pool.submit(_run_partition, year, month, part, policy) for part in partitions
+                ]
+                outcomes = [f.result() for f in futures]
+
+        # Same lock rows as a serial run, written once for the whole month
+        results = [r for outcome in outcomes for r in outcome["results"]]
+        with db_connection() as conn:
+            PayrollDB.lock_attendance_month(
+                year, month, sorted(BulkPayrollService.lockable(results)), conn=conn
+            )
+
+        report = cls._report(year, month, workers, partition_by, partitions, outcomes,
+                             time.perf_counter() - started)
+        report["policy_id"] = policy["id"]
+        return report
+
+    @staticmethod
+    def _report(year, month, workers, partition_by, partitions, outcomes, seconds):
+        results = sorted(
+            (r for outcome in outcomes for r in outcome["results"]),
+            key=lambda r: r["employee_id"],
+        )
+        succeeded = sum(1 for r in results if r["status"] == "success")
+
+        return {
+            "year": year,
+            "month": month,
+            "workers": workers,
+            "partition_by": partition_by,
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "seconds": round(seconds, 3),
+            "queries": sum(outcome.get("queries", 0) for outcome in outcomes),
+            "partitions": [
+                {
+                    "partition": i,
+                    "first_employee_id": part[0],
+                    "last_employee_id": part[-1],
+                    "employees": len(part),
+                    "failed": sum(1 for r in outcome["results"] if r["status"] != "success"),
+                    "seconds": outcome["seconds"],
+                    "queries": outcome.get("queries", 0),
+                }
+                for i, (part, outcome) in enumerate(zip(partitions, outcomes))
+            ],
+            "results": results,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a month's payroll across worker processes")
+    parser.add_argument("year", type=int)
+    parser.add_argument("month", type=int)
+    parser.add_argument("--workers", type=int, default=PARALLEL_WORKERS)
+    parser.add_argument("--partition-by", choices=PARTITION_STRATEGIES, default=PARTITION_BY)
+    args = parser.parse_args(argv)
+
+    report = ParallelPayrollService.generate(
+        args.year, args.month, workers=args.workers, partition_by=args.partition_by
+    )
+    for part in report["partitions"]:
+        print(f"partition {part['partition']}: {part['employees']} employees, "
+              f"{part['failed']} failed, {part['seconds']}s")
+    print(f"total {report['total']}, succeeded {report['succeeded']}, "
+          f"failed {report['failed']} in {report['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
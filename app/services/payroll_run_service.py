@@ -0,0 +1,266 @@
+import argparse
+import logging
+import os
+import socket
+import threading
+from typing import Any, Dict, Optional
+
+from app.database.connection import db_connection, use_connection
+from app.database.employee_db import EmployeeDB
+from app.database.payroll import PayrollLockDB, PayrollPolicyDB, start_change_listener
+from app.database.payroll_runs import PartitionLeaseLost, PayrollRunDB
+from app.services.payroll_bulk_service import BulkPayrollService
+
+logger = logging.getLogger("hrms.payroll")
+
+# Employees per checkpoint: one BulkPayrollService call + one commit
+RUN_BATCH_SIZE = int(os.getenv("HRMS_PAYROLL_RUN_BATCH", "500"))
+
+# How often an idle worker looks for open / orphaned run partitions
+RUN_POLL_SECONDS = float(os.getenv("HRMS_PAYROLL_RUN_POLL_SECONDS", "5"))
+
+# Run the in-process worker thread with the API (set to 0 when payroll
+# runs are executed by a separate `python -m app.services.payroll_run_service`)
+WORKER_ENABLED = os.getenv("HRMS_PAYROLL_WORKER_ENABLED", "1") != "0"
+
+
+def worker_identity() -> str:
+    """host:pid:thread, recorded on the partitions a worker leases."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class PayrollRunService:
+    """
+    Payroll for a whole month as a background job, shared by every worker
+    on every node.
+
+    start() only records the run, its employee list and its partitions
+    (contiguous employee_id ranges) and returns a run_id. Workers lease
+    one partition at a time (PayrollRunDB.claim_partition) and call
+    execute(), which processes the partition's pending employees in
+    batches. Each batch (lease fence + payroll upsert + attendance lock +
+    checkpoint) commits as one transaction, so every employee is written
+    exactly once per run, and a partition whose worker died is reclaimed
+    and resumes exactly where it stopped. Throughput grows with the number
+    of workers up to the number of partitions.
+    """
+
+    # ============================================================
+    # ✅ API SIDE
+    # ============================================================
+
+    @staticmethod
+    def start(year: int, month: int, conn=None) -> Dict[str, Any]:
+        with use_connection(conn) as conn:
+            # One queued / running run per period; asking again returns it
+            active = PayrollRunDB.get_active_run(year, month, conn=conn)
+            if active:
+                return active
+
+            employee_ids = EmployeeDB.get_active_ids(conn=conn)
+            return PayrollRunDB.create_run(year, month, employee_ids, conn=conn)
+
+    @staticmethod
+    def status(run_id: int) -> Optional[Dict[str, Any]]:
+        run = PayrollRunDB.get_run(run_id)
+        if not run:
+            return None
+
+        run = dict(run)
+        total = run["total_employees"] or 0
+        run["progress_pct"] = round(100.0 * run["processed"] / total, 2) if total else 100.0
+        run["partitions"] = PayrollRunDB.get_partition_summary(run_id)
+        return run
+
+    @staticmethod
+    def cancel(run_id: int):
+        return PayrollRunDB.request_cancel(run_id)
+
+    @staticmethod
+    def resume(run_id: int, retry_failed: bool = False):
+        return PayrollRunDB.reopen(run_id, retry_failed=retry_failed)
+
+    # ============================================================
+    # ✅ WORKER SIDE
+    # ============================================================
+
+    @classmethod
+    def execute(cls, lease: Dict[str, Any], batch_size: int = None,
+                stop: threading.Event = None) -> str:
+        """
+        Process a leased partition until it is done, the run is cancelled
+        or failed, or the worker is stopping. Returns how it ended:
+        "done" (more partitions left), "completed" (this finished the
+        run), "cancelled", "failed", "released" or "lost" (reclaimed by
+        another worker).
+        """
+        run_id, year, month = lease["run_id"], lease["year"], lease["month"]
+        batch_size = batch_size or RUN_BATCH_SIZE
+
+        try:
+            policy = cls._pin_policy(lease)
+            if not policy:
+                PayrollRunDB.finish(run_id, "failed", error="No active payroll policy found")
+                PayrollRunDB.release_partition(lease)
+                return "failed"
+
+            while True:
+                state = PayrollRunDB.get_run_state(run_id)
+                if state and state["cancel_requested"]:
+                    PayrollRunDB.release_partition(lease)
+                    PayrollRunDB.finish(run_id, "cancelled")
+                    return "cancelled"
+
+                if not state or state["status"] != "running":
+                    # Failed / cancelled by another worker
+                    PayrollRunDB.release_partition(lease)
+                    return "released"
+
+                if PayrollLockDB.is_locked(year, month):
+                    PayrollRunDB.release_partition(lease)
+                    PayrollRunDB.finish(run_id, "failed", error=f"Payroll is locked for {year}-{month}")
+                    return "failed"
+
+                if stop is not None and stop.is_set():
+                    # Hand it back now instead of waiting for it to go stale
+                    PayrollRunDB.release_partition(lease)
+                    return "released"
+
+                with db_connection() as conn:
+                    PayrollRunDB.fence(lease, conn)
+                    batch = PayrollRunDB.next_batch(
+                        run_id, batch_size,
+                        lease["first_employee_id"], lease["last_employee_id"], conn=conn,
+                    )
+                    if not batch:
+                        completed = PayrollRunDB.complete_partition(lease, conn)
+                        return "completed" if completed else "done"
+
+                    results = BulkPayrollService.generate(
+                        year, month, employee_ids=batch, conn=conn, policy=policy
+                    )
+                    PayrollRunDB.record_batch(run_id, results, conn=conn)
+
+        except PartitionLeaseLost as e:
+            logger.warning("payroll run %s: %s", run_id, e)
+            return "lost"
+
+        except Exception as e:
+            logger.exception("payroll run %s partition %s failed", run_id, lease["partition_no"])
+            PayrollRunDB.release_partition(lease)
+            PayrollRunDB.finish(run_id, "failed", error=str(e))
+            return "failed"
+
+    @staticmethod
+    def _pin_policy(lease: Dict[str, Any]):
+        """
+        The policy version a run computes with: the one it started with
+        (so a resumed run stays consistent), else the active policy,
+        recorded on the run. Workers racing to pin agree on the first.
+        """
+        if lease.get("policy_id"):
+            return PayrollPolicyDB.get_policy(lease["policy_id"])
+
+        policy = PayrollPolicyDB.get_active_policy()
+        if policy:
+            pinned = PayrollRunDB.set_policy(lease["run_id"], policy["id"])
+            if pinned != policy["id"]:
+                return PayrollPolicyDB.get_policy(pinned)
+        return policy
+
+    @classmethod
+    def run_pending(cls, stop: threading.Event = None, worker_id: str = None) -> int:
+        """Lease and execute partitions until none are left; returns how many."""
+        worker_id = worker_id or worker_identity()
+        done = 0
+        while not (stop is not None and stop.is_set()):
+            lease = PayrollRunDB.claim_partition(worker_id)
+            if not lease:
+                break
+            cls.execute(lease, stop=stop)
+            done += 1
+        return done
+
+
+# ============================================================
+# ✅ BACKGROUND WORKER
+# ============================================================
+
+class PayrollRunWorker(threading.Thread):
+    """Daemon thread polling payroll_runs; wake() skips the poll wait."""
+
+    def __init__(self, poll_seconds: float = RUN_POLL_SECONDS):
+        super().__init__(name="payroll-run-worker", daemon=True)
+        self.poll_seconds = poll_seconds
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self):
+        self._wake_event.set()
+
+    def stop(self, timeout: float = None):
+        self._stop_event.set()
+        self._wake_event.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                PayrollRunService.run_pending(stop=self._stop_event)
+            except Exception:
+                logger.exception("payroll run worker iteration failed")
+
+            self._wake_event.wait(self.poll_seconds)
+            self._wake_event.clear()
+
+
+_worker: Optional[PayrollRunWorker] = None
+
+
+def start_worker() -> PayrollRunWorker:
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = PayrollRunWorker()
+        _worker.start()
+    return _worker
+
+
+def stop_worker(timeout: float = 30):
+    global _worker
+    if _worker is not None:
+        _worker.stop(timeout)
+        _worker = None
+
+
+def wake_worker():
+    """Nudge the in-process worker after queueing a run (no-op without one)."""
+    if _worker is not None:
+        _worker.wake()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Execute queued payroll runs (start one per node / core to scale out)"
+    )
+    parser.add_argument("--once", action="store_true",
+                        help="drain the queue and exit instead of polling")
+    parser.add_argument("--poll-seconds", type=float, default=RUN_POLL_SECONDS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    start_change_listener()
+
+    if args.once:
+        print(f"partitions executed: {PayrollRunService.run_pending()}")
+        return
+
+    worker = PayrollRunWorker(poll_seconds=args.poll_seconds)
+    worker.start()
+    try:
+        worker.join()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.database.connection import use_connection
+from app.database.employee_db import EmployeeDB
+from app.database.payroll import PayrollPolicyDB
+from app.database.salary import SalaryDB
+from app.services.payroll_service import PayrollService
+from app.services.payroll_vectorized import VectorizedPayrollCalculator
+
+# Components reported per variant (company, department and employee level)
+SIMULATED_COMPONENTS = (
+    "gross_salary",
+    "net_salary",
+    "overtime_pay",
+    "lop_deduction",
+    "holiday_pay",
+    "night_shift_allowance",
+)
+
+# Policy fields a variant may override
+SIMULATION_POLICY_FIELDS = (
+    "late_grace_minutes",
+    "late_lop_threshold_minutes",
+    "early_exit_grace_minutes",
+    "early_exit_lop_threshold_minutes",
+    "overtime_enabled",
+    "overtime_multiplier",
+    "holiday_double_pay",
+    "weekend_paid_only_if_worked",
+    "night_shift_allowance",
+)
+
+
+# =========================================================
+# IN-MEMORY SNAPSHOT
+# =========================================================
+@dataclass
+class PayrollSnapshot:
+    year: int
+    month: int
+    policy: dict
+    employee_ids: List[int]
+    departments: np.ndarray          # department name per employee ("" = none)
+    columns: Dict[str, np.ndarray]   # VectorizedPayrollCalculator input columns
+    skipped: List[Dict[str, Any]]    # employees without salary data
+
+
+class PayrollSimulationService:
+    """
+    What-if payroll: evaluate candidate policies against the current one
+    for a whole period without writing anything.
+
+    The snapshot (active employees, salary inputs, attendance summaries)
+    is loaded once; every variant is one VectorizedPayrollCalculator pass
+    over the same arrays.
+    """
+
+    @staticmethod
+    def load_snapshot(year: int, month: int, conn=None) -> PayrollSnapshot:
+        first_day, last_day = PayrollService._get_month_range(year, month)
+
+        with use_connection(conn) as conn:
+            policy = PayrollPolicyDB.get_active_policy()
+            if not policy:
+                raise ValueError("No active payroll policy found")
+
+            employees = EmployeeDB.get_active_departments(conn=conn)
+            all_ids = [emp_id for emp_id, _ in employees]
+
+            salary_inputs = SalaryDB.get_salary_inputs_for_date(all_ids, first_day, conn=conn) \
+                if all_ids else {}
+            summaries = PayrollService.get_attendance_summaries(all_ids, first_day, last_day, conn=conn) \
+                if all_ids else {}
+
+        employee_ids, departments, salaries, skipped = [], [], [], []
+        for emp_id, department in employees:
+            inputs = salary_inputs.get(emp_id) or {"structure": None, "base_salary": None}
+            try:
+                salaries.append(PayrollService.resolve_salary(
+                    emp_id, inputs["structure"], inputs["base_salary"]
+                ))
+            except ValueError as e:
+                skipped.append({"employee_id": emp_id, "error": str(e)})
+                continue
+            employee_ids.append(emp_id)
+            departments.append(department or "")
+
+        columns = VectorizedPayrollCalculator.columns(
+            salaries, [summaries[emp_id] for emp_id in employee_ids]
+        )
+
+        return PayrollSnapshot(
+            year=year,
+            month=month,
+            policy=dict(policy),
+            employee_ids=employee_ids,
+            departments=np.array(departments, dtype=object),
+            columns=columns,
+            skipped=skipped,
+        )
+
+    # ---------------------------------------------------------
+    @classmethod
+    def simulate(cls, year: int, month: int, variants: List[Dict[str, Any]],
+                 include_employees: bool = True, conn=None) -> Dict[str, Any]:
+        snapshot = cls.load_snapshot(year, month, conn=conn)
+        return cls.evaluate(snapshot, variants, include_employees=include_employees)
+
+    @classmethod
+    def evaluate(cls, snapshot: PayrollSnapshot, variants: List[Dict[str, Any]],
+                 include_employees: bool = True) -> Dict[str, Any]:
+
+        baseline = VectorizedPayrollCalculator.calculate(snapshot.policy, snapshot.columns)
+
+        # Department grouping is shared by every variant
+        dept_names, dept_index = np.unique(snapshot.departments.astype(str), return_inverse=True) \
+            if snapshot.employee_ids else (np.array([]), np.array([], dtype=int))
+
+        results = []
+        for i, variant in enumerate(variants):
+            overrides = {k: v for k, v in variant.items()
+                         if k in SIMULATION_POLICY_FIELDS and v is not None}
+            policy = dict(snapshot.policy, **overrides)
+            candidate = VectorizedPayrollCalculator.calculate(policy, snapshot.columns)
+
+            results.append({
+                "name": variant.get("name") or f"variant_{i + 1}",
+                "overrides": overrides,
+                "totals": cls._totals(baseline, candidate),
+                "departments": cls._departments(baseline, candidate, dept_names, dept_index),
+                "employees": cls._employees(snapshot, baseline, candidate)
+                if include_employees else None,
+            })
+
+        return {
+            "year": snapshot.year,
+            "month": snapshot.month,
+            "employees": len(snapshot.employee_ids),
+            "skipped": snapshot.skipped,
+            "current_policy_id": snapshot.policy.get("id"),
+            "variants": results,
+        }
+
+    # ---------------------------------------------------------
+    @staticmethod
+    def _totals(baseline, candidate) -> Dict[str, Dict[str, float]]:
+        totals = {}
+        for name in SIMULATED_COMPONENTS:
+            old = float(baseline[name].sum())
+            new = float(candidate[name].sum())
+            totals[name] = {"old": round(old, 2), "new": round(new, 2), "delta": round(new - old, 2)}
+        return totals
+
+    @staticmethod
+    def _departments(baseline, candidate, names, index) -> List[Dict[str, Any]]:
+        if not len(names):
+            return []
+
+        counts = np.bincount(index, minlength=len(names))
+        sums = {
+            name: (
+                np.bincount(index, weights=baseline[name], minlength=len(names)),
+                np.bincount(index, weights=candidate[name], minlength=len(names)),
+            )
+            for name in SIMULATED_COMPONENTS
+        }
+
+        departments = []
+        for d, dept in enumerate(names.tolist()):
+            row = {"department": dept or None, "employees": int(counts[d])}
+            for name, (old, new) in sums.items():
+                row[name] = {
+                    "old": round(float(old[d]), 2),
+                    "new": round(float(new[d]), 2),
+                    "delta": round(float(new[d] - old[d]), 2),
+                }
+            departments.append(row)
+        return departments
+
+    @staticmethod
+    def _employees(snapshot, baseline, candidate) -> List[Dict[str, Any]]:
+        old_net = baseline["net_salary"].tolist()
+        new_net = candidate["net_salary"].tolist()
+
+        return [
+            {
+                "employee_id": emp_id,
+                "department": dept or None,
+                "old_net_salary": round(old, 2),
+                "new_net_salary": round(new, 2),
+                "delta": round(new - old, 2),
+            }
+            for emp_id, dept, old, new in zip(
+                snapshot.employee_ids, snapshot.departments.tolist(), old_net, new_net
+            )
+        ]
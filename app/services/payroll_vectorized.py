@@ -0,0 +1,159 @@
+from typing import Any, Dict, Iterator, List, Sequence
+
+import numpy as np
+
+
+# Attendance summary columns (PayrollService.SUMMARY_COLUMNS) and the
+# resolved salary components the kernel takes as arrays
+SUMMARY_FIELDS = (
+    "working_days",
+    "paid_days",
+    "lop_days_from_absent",
+    "total_net_hours",
+    "total_late_minutes",
+    "total_early_minutes",
+    "total_overtime_minutes",
+    "holiday_count",
+    "night_shift_days",
+)
+SALARY_FIELDS = ("basic", "hra", "allowances", "deductions")
+
+# Columns stored as integers in the scalar path
+INT_OUTPUTS = ("working_days", "present_days")
+
+
+class VectorizedPayrollCalculator:
+    """
+    PayrollService.calculate over whole columns at once.
+
+    Every component is computed with the same float64 operations in the
+    same order as the scalar path, so each element is bit-for-bit what
+    PayrollService.calculate returns for that employee:
+
+        cols = VectorizedPayrollCalculator.columns(salaries, summaries)
+        out = VectorizedPayrollCalculator.calculate(policy, cols)
+        out["net_salary"]          # ndarray, one value per employee
+    """
+
+    # ============================================================
+    # ✅ INPUT COLUMNS
+    # ============================================================
+
+    @staticmethod
+    def columns(salaries: Sequence[Dict[str, float]],
+                summaries: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Row dicts (resolve_salary / _summary_from_row shape) → float64 columns."""
+        cols = {
+            name: np.fromiter((s[name] for s in summaries), dtype=np.float64, count=len(summaries))
+            for name in SUMMARY_FIELDS
+        }
+        for name in SALARY_FIELDS:
+            cols[name] = np.fromiter((s[name] for s in salaries), dtype=np.float64, count=len(salaries))
+        return cols
+
+    # ============================================================
+    # ✅ KERNEL
+    # ============================================================
+
+    @staticmethod
+    def calculate(policy, cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        late_grace = int(policy["late_grace_minutes"])
+        late_lop_threshold = int(policy["late_lop_threshold_minutes"])
+        early_grace = int(policy["early_exit_grace_minutes"])
+        overtime_enabled = bool(policy["overtime_enabled"])
+        overtime_multiplier = float(policy["overtime_multiplier"])
+        holiday_double_pay = bool(policy["holiday_double_pay"])
+        night_shift_allowance = float(policy["night_shift_allowance"])
+
+        basic = cols["basic"]
+        hra = cols["hra"]
+        allowances = cols["allowances"]
+        fixed_deductions = cols["deductions"]
+
+        working_days = cols["working_days"]
+        worked = working_days > 0
+        zero = np.zeros_like(working_days)
+
+        gross_monthly = basic + hra + allowances
+
+        # Zero working days → divide by 1 and mask the result out below
+        safe_days = np.where(worked, working_days, 1.0)
+        per_day_salary = gross_monthly / safe_days
+
+        # ---------------------------------------------------------
+        # LATE + EARLY EXIT → LOP
+        # ---------------------------------------------------------
+        late_over = np.maximum(0.0, cols["total_late_minutes"] - late_grace)
+        early_over = np.maximum(0.0, cols["total_early_minutes"] - early_grace)
+
+        extra_lop_days = np.where(late_over + early_over >= late_lop_threshold, 0.5, 0.0)
+        total_lop_days = cols["lop_days_from_absent"] + extra_lop_days
+        lop_amount = total_lop_days * per_day_salary
+
+        # ---------------------------------------------------------
+        # OVERTIME / HOLIDAY / NIGHT SHIFT
+        # ---------------------------------------------------------
+        if overtime_enabled:
+            overtime_hours = cols["total_overtime_minutes"] / 60.0
+            hourly_rate = gross_monthly / (safe_days * 8.0)
+            overtime_pay = overtime_hours * hourly_rate * overtime_multiplier
+        else:
+            overtime_hours = zero
+            overtime_pay = zero
+
+        holiday_pay = cols["holiday_count"] * per_day_salary if holiday_double_pay else zero
+        night_shift_bonus = cols["night_shift_days"] * night_shift_allowance
+
+        net_salary = (
+            gross_monthly
+            - fixed_deductions
+            - lop_amount
+            + overtime_pay
+            + holiday_pay
+            + night_shift_bonus
+        )
+
+        def paid(values):
+            return np.where(worked, values, 0.0)
+
+        return {
+            "working_days": paid(working_days),
+            "present_days": paid(cols["paid_days"]),
+            "total_hours": paid(cols["total_net_hours"]),
+            "gross_salary": gross_monthly,
+            "net_salary": paid(net_salary),
+            "basic_pay": basic,
+            "hra_pay": hra,
+            "allowances_pay": allowances,
+            "overtime_hours": paid(overtime_hours),
+            "overtime_pay": paid(overtime_pay),
+            "lop_days": paid(total_lop_days),
+            "lop_deduction": paid(lop_amount),
+            "late_penalty": paid(late_over),
+            "early_penalty": paid(early_over),
+            "holiday_pay": paid(holiday_pay),
+            "night_shift_allowance": paid(night_shift_bonus),
+            "worked": worked,
+        }
+
+    # ============================================================
+    # ✅ OUTPUT ROWS
+    # ============================================================
+
+    @staticmethod
+    def rows(out: Dict[str, np.ndarray]) -> Iterator[Dict[str, Any]]:
+        """
+        Per-employee upsert_payroll fields as plain Python values
+        (psycopg2 cannot adapt numpy ints / bools).
+        """
+        lists: Dict[str, List] = {
+            name: values.tolist() for name, values in out.items() if name != "worked"
+        }
+        for name in INT_OUTPUTS:
+            lists[name] = [int(v) for v in lists[name]]
+
+        names = list(lists)
+        for values in zip(*(lists[n] for n in names)):
+            fields = dict(zip(names, values))
+            fields["is_finalized"] = False
+            yield fields
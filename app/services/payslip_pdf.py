@@ -0,0 +1,100 @@
+import calendar
+from typing import Any, List, Mapping, Tuple
+
+# A4 portrait, points
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+
+EARNINGS = (
+    ("Basic", "basic_pay"),
+    ("HRA", "hra_pay"),
+    ("Allowances", "allowances_pay"),
+    ("Overtime", "overtime_pay"),
+    ("Holiday pay", "holiday_pay"),
+    ("Night shift allowance", "night_shift_allowance"),
+)
+
+ATTENDANCE = (
+    ("Working days", "working_days"),
+    ("Paid days", "present_days"),
+    ("LOP days", "lop_days"),
+    ("Overtime hours", "overtime_hours"),
+)
+
+
+def _amount(value) -> str:
+    return f"{float(value or 0):,.2f}"
+
+
+def _escape(text: str) -> str:
+    # PDF literal string; the standard fonts only cover Latin-1
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def payslip_lines(row: Mapping[str, Any]) -> List[Tuple[str, str, bool]]:
+    """(label, value, bold) lines of one payslip, top to bottom."""
+    name = " ".join(p for p in (row.get("first_name"), row.get("last_name")) if p)
+    lines = [
+        (f"Payslip - {calendar.month_name[row['month']]} {row['year']}", "", True),
+        ("", "", False),
+        ("Employee", f"{name} (#{row['employee_id']})", False),
+        ("Designation", row.get("designation") or "-", False),
+        ("Department", row.get("department") or "-", False),
+        ("", "", False),
+        ("Attendance", "", True),
+    ]
+    lines += [(label, str(row.get(key) or 0), False) for label, key in ATTENDANCE]
+    lines += [("", "", False), ("Earnings", "", True)]
+    lines += [(label, _amount(row.get(key)), False) for label, key in EARNINGS]
+    lines += [
+        ("Gross salary", _amount(row.get("gross_salary")), True),
+        ("", "", False),
+        ("Deductions", "", True),
+        ("Loss of pay", _amount(row.get("lop_deduction")), False),
+        ("", "", False),
+        ("Net salary", _amount(row.get("net_salary")), True),
+    ]
+    return lines
+
+
+def render_payslip(row: Mapping[str, Any]) -> bytes:
+    """
+    One-page payslip PDF. Hand-written PDF 1.4 with the built-in
+    Helvetica fonts, so rendering needs no third-party library and runs
+    in any worker process.
+    """
+    ops = []
+    y = PAGE_HEIGHT - 72
+    for i, (label, value, bold) in enumerate(payslip_lines(row)):
+        font = "/F2" if bold else "/F1"
+        size = 14 if i == 0 else 10          # title
+        if label:
+            ops.append(f"BT {font} {size} Tf 60 {y} Td ({_escape(label)}) Tj ET")
+        if value:
+            ops.append(f"BT {font} {size} Tf 330 {y} Td ({_escape(value)}) Tj ET")
+        y -= size + 6
+    content = "\n".join(ops).encode("latin-1")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+        b"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>"
+        % (PAGE_WIDTH, PAGE_HEIGHT),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+    ]
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
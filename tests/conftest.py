@@ -9,7 +9,8 @@ import psycopg2
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from app.api.main import app
-from app.database.connection import get_connection
+from app.database.connection import get_connection, close_pool
+from app.database.payroll import AttendanceLockDB, PayrollPolicyDB
 
 @pytest.fixture
 def mock_db_connection(monkeypatch):
@@ -30,7 +31,25 @@ def mock_db_connection(monkeypatch):
         return mock_conn
 
     monkeypatch.setattr("psycopg2.connect", mock_get_connection)
-    return mock_conn, mock_cursor
+
+    # Attendance is unlocked unless a test says otherwise (the generic
+    # cursor mock cannot answer the period lock lookup)
+    unlocked = {"period_locked": False, "exceptions": {}}
+    monkeypatch.setattr(AttendanceLockDB, "get_state",
+                        classmethod(lambda cls, year, month, conn=None: unlocked))
+
+    async def get_state_async(cls, conn, year, month):
+        return unlocked
+    monkeypatch.setattr(AttendanceLockDB, "get_state_async", classmethod(get_state_async))
+
+    # Start every test with an empty pool so it hands out this test's mock
+    close_pool()
+    PayrollPolicyDB.invalidate()
+    AttendanceLockDB.invalidate()
+    yield mock_conn, mock_cursor
+    close_pool()
+    PayrollPolicyDB.invalidate()
+    AttendanceLockDB.invalidate()
 
 @pytest.fixture
 def client(mock_db_connection):
@@ -0,0 +1,51 @@
+from datetime import date, datetime
+from unittest.mock import patch
+
+import pytest
+
+from app.services import analytics_export_service
+from app.services.analytics_export_service import AnalyticsExportService, export_sql
+
+
+def test_export_sql_ranges_on_partition_keys():
+    sql, params = export_sql("attendance", (2024, 11), (2025, 1))
+    assert "date >= %s AND date < %s" in sql
+    assert params == (date(2024, 11, 1), date(2025, 2, 1))
+
+    sql, params = export_sql("payroll", (2024, 11), (2025, 1))
+    assert "(year, month) BETWEEN (%s, %s) AND (%s, %s)" in sql
+    assert params == (2024, 11, 2025, 1)
+    assert sql.startswith("SELECT payroll_id, employee_id, year, month, working_days")
+
+
+def test_export_route_validates_and_reports_missing_pyarrow(client, monkeypatch):
+    assert client.get("/hrms/analytics/export/employees?from=2025-01").status_code == 404
+    assert client.get("/hrms/analytics/export/payroll?from=2025-13").status_code == 422
+    assert client.get("/hrms/analytics/export/payroll?from=2025-03&to=2025-01").status_code == 400
+
+    monkeypatch.setattr(analytics_export_service, "pa", None)
+    response = client.get("/hrms/analytics/export/payroll?from=2025-01")
+    assert response.status_code == 503
+    assert "pyarrow" in response.json()["detail"]
+
+
+def test_attendance_events_round_trip_through_parquet():
+    pa = pytest.importorskip("pyarrow")
+    import io
+    import pyarrow.parquet as pq
+
+    rows = [
+        {"event_id": i, "employee_id": i % 3, "event_type": "check_in" if i % 2 else "check_out",
+         "event_time": datetime(2025, 1, 2, 9, i), "source": "face", "meta": {"score": 0.9} if i == 1 else None}
+        for i in range(5)
+    ]
+    with patch("app.services.analytics_export_service.iter_rows", return_value=iter(rows)), \
+         patch("app.services.analytics_export_service.EXPORT_BATCH_ROWS", 2):
+        data = b"".join(AnalyticsExportService.stream("attendance_events", (2025, 1), (2025, 1)))
+
+    table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == 5
+    assert pa.types.is_dictionary(table.schema.field("event_type").type)
+    assert table.column("meta").to_pylist()[1] == '{"score": 0.9}'
+    # One row group per batch, written as the rows streamed in
+    assert pq.ParquetFile(io.BytesIO(data)).num_row_groups == 3
@@ -1,14 +1,19 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, MagicMock, patch
 from datetime import date
 
+from app.database.payroll import AttendanceLockDB
+
+# Captured before conftest stubs it per test
+_REAL_LOCK_STATE = AttendanceLockDB.__dict__["get_state"]
+
 def test_check_in(client):
     with patch("app.services.attendence_services.AttendanceService.check_in") as mock_check_in:
         mock_check_in.return_value = {"status": "checked_in"}
         response = client.post("/hrms/attendance/check-in", json={"employee_id": 1})
         assert response.status_code == 200
         assert response.json() == {"status": "checked_in"}
-        mock_check_in.assert_called_once_with(1, "manual", None)
+        mock_check_in.assert_called_once_with(1, "manual", None, conn=ANY)
 
 def test_check_out(client):
     with patch("app.services.attendence_services.AttendanceService.check_out") as mock_check_out:
@@ -16,7 +21,7 @@ def test_check_out(client):
         response = client.post("/hrms/attendance/check-out", json={"employee_id": 1})
         assert response.status_code == 200
         assert response.json() == {"status": "checked_out"}
-        mock_check_out.assert_called_once_with(1, "manual", None)
+        mock_check_out.assert_called_once_with(1, "manual", None, conn=ANY)
 
 def test_today_status(client):
     with patch("app.database.attendence.AttendanceDB.get_by_employee_and_date") as mock_get:
@@ -41,6 +46,34 @@ def test_late_report(client, mock_db_connection):
     assert response.status_code == 200
     assert response.json() == [{"employee_id": 1, "is_late": True}]
 
+def test_late_report_streams_ndjson(client, mock_db_connection):
+    mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.__iter__.return_value = iter([
+        {"employee_id": 1, "date": date(2025, 1, 2), "is_late": True},
+        {"employee_id": 2, "date": date(2025, 1, 3), "is_late": True},
+    ])
+
+    response = client.get(
+        "/hrms/attendance/reports/late?start_date=2025-01-01&end_date=2025-01-31&stream=ndjson"
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.splitlines() == [
+        '{"employee_id":1,"date":"2025-01-02","is_late":true}',
+        '{"employee_id":2,"date":"2025-01-03","is_late":true}',
+    ]
+    # Named (server-side) cursor, never fetchall()
+    assert mock_conn.cursor.call_args.kwargs["name"].startswith("hrms_stream_")
+    mock_cursor.fetchall.assert_not_called()
+
+def test_company_attendance_streams_json_array(client, mock_db_connection):
+    mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.__iter__.return_value = iter([{"employee_id": 1}, {"employee_id": 2}])
+
+    response = client.get("/hrms/attendance/company?stream=json")
+    assert response.status_code == 200
+    assert response.json() == [{"employee_id": 1}, {"employee_id": 2}]
+
 def test_lock_attendance(client, mock_db_connection):
     mock_conn, mock_cursor = mock_db_connection
     
@@ -73,3 +106,71 @@ def test_override_attendance_locked(client, mock_db_connection):
     response = client.put(f"/hrms/attendance/override/1?dt={date.today()}", json=payload)
     assert response.status_code == 400
     assert response.json()["detail"] == "Attendance is locked or record not found"
+
+def test_unlock_reopens_payroll_locked_attendance(client, mock_db_connection, monkeypatch):
+    from app.api.attendence_api import attendence_actions_api
+    from app.database.payroll import ATTENDANCE_LOCK_CHANNEL
+
+    mock_conn, mock_cursor = mock_db_connection
+    monkeypatch.setattr(AttendanceLockDB, "get_state", _REAL_LOCK_STATE)
+    dt = date(2025, 1, 15)
+    payload = {"check_in": "09:00"}
+
+    # Payroll locked the employee's month
+    mock_cursor.fetchone.return_value = (False, {"1": True})
+    response = client.put(f"/hrms/attendance/override/1?dt={dt}", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Attendance is locked for payroll"
+
+    with patch("app.database.payroll.execute_values") as mock_values:
+        response = client.post(f"/hrms/attendance/unlock/1?dt={dt}")
+        # The actions router's copy of the route behaves the same
+        attendence_actions_api.unlock_attendance(1, dt)
+    assert response.status_code == 200
+    assert mock_values.call_args.args[2] == [(1, 2025, 1, False)]
+    notify = [c for c in mock_cursor.execute.call_args_list if "pg_notify" in c.args[0]]
+    assert notify[0].args[1] == (ATTENDANCE_LOCK_CHANNEL, "2025-1")
+
+    # The open exception is what the lookup now reads back
+    mock_cursor.fetchone.side_effect = [(False, {"1": False}), {"id": 1, "status": "Present"}]
+    with patch("app.api.attendence.PayrollDirtyDB.mark"):
+        response = client.put(f"/hrms/attendance/override/1?dt={dt}", json=payload)
+    assert response.status_code == 200
+    assert response.json()["message"] == "Attendance overridden successfully"
+
+def test_check_in_runs_in_one_request_transaction(client, mock_db_connection):
+    mock_conn, mock_cursor = mock_db_connection
+
+    with patch("app.services.attendence_services.AttendanceService.check_in") as mock_check_in:
+        mock_check_in.return_value = {"status": "checked_in"}
+        response = client.post("/hrms/attendance/check-in", json={"employee_id": 1})
+
+    assert response.status_code == 200
+    assert mock_check_in.call_args.kwargs["conn"].raw is mock_conn
+    mock_conn.commit.assert_called_once()
+
+def test_biometric_attendance_uses_async_path(client):
+    from contextlib import asynccontextmanager
+
+    conn = object()
+
+    @asynccontextmanager
+    async def fake_transaction():
+        yield conn
+
+    async def no_events(*args, **kwargs):
+        return []
+
+    async def fake_check_in(*args, **kwargs):
+        return {"event_type": "check_in"}
+
+    with patch("app.api.attendence.async_db_transaction", fake_transaction), \
+         patch("app.api.attendence.AsyncAttendanceEventDB.get_events_for_window", side_effect=no_events), \
+         patch("app.api.attendence.AsyncAttendanceService.check_in", side_effect=fake_check_in) as mock_check_in, \
+         patch("app.api.attendence.AttendanceService.check_in") as mock_sync_check_in:
+        response = client.post("/hrms/attendance/biometric-attendance", json={"employee_id": 1})
+
+    assert response.status_code == 200
+    assert response.json()["action"] == "check_in"
+    assert mock_check_in.call_args.args[:2] == (conn, 1)
+    mock_sync_check_in.assert_not_called()
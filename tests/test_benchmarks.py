@@ -0,0 +1,65 @@
+import random
+from datetime import date
+
+from app.benchmarks.payroll_benchmark import compare_reports, summarize
+from app.data_seeder.synthetic_org import (
+    ATTENDANCE_COLUMNS,
+    CopyStream,
+    attendance_rows,
+    employee_rows,
+    period_months,
+    salary_rows,
+)
+
+
+def test_synthetic_org_is_deterministic():
+    def build(seed):
+        rng = random.Random(seed)
+        staff = list(employee_rows(1, 20, rng))
+        return staff, list(salary_rows(staff, date(2025, 1, 1), rng)), \
+            list(attendance_rows([e[0] for e in staff], 2025, 1, rng))
+
+    assert build(7) == build(7)
+    assert build(7) != build(8)
+
+    staff, salaries, attendance = build(7)
+    assert len(attendance) == 20 * 31
+    assert all(len(row) == len(ATTENDANCE_COLUMNS) for row in attendance)
+    # Saturdays and Sundays are week_off
+    assert {r[-1] for r in attendance if r[1].weekday() >= 5} == {"week_off"}
+    assert len(salaries) < len(staff)       # some employees use base_salary
+
+
+def test_period_months_crosses_year_end():
+    assert period_months((2025, 2), 3) == [(2024, 12), (2025, 1), (2025, 2)]
+
+
+def test_copy_stream_renders_copy_text_in_chunks():
+    stream = CopyStream([(1, None, True, date(2025, 1, 2)), (2, "x", False, 1.5)])
+
+    text = ""
+    while True:
+        chunk = stream.read(7)
+        if not chunk:
+            break
+        text += chunk
+
+    assert text == "1\t\\N\tt\t2025-01-02\n2\tx\tf\t1.5\n"
+    assert stream.rows == 2
+
+
+def test_compare_reports_flags_slower_or_chattier_scenarios():
+    def report(bulk_s, bulk_q, single_s):
+        return {"scenarios": {
+            "bulk": summarize([{"seconds": bulk_s, "queries": bulk_q}]),
+            "single": summarize([{"seconds": single_s, "queries": 10},
+                                 {"seconds": single_s + 1, "queries": 10},
+                                 {"seconds": single_s + 2, "queries": 10}]),
+        }}
+
+    rows = {r["scenario"]: r for r in compare_reports(report(1.0, 6, 2.0), report(1.05, 7, 3.0))}
+
+    assert rows["bulk"]["change_pct"] == 5.0
+    assert rows["bulk"]["regressed"]            # one more query than baseline
+    assert rows["single"]["seconds_after"] == 4.0
+    assert rows["single"]["regressed"]          # +50% median wall time
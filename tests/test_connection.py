@@ -0,0 +1,169 @@
+import pytest
+from unittest.mock import MagicMock
+from psycopg2 import pool as pg_pool
+from psycopg2 import extensions as pg_ext
+
+from app.database import connection
+
+
+def _fake_conn():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.autocommit = False
+    conn.isolation_level = None
+    conn.readonly = None
+    conn.deferrable = None
+    conn.get_transaction_status.return_value = pg_ext.TRANSACTION_STATUS_IDLE
+
+    def set_session(**session):
+        for key, value in session.items():
+            setattr(conn, key, None if value == "DEFAULT" else value)
+
+    conn.set_session.side_effect = set_session
+    return conn
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    created = []
+
+    def connect(**kwargs):
+        conn = _fake_conn()
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr("psycopg2.connect", connect)
+    return created
+
+
+def test_pool_reuses_returned_connection(fake_connect):
+    pool = connection.ConnectionPool(minconn=0, maxconn=2)
+
+    conn = connection.PooledConnection(pool.getconn(), pool)
+    raw = conn.raw
+    conn.close()
+
+    again = connection.PooledConnection(pool.getconn(), pool)
+    assert again.raw is raw
+    assert len(fake_connect) == 1
+    raw.close.assert_not_called()
+
+
+def test_pool_exhaustion_raises(fake_connect):
+    pool = connection.ConnectionPool(minconn=0, maxconn=1, timeout=0.01)
+    pool.getconn()
+
+    with pytest.raises(pg_pool.PoolError):
+        pool.getconn()
+
+
+def test_pool_replaces_closed_connection(fake_connect):
+    pool = connection.ConnectionPool(minconn=1, maxconn=1)
+    fake_connect[0].closed = 1
+
+    raw = pool.getconn()
+    assert raw is fake_connect[1]
+
+
+def test_pool_rolls_back_dirty_connection(fake_connect):
+    pool = connection.ConnectionPool(minconn=0, maxconn=1)
+    raw = pool.getconn()
+    raw.get_transaction_status.return_value = pg_ext.TRANSACTION_STATUS_INTRANS
+
+    pool.putconn(raw)
+    raw.rollback.assert_called_once()
+
+
+def test_pool_resets_session_state(fake_connect):
+    pool = connection.ConnectionPool(minconn=0, maxconn=1)
+    conn = connection.PooledConnection(pool.getconn(), pool)
+    raw = conn.raw
+
+    # Borrower switches the session; the next borrower must not inherit it
+    conn.autocommit = True
+    raw.readonly = True
+    conn.close()
+
+    assert raw.autocommit is False
+    raw.set_session.assert_called_once_with(
+        isolation_level="DEFAULT", readonly="DEFAULT", deferrable="DEFAULT"
+    )
+    raw.close.assert_not_called()
+
+
+def test_pool_discards_connection_it_cannot_reset(fake_connect):
+    pool = connection.ConnectionPool(minconn=0, maxconn=1)
+    raw = pool.getconn()
+    raw.isolation_level = pg_ext.ISOLATION_LEVEL_SERIALIZABLE
+    raw.set_session.side_effect = pg_pool.PoolError("boom")
+
+    pool.putconn(raw)
+    raw.close.assert_called_once()
+    assert pool.getconn() is fake_connect[1]
+
+
+def test_db_connection_commits_and_releases(fake_connect):
+    connection.close_pool()
+    connection.configure_pool(minconn=0, maxconn=1)
+
+    with connection.db_connection() as conn:
+        conn.cursor().execute("SELECT 1;")
+
+    fake_connect[0].commit.assert_called_once()
+
+    # Slot was released, so a second checkout succeeds on a 1-slot pool
+    with connection.db_connection():
+        pass
+
+    connection.close_pool()
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    created = []
+
+    def connect(**kwargs):
+        conn = _fake_conn()
+        conn.params = kwargs
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr("psycopg2.connect", connect)
+    connection.close_pool()
+    connection.configure_read_pool("host=replica dbname=hrms_db user=hrms_ro")
+    yield created
+    connection.configure_read_pool(None)
+    connection.close_pool()
+
+
+def test_read_only_routes_to_replica(replica):
+    @connection.read_only
+    def report():
+        conn = connection.get_connection()
+        params = conn.raw.params
+        conn.close()
+        return params
+
+    assert report() == {"dsn": "host=replica dbname=hrms_db user=hrms_ro"}
+    replica[-1].set_session.assert_called_once_with(readonly=True)
+
+    # Outside the annotation everything stays on the primary
+    conn = connection.get_connection()
+    assert "dsn" not in conn.raw.params
+    conn.close()
+
+
+def test_recent_write_keeps_reads_on_primary(replica):
+    with connection.replica_reads(), connection.primary_reads():
+        conn = connection.get_connection()
+        assert "dsn" not in conn.raw.params
+        conn.close()
+
+
+def test_write_sets_read_your_writes_cookie(replica, client):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.api.attendence.AttendanceService.check_in", lambda *a, **k: {"ok": True})
+        response = client.post("/hrms/attendance/check-in", json={"employee_id": 1})
+
+    assert response.status_code == 200
+    assert "hrms_last_write" in response.cookies
@@ -0,0 +1,60 @@
+from unittest.mock import MagicMock
+
+from app.database import migrate
+
+
+def _fake_conn(applied=()):
+    conn = MagicMock()
+    cur = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    cur.fetchall.return_value = [(v,) for v in applied]
+    cur.fetchone.return_value = None
+    return conn, cur
+
+
+def _executed(cur):
+    return [c.args[0] for c in cur.execute.call_args_list]
+
+
+def test_discover_migrations_sorted_and_unique():
+    found = migrate.discover_migrations()
+    versions = [m.version for m in found]
+
+    assert versions == sorted(versions)
+    assert len(versions) == len(set(versions))
+    assert found[0].version == 1
+
+
+def test_up_applies_pending_indexes_concurrently():
+    conn, cur = _fake_conn(applied=())
+
+    applied = migrate.migrate("up", target=1, conn=conn, log=lambda *_: None)
+
+    sql = _executed(cur)
+    assert applied == [1]
+    assert any("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attendance_events_employee_time" in s for s in sql)
+    assert any("INSERT INTO schema_migrations" in s for s in sql)
+    assert sql[0].startswith("SELECT pg_advisory_lock")
+    assert sql[-1].startswith("SELECT pg_advisory_unlock")
+    # CONCURRENTLY cannot run in a transaction block
+    assert conn.autocommit is True
+
+
+def test_up_skips_applied_versions():
+    conn, cur = _fake_conn(applied=(1,))
+
+    applied = migrate.migrate("up", target=1, conn=conn, log=lambda *_: None)
+
+    assert applied == []
+    assert not any("CREATE INDEX" in s for s in _executed(cur))
+
+
+def test_down_reverts_and_removes_history():
+    conn, cur = _fake_conn(applied=(1,))
+
+    applied = migrate.migrate("down", target=0, conn=conn, log=lambda *_: None)
+
+    sql = _executed(cur)
+    assert applied == [1]
+    assert any("DROP INDEX CONCURRENTLY IF EXISTS idx_payroll_year_month" in s for s in sql)
+    assert any("DELETE FROM schema_migrations" in s for s in sql)
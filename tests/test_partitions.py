@@ -0,0 +1,54 @@
+from datetime import date
+from unittest.mock import MagicMock
+
+from app.database import partitions
+
+
+def _executed(cur):
+    return [c.args[0] for c in cur.execute.call_args_list]
+
+
+def test_partition_name_and_bounds():
+    assert partitions.partition_name("attendance", 2025, 3) == "attendance_y2025m03"
+    assert partitions.month_bounds(2025, 12) == (date(2025, 12, 1), date(2026, 1, 1))
+    assert partitions.add_months(2025, 1, -2) == (2024, 11)
+
+
+def test_expired_partitions_respects_retention():
+    names = [
+        "attendance_events_y2023m01",
+        "attendance_events_y2023m02",
+        "attendance_events_y2024m06",
+        "attendance_events_default",
+    ]
+    expired = partitions.expired_partitions(names, "attendance_events", 24, date(2025, 2, 15))
+
+    assert expired == ["attendance_events_y2023m01"]
+    assert partitions.expired_partitions(names, "attendance_events", 0, date(2025, 2, 15)) == []
+
+
+def test_maintain_creates_future_months_and_detaches_expired(monkeypatch):
+    monkeypatch.setitem(partitions.RETENTION_MONTHS, "attendance_events", 12)
+    monkeypatch.setitem(partitions.RETENTION_MONTHS, "attendance", 0)
+
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchone.return_value = (1,)            # both tables partitioned
+    cur.fetchall.side_effect = [
+        [("attendance_events_y2023m12",), ("attendance_events_y2025m01",)],
+        [("attendance_y2025m01",)],
+    ]
+
+    report = partitions.maintain_partitions(
+        conn=conn, today=date(2025, 1, 10), months_ahead=2, drop_expired=False
+    )
+
+    sql = _executed(cur)
+    assert report["attendance_events"]["created"] == [
+        "attendance_events_y2025m02", "attendance_events_y2025m03",
+    ]
+    assert report["attendance_events"]["detached"] == ["attendance_events_y2023m12"]
+    assert report["attendance"]["detached"] == []
+    assert any("DETACH PARTITION attendance_events_y2023m12" in s for s in sql)
+    assert not any(s.startswith("DROP TABLE") for s in sql)
+    assert any("FOR VALUES FROM ('2025-03-01') TO ('2025-04-01')" in s for s in sql)
@@ -1,6 +1,24 @@
 import pytest
 from unittest.mock import MagicMock, patch
 
+from app.database.payroll import AttendanceLockDB
+
+# Captured before conftest stubs it per test
+_REAL_LOCK_STATE = AttendanceLockDB.__dict__["get_state"]
+
+
+def _salary_index(inputs):
+    """SalaryStructureIndex from {employee_id: {"structure", "base_salary"}}."""
+    from datetime import date
+    from app.database.salary import SalaryStructureIndex
+
+    structures = {
+        emp: [dict(v["structure"], id=emp, effective_from=date(2020, 1, 1), effective_to=None)]
+        if v["structure"] else []
+        for emp, v in inputs.items()
+    }
+    return SalaryStructureIndex(structures, {emp: v["base_salary"] for emp, v in inputs.items()})
+
 def test_get_active_policy(client):
     with patch("app.api.payroll.PayrollPolicyDB.get_active_policy") as mock_get:
         mock_get.return_value = {"overtime_enabled": True}
@@ -56,23 +74,22 @@ def test_generate_payroll_locked(client):
         assert "Payroll is locked" in response.json()["detail"]
 
 def test_generate_bulk_payroll(client, mock_db_connection):
-    mock_conn, mock_cursor = mock_db_connection
-    
     # Mock _is_period_locked
     with patch("app.api.payroll._is_period_locked") as mock_locked:
         mock_locked.return_value = False
-        
-        # Mock fetching active employees
-        mock_cursor.fetchall.return_value = [(1,), (2,)]
-        
-        with patch("app.api.payroll.PayrollService.generate_for_employee") as mock_gen:
-            mock_gen.return_value = {"payroll": {"net_salary": 5000}}
-            
+
+        with patch("app.api.payroll.BulkPayrollService.generate") as mock_gen:
+            mock_gen.return_value = [
+                {"employee_id": 1, "status": "success", "payroll": {"net_salary": 5000}},
+                {"employee_id": 2, "status": "failed", "error": "No salary found for employee_id=2"},
+            ]
+
             response = client.post("/hrms/payroll/generate-bulk", json={"year": 2023, "month": 1})
             assert response.status_code == 200
             data = response.json()
             assert len(data["results"]) == 2
             assert data["results"][0]["status"] == "success"
+            assert data["results"][1]["status"] == "failed"
 
 def test_get_employee_payroll(client):
     with patch("app.api.payroll.PayrollDB.get_payroll") as mock_get:
@@ -87,3 +104,955 @@ def test_payroll_status(client):
         response = client.get("/hrms/payroll/status/1?year=2023&month=1")
         assert response.status_code == 200
         assert response.json()["status"] == "generated"
+
+def test_period_lock_check_is_cached(client, mock_db_connection):
+    from app.database.payroll import PayrollLockDB
+
+    mock_conn, mock_cursor = mock_db_connection
+    PayrollLockDB.invalidate()
+    mock_cursor.fetchone.return_value = {
+        "year": 2023, "month": 2, "is_locked": True, "locked_at": None
+    }
+
+    assert PayrollLockDB.is_locked(2023, 2) is True
+    assert PayrollLockDB.is_locked(2023, 2) is True
+    assert mock_cursor.execute.call_count == 1
+
+    # /lock invalidates the cached entry
+    client.post("/hrms/payroll/lock", json={"year": 2023, "month": 2, "lock": False})
+    mock_cursor.fetchone.return_value = {
+        "year": 2023, "month": 2, "is_locked": False, "locked_at": None
+    }
+    assert PayrollLockDB.is_locked(2023, 2) is False
+    PayrollLockDB.invalidate()
+
+
+def test_payroll_unlock_reopens_the_month_attendance(client):
+    with patch("app.api.payroll.PayrollLockDB.set_lock") as set_lock, \
+         patch("app.api.payroll.AttendanceLockDB.unlock_period") as unlock_period:
+        client.post("/hrms/payroll/lock", json={"year": 2023, "month": 2, "lock": True})
+        unlock_period.assert_not_called()
+
+        client.post("/hrms/payroll/lock", json={"year": 2023, "month": 2, "lock": False})
+
+    set_lock.assert_called_with(2023, 2, False)
+    unlock_period.assert_called_once_with(2023, 2)
+
+
+def test_period_lock_change_notifies_other_workers(mock_db_connection):
+    from app.database.payroll import PAYROLL_LOCK_CHANNEL, PayrollChangeListener, PayrollLockDB
+
+    mock_conn, mock_cursor = mock_db_connection
+    PayrollLockDB.invalidate()
+    mock_cursor.fetchone.return_value = {
+        "year": 2023, "month": 3, "is_locked": False, "locked_at": None
+    }
+    assert PayrollLockDB.is_locked(2023, 3) is False
+
+    PayrollLockDB.set_lock(2023, 3, True)
+    notify = [c for c in mock_cursor.execute.call_args_list if "pg_notify" in c.args[0]]
+    assert notify[0].args[1] == (PAYROLL_LOCK_CHANNEL, "2023-3")
+
+    # Another worker's cache is dropped by its listener, not by the TTL
+    PayrollLockDB._store({"year": 2023, "month": 3, "is_locked": False, "locked_at": None},
+                         PayrollLockDB._generation.get((2023, 3), 0))
+    PayrollChangeListener.handlers()[PAYROLL_LOCK_CHANNEL]("2023-3")
+    mock_cursor.fetchone.return_value = {
+        "year": 2023, "month": 3, "is_locked": True, "locked_at": None
+    }
+    assert PayrollLockDB.is_locked(2023, 3) is True
+    PayrollLockDB.invalidate()
+
+POLICY = {
+    "late_grace_minutes": 10, "late_lop_threshold_minutes": 60,
+    "early_exit_grace_minutes": 10, "early_exit_lop_threshold_minutes": 60,
+    "overtime_enabled": True, "overtime_multiplier": 1.5,
+    "holiday_double_pay": True, "weekend_paid_only_if_worked": True,
+    "night_shift_allowance": 200,
+}
+
+SUMMARY = {
+    "working_days": 22, "paid_days": 20, "lop_days_from_absent": 2,
+    "total_net_hours": 170.5, "total_late_minutes": 95, "total_early_minutes": 12,
+    "total_overtime_minutes": 300, "holiday_count": 1, "night_shift_days": 3,
+}
+
+
+def test_bulk_engine_matches_single_employee_engine(mock_db_connection):
+    from app.services.payroll_service import PayrollService
+    from app.services.payroll_bulk_service import BulkPayrollService
+
+    structure = {"basic": 30000, "hra": 12000, "allowances": 3000, "deductions": 1500}
+    no_work = dict(SUMMARY, working_days=0)
+
+    with patch("app.services.payroll_service.PayrollPolicyDB.get_active_policy", return_value=POLICY), \
+         patch("app.services.payroll_service.SalaryDB.get_active_for_date", return_value=structure), \
+         patch("app.services.payroll_service.PayrollService._get_attendance_summary", return_value=SUMMARY), \
+         patch("app.services.payroll_service.PayrollDB.upsert_payroll",
+               side_effect=lambda conn=None, **kw: kw), \
+         patch("app.services.payroll_service.PayrollDB.lock_attendance_for_period"):
+        single = PayrollService.generate_for_employee(1, 2025, 1)["payroll"]
+
+    with patch("app.services.payroll_bulk_service.PayrollPolicyDB.get_active_policy", return_value=POLICY), \
+         patch("app.services.payroll_bulk_service.SalaryDB.load_index", return_value=_salary_index({
+            1: {"structure": structure, "base_salary": None},
+            2: {"structure": None, "base_salary": None},
+            3: {"structure": None, "base_salary": 50000.0},
+         })), \
+         patch("app.services.payroll_bulk_service.PayrollService.get_attendance_summaries",
+               return_value={1: SUMMARY, 2: SUMMARY, 3: no_work}), \
+         patch("app.services.payroll_bulk_service.PayrollDB.bulk_upsert_payroll",
+               side_effect=lambda y, m, rows, conn=None: {e: dict(f, employee_id=e) for e, f in rows}) as upsert, \
+         patch("app.services.payroll_bulk_service.PayrollDB.lock_attendance_month") as lock:
+        results = BulkPayrollService.generate(2025, 1, employee_ids=[1, 2, 3])
+
+    assert [r["status"] for r in results] == ["success", "failed", "success"]
+    assert results[1]["error"] == "No salary found for employee_id=2"
+
+    bulk = results[0]["payroll"]
+    for column, value in single.items():
+        if column not in ("employee_id", "year", "month"):
+            assert bulk[column] == value, column
+
+    # One upsert for everyone, one lock for those with working days
+    upsert.assert_called_once()
+    assert lock.call_args.args[:3] == (2025, 1, [1])
+
+
+def test_regenerate_single_employee_uses_only_the_request_connection(client, mock_db_connection):
+    from app.database import connection
+    from app.database.payroll import PayrollLockDB
+
+    mock_conn, mock_cursor = mock_db_connection
+    structure = {"basic": 30000, "hra": 12000, "allowances": 3000, "deductions": 1500}
+    mock_cursor.fetchone.side_effect = [
+        {"year": 2023, "month": 1, "is_locked": False, "locked_at": None},
+        dict(POLICY, id=1),
+        structure,
+        (22, 20, 2, 160, 0, 0, 0, 0, 0),
+        {"employee_id": 1, "net_salary": 40000},
+    ]
+    PayrollLockDB.invalidate()
+
+    # One slot: a second checkout while the request holds its
+    # connection would time out instead of succeeding
+    connection.configure_pool(minconn=0, maxconn=1, timeout=0.05)
+    with patch("app.database.payroll.execute_values"):
+        response = client.post("/hrms/payroll/regenerate",
+                               json={"year": 2023, "month": 1, "employee_id": 1})
+
+    assert response.status_code == 200, response.json()
+    assert response.json()["payroll"]["net_salary"] == 40000
+    mock_conn.commit.assert_called()
+    PayrollLockDB.invalidate()
+
+
+def test_attendance_summaries_are_independent_per_employee(mock_db_connection):
+    from datetime import date
+    from app.services.payroll_service import PayrollService
+
+    mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = []
+
+    summaries = PayrollService.get_attendance_summaries([1, 2], date(2025, 1, 1), date(2025, 1, 31))
+    summaries[1]["working_days"] = 5
+
+    assert summaries[2]["working_days"] == 0
+
+
+def test_start_payroll_run_returns_run_and_wakes_worker(client):
+    run = {"run_id": 7, "year": 2023, "month": 1, "status": "pending", "total_employees": 3}
+
+    with patch("app.api.payroll._is_period_locked", return_value=False), \
+         patch("app.api.payroll.PayrollRunService.start", return_value=run) as mock_start, \
+         patch("app.api.payroll.wake_worker") as mock_wake:
+        response = client.post("/hrms/payroll/runs", json={"year": 2023, "month": 1})
+
+    assert response.status_code == 202
+    assert response.json()["run_id"] == 7
+    mock_start.assert_called_once_with(2023, 1)
+    mock_wake.assert_called_once()
+
+
+def test_start_payroll_run_locked(client):
+    with patch("app.api.payroll._is_period_locked", return_value=True):
+        response = client.post("/hrms/payroll/runs", json={"year": 2023, "month": 1})
+    assert response.status_code == 400
+
+
+def test_payroll_run_status_progress(client):
+    run = {"run_id": 7, "status": "running", "total_employees": 8, "processed": 2}
+    partitions = {"total": 4, "pending": 1, "running": 2, "done": 1, "workers": ["a:1:1", "b:1:1"]}
+    with patch("app.services.payroll_run_service.PayrollRunDB.get_run", return_value=run), \
+         patch("app.services.payroll_run_service.PayrollRunDB.get_partition_summary",
+               return_value=partitions):
+        response = client.get("/hrms/payroll/runs/7")
+    assert response.status_code == 200
+    assert response.json()["progress_pct"] == 25.0
+    assert response.json()["partitions"]["workers"] == ["a:1:1", "b:1:1"]
+
+
+def _lease(**extra):
+    lease = {"run_id": 7, "year": 2023, "month": 1, "partition_no": 0, "attempts": 1,
+             "first_employee_id": 1, "last_employee_id": 3}
+    lease.update(extra)
+    return lease
+
+
+def test_payroll_run_executes_in_checkpointed_batches(mock_db_connection):
+    from app.services.payroll_run_service import PayrollRunService
+
+    batches = [[1, 2], [3], []]
+
+    def generate(year, month, employee_ids, conn, policy):
+        return [{"employee_id": e, "status": "success", "payroll": {}} for e in employee_ids]
+
+    with patch("app.services.payroll_run_service.PayrollRunDB") as run_db, \
+         patch("app.services.payroll_run_service.PayrollLockDB.is_locked", return_value=False), \
+         patch("app.services.payroll_run_service.PayrollPolicyDB.get_active_policy",
+               return_value=dict(POLICY, id=1)), \
+         patch("app.services.payroll_run_service.BulkPayrollService.generate", side_effect=generate):
+        run_db.get_run_state.return_value = {"status": "running", "cancel_requested": False}
+        run_db.next_batch.side_effect = batches
+        run_db.set_policy.return_value = 1
+        run_db.complete_partition.return_value = True
+
+        status = PayrollRunService.execute(_lease(), batch_size=2)
+
+    assert status == "completed"
+    assert run_db.record_batch.call_count == 2
+    recorded = [r["employee_id"] for c in run_db.record_batch.call_args_list for r in c.args[1]]
+    assert recorded == [1, 2, 3]
+    # Every batch transaction re-checks the lease; batches stay inside the partition
+    assert run_db.fence.call_count == 3
+    assert run_db.next_batch.call_args.args == (7, 2, 1, 3)
+    run_db.complete_partition.assert_called_once()
+    run_db.finish.assert_not_called()
+
+
+def test_payroll_run_stops_at_batch_boundary_when_cancelled(mock_db_connection):
+    from app.services.payroll_run_service import PayrollRunService
+
+    with patch("app.services.payroll_run_service.PayrollRunDB") as run_db, \
+         patch("app.services.payroll_run_service.PayrollLockDB.is_locked", return_value=False), \
+         patch("app.services.payroll_run_service.PayrollPolicyDB.get_active_policy",
+               return_value=dict(POLICY, id=1)), \
+         patch("app.services.payroll_run_service.BulkPayrollService.generate",
+               return_value=[{"employee_id": 1, "status": "success"}]) as mock_gen:
+        run_db.get_run_state.side_effect = [
+            {"status": "running", "cancel_requested": False},
+            {"status": "running", "cancel_requested": True},
+        ]
+        run_db.next_batch.return_value = [1]
+        run_db.set_policy.return_value = 1
+
+        status = PayrollRunService.execute(_lease())
+
+    assert status == "cancelled"
+    assert mock_gen.call_count == 1
+    run_db.finish.assert_called_once_with(7, "cancelled")
+    run_db.release_partition.assert_called_once()
+
+
+def test_payroll_run_worker_stops_when_partition_is_reclaimed(mock_db_connection):
+    from app.database.payroll_runs import PartitionLeaseLost
+    from app.services.payroll_run_service import PayrollRunService
+
+    with patch("app.services.payroll_run_service.PayrollRunDB") as run_db, \
+         patch("app.services.payroll_run_service.PayrollLockDB.is_locked", return_value=False), \
+         patch("app.services.payroll_run_service.PayrollPolicyDB.get_policy", return_value=dict(POLICY, id=1)), \
+         patch("app.services.payroll_run_service.BulkPayrollService.generate") as mock_gen:
+        run_db.get_run_state.return_value = {"status": "running", "cancel_requested": False}
+        run_db.fence.side_effect = PartitionLeaseLost("reclaimed")
+
+        status = PayrollRunService.execute(_lease(policy_id=1))
+
+    # Nothing written, and the run is left to the worker that now holds the lease
+    assert status == "lost"
+    mock_gen.assert_not_called()
+    run_db.record_batch.assert_not_called()
+    run_db.finish.assert_not_called()
+    run_db.release_partition.assert_not_called()
+
+
+def test_partition_claim_skips_locked_and_fences_by_attempt(mock_db_connection):
+    from app.database.payroll_runs import PartitionLeaseLost, PayrollRunDB
+
+    mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.fetchone.side_effect = [
+        {"run_id": 7, "partition_no": 3, "attempts": 2}, {"year": 2025, "month": 1, "policy_id": None},
+    ]
+    lease = PayrollRunDB.claim_partition("node-a:1:1")
+
+    claim_sql, claim_params = mock_cursor.execute.call_args_list[0].args
+    assert "FOR UPDATE OF p SKIP LOCKED" in claim_sql and "attempts = p.attempts + 1" in claim_sql
+    assert claim_params == (PayrollRunDB.STALE_AFTER_SECONDS, "node-a:1:1")
+    assert lease == {"run_id": 7, "partition_no": 3, "attempts": 2,
+                     "year": 2025, "month": 1, "policy_id": None}
+
+    mock_cursor.fetchone.side_effect = [None]
+    with pytest.raises(PartitionLeaseLost):
+        PayrollRunDB.fence(lease, mock_conn)
+    assert mock_cursor.execute.call_args.args[1] == (7, 3, 2)
+
+
+def test_payroll_partitions_are_deterministic():
+    from app.services.payroll_parallel_service import partition_by_department, partition_by_range
+
+    assert partition_by_range([5, 1, 4, 2, 3], 2) == [[1, 2, 3], [4, 5]]
+    assert partition_by_range([1, 2], 8) == [[1], [2]]
+    assert partition_by_range([], 4) == []
+
+    rows = [(1, "Sales"), (2, None), (3, "Engineering"), (4, "Sales")]
+    assert partition_by_department(rows) == [[2], [3], [1, 4]]
+
+
+def test_parallel_report_matches_serial_order(mock_db_connection):
+    from app.services.payroll_parallel_service import ParallelPayrollService
+
+    def generate(year, month, employee_ids, conn, policy, lock_attendance):
+        assert lock_attendance is False
+        return [{"employee_id": e, "status": "failed" if e == 3 else "success",
+                 "payroll": None} for e in employee_ids]
+
+    with patch("app.services.payroll_parallel_service.PayrollPolicyDB.get_active_policy",
+               return_value=dict(POLICY, id=1)), \
+         patch("app.services.payroll_parallel_service.EmployeeDB.get_active_ids",
+               return_value=[1, 2, 3, 4, 5]), \
+         patch("app.services.payroll_parallel_service.BulkPayrollService.generate",
+               side_effect=generate) as mock_gen:
+        report = ParallelPayrollService.generate(2023, 1, workers=1, partition_by="range")
+
+    assert mock_gen.call_count == 1
+    assert [r["employee_id"] for r in report["results"]] == [1, 2, 3, 4, 5]
+    assert (report["succeeded"], report["failed"]) == (4, 1)
+    assert report["partitions"][0]["employees"] == 5
+
+
+def test_generate_parallel_route(client):
+    report = {"results": [{"employee_id": 1, "status": "success"}], "partitions": []}
+
+    with patch("app.api.payroll._is_period_locked", return_value=False), \
+         patch("app.api.payroll.ParallelPayrollService.generate", return_value=report) as mock_gen:
+        response = client.post("/hrms/payroll/generate-parallel",
+                               json={"year": 2023, "month": 1, "workers": 4})
+        bad = client.post("/hrms/payroll/generate-parallel",
+                          json={"year": 2023, "month": 1, "partition_by": "zodiac"})
+
+    assert response.status_code == 200
+    mock_gen.assert_called_once_with(2023, 1, workers=4, partition_by=None)
+    assert bad.status_code == 400
+
+
+def test_vectorized_calculator_matches_scalar_to_the_paisa():
+    import random
+    from app.services.payroll_service import PayrollService
+    from app.services.payroll_vectorized import VectorizedPayrollCalculator
+
+    rng = random.Random(14)
+    salaries, summaries = [], []
+    for _ in range(500):
+        salaries.append({
+            "basic": rng.uniform(8000, 90000), "hra": rng.uniform(0, 40000),
+            "allowances": rng.uniform(0, 9000), "deductions": rng.uniform(0, 3000),
+        })
+        summaries.append({
+            "working_days": rng.choice([0, 18, 21, 22, 23]), "paid_days": rng.randint(0, 23),
+            "lop_days_from_absent": rng.randint(0, 5), "total_net_hours": rng.uniform(0, 200),
+            "total_late_minutes": rng.randint(0, 300), "total_early_minutes": rng.randint(0, 120),
+            "total_overtime_minutes": rng.randint(0, 900), "holiday_count": rng.randint(0, 3),
+            "night_shift_days": rng.randint(0, 10),
+        })
+
+    for policy in (POLICY, dict(POLICY, overtime_enabled=False, holiday_double_pay=False)):
+        out = VectorizedPayrollCalculator.calculate(
+            policy, VectorizedPayrollCalculator.columns(salaries, summaries)
+        )
+        rows = list(VectorizedPayrollCalculator.rows(out))
+
+        for salary, summary, vector, worked in zip(salaries, summaries, rows, out["worked"]):
+            scalar, breakdown = PayrollService.calculate(policy, salary, summary)
+            assert bool(worked) == (breakdown is not None)
+            for column, value in scalar.items():
+                assert round(vector[column], 2) == round(value, 2), column
+
+
+def test_months_between_spans_year_end():
+    from datetime import date
+    from app.database.payroll_dirty import months_between
+
+    assert months_between(date(2024, 12, 30), date(2025, 2, 1)) == [(2024, 12), (2025, 1), (2025, 2)]
+    assert months_between(date(2025, 3, 5), date(2025, 3, 9)) == [(2025, 3)]
+
+
+def test_regenerate_incremental_recomputes_only_dirty(mock_db_connection):
+    from app.services.payroll_bulk_service import BulkPayrollService
+
+    def generate(year, month, employee_ids, conn):
+        return [{"employee_id": e, "status": "failed" if e == 9 else "success"} for e in employee_ids]
+
+    with patch("app.services.payroll_bulk_service.PayrollDirtyDB") as dirty_db, \
+         patch.object(BulkPayrollService, "generate", side_effect=generate) as mock_gen:
+        dirty_db.take.return_value = [3, 9, 17]
+        dirty_db.get_missing.return_value = [42]
+
+        report = BulkPayrollService.regenerate_dirty(2025, 1)
+
+    assert mock_gen.call_args.kwargs["employee_ids"] == [3, 9, 17, 42]
+    assert (report["dirty"], report["missing"]) == (3, 1)
+    # Failed employees stay dirty for the next run
+    dirty_db.mark.assert_called_once()
+    assert dirty_db.mark.call_args.args[:3] == (9, 2025, 1)
+
+
+def test_regenerate_route_incremental(client):
+    report = {"year": 2025, "month": 1, "dirty": 1, "missing": 0,
+              "results": [{"employee_id": 3, "status": "success"}]}
+
+    with patch("app.api.payroll._is_period_locked", return_value=False), \
+         patch("app.api.payroll.BulkPayrollService.regenerate_dirty", return_value=report) as mock_regen:
+        response = client.post("/hrms/payroll/regenerate",
+                               json={"year": 2025, "month": 1, "incremental": True})
+        missing_id = client.post("/hrms/payroll/regenerate", json={"year": 2025, "month": 1})
+
+    assert response.status_code == 200
+    assert response.json()["dirty"] == 1
+    assert mock_regen.call_args.args == (2025, 1)
+    assert missing_id.status_code == 400
+
+
+def test_policy_update_marks_all_payroll_dirty(client, mock_db_connection):
+    mock_db_connection[1].fetchone.return_value = dict(POLICY, id=1)
+    with patch("app.database.payroll.PayrollDirtyDB.mark_all") as mark_all:
+        client.put("/hrms/payroll/policy", json=dict(POLICY))
+    mark_all.assert_called_once()
+
+
+def test_punch_marks_only_generated_payroll_dirty(mock_db_connection):
+    from datetime import date
+    from app.database.attendence import AttendanceDB
+
+    mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.fetchone.return_value = {"employee_id": 1, "date": date(2025, 1, 2)}
+
+    with patch("app.database.attendence.AttendanceLockDB.is_locked", return_value=False):
+        AttendanceDB.upsert_full_attendance({"employee_id": 1, "date": date(2025, 1, 2)})
+
+    # The dirty insert is conditional on the month's payroll row existing
+    sql, params = mock_cursor.execute.call_args.args
+    assert "INSERT INTO payroll_dirty" in sql
+    assert "WHERE EXISTS" in sql and "FROM payroll" in sql
+    assert params == {"employee_id": 1, "year": 2025, "month": 1, "reason": "attendance"}
+
+
+def test_policy_simulation_compares_variants_without_writes(mock_db_connection):
+    from app.services.payroll_service import PayrollService
+    from app.services.payroll_simulation_service import PayrollSimulationService
+
+    structure = {"basic": 30000, "hra": 12000, "allowances": 3000, "deductions": 1500}
+    policy = dict(POLICY, id=4)
+
+    with patch("app.services.payroll_simulation_service.PayrollPolicyDB.get_active_policy", return_value=policy), \
+         patch("app.services.payroll_simulation_service.EmployeeDB.get_active_departments",
+               return_value=[(1, "Ops"), (2, "Ops"), (3, None), (4, "Sales")]), \
+         patch("app.services.payroll_simulation_service.SalaryDB.get_salary_inputs_for_date", return_value={
+            1: {"structure": structure, "base_salary": None},
+            2: {"structure": None, "base_salary": 40000.0},
+            3: {"structure": None, "base_salary": 25000.0},
+            4: {"structure": None, "base_salary": None},
+         }), \
+         patch("app.services.payroll_simulation_service.PayrollService.get_attendance_summaries",
+               return_value={1: SUMMARY, 2: SUMMARY, 3: SUMMARY, 4: SUMMARY}), \
+         patch("app.services.payroll_bulk_service.PayrollDB.bulk_upsert_payroll") as upsert:
+        report = PayrollSimulationService.simulate(2025, 1, [
+            {"name": "same"},
+            {"name": "ot2x", "overtime_multiplier": 2.0},
+        ])
+
+    upsert.assert_not_called()
+    assert report["employees"] == 3
+    assert report["skipped"] == [{"employee_id": 4, "error": "No salary found for employee_id=4"}]
+
+    same, ot2x = report["variants"]
+    assert same["totals"]["net_salary"]["delta"] == 0
+
+    old_fields, _ = PayrollService.calculate(POLICY, {"basic": 30000.0, "hra": 12000.0,
+                                                      "allowances": 3000.0, "deductions": 1500.0}, SUMMARY)
+    new_fields, _ = PayrollService.calculate(dict(POLICY, overtime_multiplier=2.0),
+                                             {"basic": 30000.0, "hra": 12000.0,
+                                              "allowances": 3000.0, "deductions": 1500.0}, SUMMARY)
+    emp1 = ot2x["employees"][0]
+    assert emp1["old_net_salary"] == round(old_fields["net_salary"], 2)
+    assert emp1["new_net_salary"] == round(new_fields["net_salary"], 2)
+
+    departments = {d["department"]: d for d in ot2x["departments"]}
+    assert departments["Ops"]["employees"] == 2 and departments[None]["employees"] == 1
+    assert ot2x["totals"]["overtime_pay"]["delta"] > 0
+
+
+def test_policy_simulate_route(client):
+    with patch("app.api.payroll.PayrollSimulationService.simulate",
+               return_value={"variants": []}) as mock_sim:
+        response = client.post("/hrms/payroll/policy/simulate", json={
+            "year": 2025, "month": 1,
+            "variants": [{"name": "strict", "late_lop_threshold_minutes": 30}],
+        })
+    assert response.status_code == 200
+    variant = mock_sim.call_args.args[2][0]
+    assert variant["late_lop_threshold_minutes"] == 30 and variant["overtime_multiplier"] is None
+
+
+def test_active_policy_is_cached_until_invalidated(mock_db_connection):
+    from app.database.payroll import PayrollPolicyDB
+
+    mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.fetchone.return_value = dict(POLICY, id=3)
+
+    assert PayrollPolicyDB.get_active_policy()["id"] == 3
+    assert PayrollPolicyDB.get_active_policy()["id"] == 3
+    assert mock_cursor.execute.call_count == 1
+
+    # LISTEN/NOTIFY handler
+    PayrollPolicyDB.invalidate()
+    mock_cursor.fetchone.return_value = dict(POLICY, id=4)
+    assert PayrollPolicyDB.get_active_policy()["id"] == 4
+    assert mock_cursor.execute.call_count == 2
+
+
+def test_update_policy_refreshes_cache_and_notifies(mock_db_connection):
+    from app.database.payroll import POLICY_CHANNEL, PayrollPolicyDB
+
+    mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.fetchone.return_value = dict(POLICY, id=9)
+
+    with patch("app.database.payroll.PayrollDirtyDB.mark_all"):
+        PayrollPolicyDB.update_policy(dict(POLICY))
+
+    notify = [c for c in mock_cursor.execute.call_args_list if "pg_notify" in c.args[0]]
+    assert notify and notify[0].args[1] == (POLICY_CHANNEL, "9")
+
+    calls = mock_cursor.execute.call_count
+    assert PayrollPolicyDB.get_active_policy()["id"] == 9
+    assert mock_cursor.execute.call_count == calls
+
+
+def test_policy_read_racing_a_notify_is_not_cached(mock_db_connection):
+    from app.database.payroll import PayrollPolicyDB
+
+    mock_conn, mock_cursor = mock_db_connection
+
+    def fetch_then_notify():
+        PayrollPolicyDB.invalidate()
+        return dict(POLICY, id=1)
+
+    mock_cursor.fetchone.side_effect = fetch_then_notify
+    PayrollPolicyDB.get_active_policy()
+    PayrollPolicyDB.get_active_policy()
+    assert mock_cursor.execute.call_count == 2
+
+
+def test_payroll_run_pins_policy_version(mock_db_connection):
+    from app.services.payroll_run_service import PayrollRunService
+
+    with patch("app.services.payroll_run_service.PayrollRunDB") as run_db, \
+         patch("app.services.payroll_run_service.PayrollLockDB.is_locked", return_value=False), \
+         patch("app.services.payroll_run_service.PayrollPolicyDB") as policy_db, \
+         patch("app.services.payroll_run_service.BulkPayrollService.generate",
+               return_value=[{"employee_id": 1, "status": "success"}]) as mock_gen:
+        run_db.get_run_state.return_value = {"status": "running", "cancel_requested": False}
+        run_db.next_batch.side_effect = [[1], []]
+        policy_db.get_policy.return_value = dict(POLICY, id=2)
+
+        # Resumed run: keeps the version it started with
+        PayrollRunService.execute(_lease(policy_id=2))
+
+    policy_db.get_active_policy.assert_not_called()
+    assert mock_gen.call_args.kwargs["policy"]["id"] == 2
+
+
+def _real_lock_state(monkeypatch):
+    # conftest stubs the lookup as "unlocked"; these tests exercise the real one
+    monkeypatch.setattr(AttendanceLockDB, "get_state", _REAL_LOCK_STATE)
+    return AttendanceLockDB
+
+
+
+def test_attendance_lock_exceptions_override_period_and_are_cached(mock_db_connection, monkeypatch):
+    from datetime import date
+    lock_db = _real_lock_state(monkeypatch)
+
+    mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.fetchone.return_value = (True, {"5": False, "9": True})
+
+    assert lock_db.is_locked(1, date(2025, 1, 10)) is True     # period lock
+    assert lock_db.is_locked(5, date(2025, 1, 11)) is False    # left open
+    assert lock_db.is_locked(9, date(2025, 1, 12)) is True
+    assert mock_cursor.execute.call_count == 1                 # one query per month
+
+    lock_db.invalidate_payload("2025-1")
+    mock_cursor.fetchone.return_value = (False, {})
+    assert lock_db.is_locked(1, date(2025, 1, 10)) is False
+    assert mock_cursor.execute.call_count == 2
+
+
+def test_lock_period_writes_one_row_not_every_attendance_row(mock_db_connection):
+    from app.database.payroll import ATTENDANCE_LOCK_CHANNEL, AttendanceLockDB
+
+    mock_conn, mock_cursor = mock_db_connection
+    with patch("app.database.payroll.execute_values") as mock_values:
+        AttendanceLockDB.lock_period(2025, 1, unlocked_ids=[5])
+
+    sql = [c.args[0] for c in mock_cursor.execute.call_args_list]
+    assert any("INSERT INTO attendance_lock " in s for s in sql)
+    assert not any("UPDATE attendance" in s for s in sql)
+    assert mock_values.call_args.args[2] == [(5, 2025, 1, False)]
+
+    notify = [c for c in mock_cursor.execute.call_args_list if "pg_notify" in c.args[0]]
+    assert notify[0].args[1] == (ATTENDANCE_LOCK_CHANNEL, "2025-1")
+
+
+def test_bulk_whole_month_locks_only_computed_employees(mock_db_connection, monkeypatch):
+    from datetime import date
+    from app.services.payroll_bulk_service import BulkPayrollService
+
+    structure = {"basic": 30000, "hra": 12000, "allowances": 3000, "deductions": 1500}
+
+    with patch("app.services.payroll_bulk_service.EmployeeDB.get_active_ids", return_value=[1, 2, 3]), \
+         patch("app.services.payroll_bulk_service.PayrollPolicyDB.get_active_policy", return_value=POLICY), \
+         patch("app.services.payroll_bulk_service.SalaryDB.load_index", return_value=_salary_index({
+            1: {"structure": structure, "base_salary": None},
+            3: {"structure": structure, "base_salary": None},
+         })), \
+         patch("app.services.payroll_bulk_service.PayrollService.get_attendance_summaries",
+               return_value={1: SUMMARY, 2: SUMMARY, 3: dict(SUMMARY, working_days=0)}), \
+         patch("app.services.payroll_bulk_service.PayrollDB.bulk_upsert_payroll",
+               side_effect=lambda y, m, rows, conn=None: {e: f for e, f in rows}), \
+         patch("app.database.payroll.execute_values") as mock_values:
+        BulkPayrollService.generate(2025, 1)
+
+    # Exception rows for the computed employee only; no month-wide row
+    mock_conn, mock_cursor = mock_db_connection
+    assert mock_values.call_args.args[2] == [(1, 2025, 1, True)]
+    sql = [c.args[0] for c in mock_cursor.execute.call_args_list]
+    assert not any("INSERT INTO attendance_lock " in s for s in sql)
+
+    # Someone hired after the run is not locked out of the month
+    lock_db = _real_lock_state(monkeypatch)
+    mock_cursor.fetchone.return_value = (False, {"1": True})
+    assert lock_db.is_locked(1, date(2025, 1, 20)) is True
+    assert lock_db.is_locked(4, date(2025, 1, 20)) is False
+
+
+def test_parallel_run_locks_the_same_attendance_as_serial(mock_db_connection):
+    from app.services.payroll_bulk_service import BulkPayrollService
+    from app.services.payroll_parallel_service import ParallelPayrollService
+
+    structure = {"basic": 30000, "hra": 12000, "allowances": 3000, "deductions": 1500}
+
+    def run(mode):
+        with patch("app.services.payroll_bulk_service.EmployeeDB.get_active_ids", return_value=[1, 2, 3]), \
+             patch("app.services.payroll_parallel_service.EmployeeDB.get_active_ids", return_value=[1, 2, 3]), \
+             patch("app.services.payroll_bulk_service.PayrollPolicyDB.get_active_policy", return_value=POLICY), \
+             patch("app.services.payroll_parallel_service.PayrollPolicyDB.get_active_policy",
+                   return_value=dict(POLICY, id=1)), \
+             patch("app.services.payroll_parallel_service.ParallelPayrollService.plan",
+                   return_value=[[1, 2], [3]]), \
+             patch("app.services.payroll_bulk_service.SalaryDB.load_index", return_value=_salary_index({
+                1: {"structure": structure, "base_salary": None},
+                3: {"structure": structure, "base_salary": None},
+             })), \
+             patch("app.services.payroll_bulk_service.PayrollService.get_attendance_summaries",
+                   return_value={1: SUMMARY, 2: SUMMARY, 3: dict(SUMMARY, working_days=0)}), \
+             patch("app.services.payroll_bulk_service.PayrollDB.bulk_upsert_payroll",
+                   side_effect=lambda y, m, rows, conn=None: {e: f for e, f in rows}), \
+             patch("app.database.payroll.AttendanceLockDB.set_employees") as mock_lock:
+            if mode == "serial":
+                BulkPayrollService.generate(2025, 1)
+            else:
+                # Two partitions, run in-process
+                ParallelPayrollService.generate(2025, 1, workers=1, partition_by="range")
+        return [c.args for c in mock_lock.call_args_list]
+
+    serial = run("serial")
+    assert serial == [([1], 2025, 1, True)]
+    # One lock write for the whole run, none from the partitions
+    assert run("parallel") == serial
+
+
+def test_locked_month_blocks_upsert_and_recalculation(mock_db_connection):
+    from datetime import date
+    from app.database.attendence import AttendanceDB
+    from app.services.attendence_services import AttendanceLocked, AttendanceService
+
+    mock_conn, mock_cursor = mock_db_connection
+
+    with patch("app.database.attendence.AttendanceLockDB.is_locked", return_value=True):
+        assert AttendanceDB.upsert_full_attendance({"employee_id": 1, "date": date(2025, 1, 2)}) is None
+    mock_cursor.execute.assert_not_called()
+
+    with patch("app.services.attendence_services.AttendancePolicyDB.get_policy_for_date"), \
+         patch("app.services.attendence_services.AttendanceLockDB.is_locked", return_value=True):
+        with pytest.raises(AttendanceLocked):
+            AttendanceService.recalculate_for_date(1, date(2025, 1, 2))
+
+
+def test_salary_index_matches_effective_date_rules():
+    from datetime import date
+    from app.database.salary import SalaryStructureIndex
+
+    def row(structure_id, start, end=None, emp=1, basic=100):
+        return {"employee_id": emp, "base_salary": 40000, "structure_id": structure_id,
+                "basic": basic, "hra": 0, "allowances": 0, "deductions": 0,
+                "effective_from": start, "effective_to": end}
+
+    index = SalaryStructureIndex.from_rows([
+        row(1, date(2024, 1, 1)),
+        row(2, date(2024, 6, 1), end=date(2024, 6, 30)),
+        row(3, date(2024, 9, 1)),
+        row(4, date(2024, 9, 1)),                       # same day: later insert wins
+        {"employee_id": 2, "base_salary": None, "structure_id": None},
+    ])
+
+    assert index.structure_on(1, date(2023, 12, 31)) is None
+    assert index.structure_on(1, date(2024, 6, 15))["id"] == 2
+    assert index.structure_on(1, date(2024, 7, 1))["id"] == 1    # closed row skipped
+    assert index.structure_on(1, date(2024, 9, 1))["id"] == 4
+    assert index.inputs_on(1, date(2024, 7, 1)) == {
+        "structure": {"basic": 100, "hra": 0, "allowances": 0, "deductions": 0},
+        "base_salary": 40000.0,
+    }
+    assert index.inputs_for([1, 2, 99], date(2024, 1, 1))[2] == {"structure": None, "base_salary": None}
+
+    assert len(index.revisions(1, date(2024, 8, 1), date(2024, 8, 31))) == 1
+    segments = index.revisions(1, date(2024, 6, 16), date(2024, 7, 15))
+    assert [(s["from"], s["to"], s["days"], s["structure_id"]) for s in segments] == [
+        (date(2024, 6, 16), date(2024, 6, 30), 15, 2),
+        (date(2024, 7, 1), date(2024, 7, 15), 15, 1),
+    ]
+    assert list(index.mid_period_revisions(date(2024, 6, 1), date(2024, 6, 30))) == []
+    assert list(index.mid_period_revisions(date(2024, 8, 16), date(2024, 9, 15))) == [1]
+
+
+def test_bulk_flags_mid_month_salary_revisions(mock_db_connection):
+    from datetime import date
+    from app.database.salary import SalaryStructureIndex
+    from app.services.payroll_bulk_service import BulkPayrollService
+
+    structure = {"basic": 30000, "hra": 12000, "allowances": 3000, "deductions": 1500}
+    index = SalaryStructureIndex({1: [
+        dict(structure, id=10, effective_from=date(2024, 1, 1), effective_to=None),
+        dict(structure, id=11, basic=36000, effective_from=date(2025, 1, 16), effective_to=None),
+    ]}, {1: None})
+
+    with patch("app.services.payroll_bulk_service.PayrollPolicyDB.get_active_policy", return_value=POLICY), \
+         patch("app.services.payroll_bulk_service.SalaryDB.load_index", return_value=index), \
+         patch("app.services.payroll_bulk_service.PayrollService.get_attendance_summaries",
+               return_value={1: SUMMARY}), \
+         patch("app.services.payroll_bulk_service.PayrollDB.bulk_upsert_payroll",
+               side_effect=lambda y, m, rows, conn=None: {e: f for e, f in rows}), \
+         patch("app.services.payroll_bulk_service.PayrollDB.lock_attendance_month"):
+        result = BulkPayrollService.generate(2025, 1, employee_ids=[1])[0]
+
+    # Paid on the structure effective on the 1st; the revision is reported
+    assert result["payroll"]["basic_pay"] == 30000
+    assert [(s["from"], s["structure_id"]) for s in result["salary_revisions"]] == [
+        (date(2025, 1, 1), 10), (date(2025, 1, 16), 11),
+    ]
+
+
+def _compare_row(**values):
+    from app.database.payroll_compare import COMPARED_COMPONENTS
+
+    row = {"employee_id": 1, "first_name": "A", "last_name": "B", "department": "IT",
+           "change": "changed", "total_changed": 1, "employees": 2, "changed": 1}
+    for c in COMPARED_COMPONENTS:
+        before, after = values.get(c, (100, 100))
+        row.update({f"{c}_before": before, f"{c}_after": after, f"{c}_delta": after - before})
+    return row
+
+
+def test_compare_diffs_run_against_month_in_sql(mock_db_connection):
+    from app.database.payroll_compare import PayrollCompareDB
+
+    mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.side_effect = [
+        [_compare_row(net_salary=(1000, 900), lop_days=(0, 1))],
+        [_compare_row(net_salary=(5000, 4900))],
+    ]
+
+    result = PayrollCompareDB.compare(
+        {"year": 2025, "month": 1}, {"run_id": 7}, components=["net_salary", "lop_days"], min_pct=5,
+    )
+
+    sql, params = mock_cursor.execute.call_args_list[0].args
+    assert "FULL OUTER JOIN b ON b.employee_id = a.employee_id" in sql
+    assert "payroll_run_snapshot WHERE run_id = %(target_run_id)s" in sql
+    assert "ABS(overtime_pay_delta) >=" not in sql          # only requested components gate
+    assert params["base_year"] == 2025 and params["target_run_id"] == 7 and params["min_pct"] == 5
+
+    assert result["changed"] == 1
+    assert set(result["employees"][0]["components"]) == {"net_salary", "lop_days"}
+    assert result["departments"][0]["components"]["net_salary"]["delta"] == -100
+
+
+def test_compare_rejects_unknown_components(mock_db_connection):
+    from app.database.payroll_compare import PayrollCompareDB
+
+    with pytest.raises(ValueError):
+        PayrollCompareDB.compare({"run_id": 1}, {"run_id": 2}, components=["salary; DROP"])
+
+
+def test_compare_route_defaults_to_previous_month_and_previous_run(client):
+    empty = {"changed": 0, "employees": [], "departments": []}
+
+    with patch("app.api.payroll.PayrollCompareDB.compare", return_value=empty) as mock_compare:
+        response = client.get("/hrms/payroll/compare?year=2025&month=1&min_delta=50")
+    assert response.status_code == 200
+    assert mock_compare.call_args.args == ({"year": 2024, "month": 12}, {"year": 2025, "month": 1})
+    assert mock_compare.call_args.kwargs["min_delta"] == 50
+
+    with patch("app.api.payroll.PayrollRunDB") as run_db, \
+         patch("app.api.payroll.PayrollCompareDB.compare", return_value=empty) as mock_compare:
+        run_db.get_run.return_value = {"run_id": 9}
+        run_db.get_previous_run.return_value = {"run_id": 4}
+        response = client.get("/hrms/payroll/compare?run_id=9")
+    assert response.json()["base"] == {"run_id": 4}
+
+    with patch("app.api.payroll.PayrollRunDB") as run_db:
+        run_db.get_run.return_value = {"run_id": 9}
+        run_db.get_previous_run.return_value = None
+        assert client.get("/hrms/payroll/compare?run_id=9").status_code == 404
+
+    assert client.get("/hrms/payroll/compare").status_code == 400
+
+
+def test_record_batch_snapshots_successful_rows(mock_db_connection):
+    from app.database.payroll_runs import PayrollRunDB
+
+    mock_conn, mock_cursor = mock_db_connection
+    with patch("app.database.payroll_runs.execute_values"):
+        PayrollRunDB.record_batch(7, [
+            {"employee_id": 1, "status": "success"},
+            {"employee_id": 2, "status": "failed", "error": "x"},
+        ])
+
+    snapshot = [c for c in mock_cursor.execute.call_args_list if "payroll_run_snapshot" in c.args[0]]
+    assert snapshot[0].args[1] == (7, [1])
+
+
+def _export_row(emp_id, net, account="0012345678", **extra):
+    row = {
+        "employee_id": emp_id, "year": 2025, "month": 3,
+        "first_name": "Emp", "last_name": f"({emp_id})", "email": None,
+        "designation": "Engineer", "department": "R&D",
+        "bank_account_holder": None, "bank_account_number": account, "bank_ifsc": "HDFC0000123",
+        "working_days": 22, "present_days": 21, "lop_days": 1, "overtime_hours": 0,
+        "basic_pay": net, "hra_pay": 0, "allowances_pay": 0,
+        "gross_salary": net + 100, "overtime_pay": 0, "holiday_pay": 0,
+        "night_shift_allowance": 0, "lop_deduction": 100, "net_salary": net,
+        "is_finalized": False,
+    }
+    row.update(extra)
+    return row
+
+
+def test_payslip_pdf_is_well_formed_and_escapes_text():
+    from app.services.payslip_pdf import render_payslip
+
+    pdf = render_payslip(_export_row(7, 30000))
+    assert pdf.startswith(b"%PDF-1.4") and pdf.rstrip().endswith(b"%%EOF")
+    # Parentheses in names must not terminate the PDF string
+    assert b"Emp \\(7\\) (#7)" not in pdf and b"Emp \\(7\\) \\(#7\\)" in pdf
+    assert b"30,000.00" in pdf
+
+
+def test_payslips_zip_streams_one_pdf_per_employee():
+    import io
+    import zipfile
+    from app.services.payroll_export_service import PayrollExportService
+
+    rows = [_export_row(i, 1000 * i) for i in (1, 2, 3)]
+    with patch("app.services.payroll_export_service.iter_rows", return_value=iter(rows)):
+        chunks = list(PayrollExportService.payslips_zip(2025, 3, workers=1))
+
+    # One chunk per payslip plus the central directory
+    assert len(chunks) == 4
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.namelist() == [f"payslip_2025_03_{i}.pdf" for i in (1, 2, 3)]
+    assert archive.read("payslip_2025_03_2.pdf").startswith(b"%PDF")
+
+
+def test_bank_transfer_and_summary_csv():
+    from app.services.payroll_export_service import PayrollExportService
+
+    rows = [
+        _export_row(1, 5000),
+        _export_row(2, 0),                  # nothing to pay
+        _export_row(3, 7000, account=None),  # no bank details
+    ]
+    with patch("app.services.payroll_export_service.iter_rows", side_effect=lambda *a: iter(rows)):
+        bank = "".join(PayrollExportService.bank_transfer_csv(2025, 3)).splitlines()
+        summary = "".join(PayrollExportService.summary_csv(2025, 3)).splitlines()
+
+    assert bank == [
+        "employee_id,account_holder,account_number,ifsc,amount,reference",
+        "1,Emp (1),0012345678,HDFC0000123,5000.00,SAL-2025-03-1",
+    ]
+    assert len(summary) == 5
+    assert summary[3].endswith(",7000.00,no,missing")
+    assert summary[-1] == "TOTAL,3 employees,,,,,,12300.00,0.00,0.00,0.00,300.00,12000.00,,"
+
+
+def test_export_routes_stream_attachments(client):
+    rows = [_export_row(1, 5000)]
+    with patch("app.services.payroll_export_service.iter_rows", side_effect=lambda *a: iter(rows)), \
+         patch("app.services.payroll_export_service.PAYSLIP_WORKERS", 1):
+        zipped = client.get("/hrms/payroll/export/payslips?year=2025&month=3")
+        bank = client.get("/hrms/payroll/export/bank-transfer?year=2025&month=3")
+
+    assert zipped.status_code == 200
+    assert zipped.headers["content-type"] == "application/zip"
+    assert 'filename="payslips_2025_03.zip"' in zipped.headers["content-disposition"]
+    assert bank.headers["content-type"].startswith("text/csv")
+    assert "SAL-2025-03-1" in bank.text
+
+
+def test_fiscal_year_boundaries():
+    from app.database.payroll_ledger import fiscal_months, fiscal_year
+
+    assert fiscal_year(2025, 3) == 2024 and fiscal_year(2025, 4) == 2025
+    assert fiscal_months(2025) == ((2025, 4), (2026, 3))
+
+
+def test_payroll_upserts_refresh_ytd_ledger_in_same_transaction(mock_db_connection):
+    from app.database.payroll import PAYROLL_VALUE_COLUMNS, PayrollDB
+
+    mock_conn, mock_cursor = mock_db_connection
+
+    PayrollDB.upsert_payroll(7, 2026, 2, *([0] * 16))
+    ledger = [c for c in mock_cursor.execute.call_args_list if "payroll_ytd_ledger" in c.args[0]]
+    # February 2026 belongs to the April 2025 financial year
+    assert ledger[-1].args[1]["employee_ids"] == [7]
+    assert ledger[-1].args[1]["fiscal_years"] == [2025]
+    assert mock_conn.commit.called
+
+    mock_cursor.execute.reset_mock()
+    with patch("app.database.payroll.execute_values", return_value=[{"employee_id": 1}, {"employee_id": 2}]):
+        PayrollDB.bulk_upsert_payroll(2025, 4, [
+            (e, dict.fromkeys(PAYROLL_VALUE_COLUMNS, 0)) for e in (1, 2)
+        ])
+    ledger = [c for c in mock_cursor.execute.call_args_list if "payroll_ytd_ledger" in c.args[0]]
+    assert len(ledger) == 1
+    assert ledger[0].args[1]["employee_ids"] == [1, 2]
+
+
+def test_ytd_and_annual_statement_routes(client):
+    with patch("app.api.employee_detail.PayrollLedgerDB.get_ytd", return_value=None):
+        response = client.get("/hrms/employee/1/payroll-ytd?fiscal_year=2024")
+    assert response.status_code == 404
+
+    statement = {"employee_id": 1, "fiscal_year": 2024, "ytd": {"net_salary": 1000}, "months": []}
+    with patch("app.api.employee_detail.PayrollLedgerDB.get_statement", return_value=statement) as mock_stmt:
+        response = client.get("/hrms/employee/1/annual-statement?fiscal_year=2024")
+    assert response.json()["ytd"]["net_salary"] == 1000
+    mock_stmt.assert_called_once_with(1, 2024)
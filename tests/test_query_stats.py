@@ -0,0 +1,40 @@
+import logging
+
+from app.database.query_stats import fingerprint, normalize_sql, track_queries
+
+
+def test_fingerprint_ignores_literals_and_whitespace():
+    a = "SELECT * FROM payroll WHERE employee_id = %s AND month = %s;"
+    b = """
+        SELECT *   FROM payroll
+        WHERE employee_id = 42 AND month = 7  -- latest
+    """
+    assert fingerprint(a) == fingerprint(b)
+    assert normalize_sql("SELECT 1 FROM x WHERE id IN (1, 2, 3) AND s = 'a'") == \
+        "SELECT ? FROM x WHERE id IN (?) AND s = ?"
+
+
+def test_payroll_history_reports_queries(client, mock_db_connection, caplog):
+    caplog.set_level(logging.INFO, logger="hrms.database")
+    mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = []
+
+    response = client.get("/hrms/employee/1/payroll-history")
+
+    assert response.status_code == 200
+    # One range query for the last 6 months (was one get_payroll per month)
+    assert response.headers["X-DB-Queries"] == "1"
+    assert float(response.headers["X-DB-Time-ms"]) >= 0
+    assert "possible N+1" not in caplog.text
+
+
+def test_track_queries_outside_http(mock_db_connection):
+    from app.database.payroll import PayrollDB
+
+    with track_queries(nplus1_threshold=1) as stats:
+        PayrollDB.get_payroll(1, 1, 2025)
+        PayrollDB.get_payroll(1, 2, 2025)
+
+    assert stats.count == 2
+    assert len(stats.by_fingerprint) == 1
+    assert stats.repeated()[0]["count"] == 2
@@ -0,0 +1,46 @@
+import json
+import pickle
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.streaming import RecordJSONResponse
+from app.database.records import dumps, make_record, record_class
+
+
+FIELDS = ("employee_id", "date", "check_in", "total_hours", "status", "keys")
+
+
+def _row():
+    return make_record(FIELDS, (7, date(2025, 1, 2), datetime(2025, 1, 2, 9, 5), Decimal("8.50"), "present", 1))
+
+
+def test_record_attribute_and_mapping_access():
+    row = _row()
+
+    assert row.employee_id == 7
+    assert row["status"] == "present"
+    assert row.get("missing", "x") == "x"
+    assert "date" in row and len(row) == len(FIELDS)
+    # Columns that clash with Mapping methods stay reachable by key
+    assert row["keys"] == 1 and callable(row.keys)
+    assert row == dict(zip(FIELDS, row._values))
+    assert record_class(FIELDS) is type(row)
+
+
+def test_record_has_no_per_row_dict():
+    row = _row()
+    assert not hasattr(row, "__dict__")
+
+
+def test_record_pickles():
+    row = _row()
+    assert pickle.loads(pickle.dumps(row)) == row
+
+
+def test_dumps_matches_fastapi_encoding():
+    rows = [_row(), _row()]
+
+    assert json.loads(dumps(rows)) == jsonable_encoder([r._asdict() for r in rows])
+    assert json.loads(RecordJSONResponse(rows).body) == json.loads(dumps(rows))